@@ -1,80 +1,42 @@
-import pandas as pd
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-import os
+import argparse
+from geo_clustering import fit_region_model, save_region_model, write_region_column, batch_model_path, REGION_MODEL_PATH
 
-def fix_cluster_column():
+def fix_cluster_column(replace_app_model=False):
     # Define the file path
     file_path = r"C:\Users\703401801\Desktop\Cigna\synthetic_patient_data.csv"
 
-    # Load the dataset
+    # --- 1. Geographic Clustering ---
+    # Fit on coordinates streamed in chunks instead of loading the whole file
     try:
-        df = pd.read_csv(file_path)
+        model = fit_region_model(file_path)
     except FileNotFoundError:
         print(f"Error: The file {file_path} was not found.")
         return
-
-    # Drop the old, faulty cluster column if it exists
-    if 'cluster' in df.columns:
-        df = df.drop(columns=['cluster'])
-
-    # --- 1. Geographic Clustering ---
-    if not pd.api.types.is_numeric_dtype(df['latitude']) or not pd.api.types.is_numeric_dtype(df['longitude']):
-        print("Error: Latitude and Longitude columns must be numeric for clustering.")
+    except ValueError as e:
+        print(f"Error: Latitude and Longitude columns must be numeric for clustering. {e}")
         return
-        
-    coords = df[['latitude', 'longitude']]
-    scaler = StandardScaler()
-    coords_scaled = scaler.fit_transform(coords)
-    kmeans = KMeans(n_clusters=5, random_state=42, n_init=10)
-    df['cluster_id'] = kmeans.fit_predict(coords_scaled)
-
-    # --- 2. Corrected Region Mapping ---
-    centroids = scaler.inverse_transform(kmeans.cluster_centers_)
-    lat_sorted_indices = sorted(range(len(centroids)), key=lambda k: centroids[k][0])
-    lon_sorted_indices = sorted(range(len(centroids)), key=lambda k: centroids[k][1])
-
-    cluster_map = {}
-    available_regions = ["North", "South", "East", "West", "Central"]
-
-    # Assign North and South, as they are the most distinct vertically
-    north_idx = lat_sorted_indices[-1]
-    cluster_map[north_idx] = "North"
-    available_regions.remove("North")
 
-    south_idx = lat_sorted_indices[0]
-    cluster_map[south_idx] = "South"
-    available_regions.remove("South")
-
-    # Assign East and West if they haven't been taken by North/South
-    east_idx = lon_sorted_indices[-1]
-    if east_idx not in cluster_map:
-        cluster_map[east_idx] = "East"
-        available_regions.remove("East")
-
-    west_idx = lon_sorted_indices[0]
-    if west_idx not in cluster_map:
-        cluster_map[west_idx] = "West"
-        available_regions.remove("West")
-
-    # Assign any remaining regions to the unmapped clusters
-    for i in range(5):
-        if i not in cluster_map:
-            cluster_map[i] = available_regions.pop(0)
-
-    df['cluster'] = df['cluster_id'].map(cluster_map)
-    df = df.drop(columns=['cluster_id'])
+    # --- 2. Persist centroids and region map for later assignment ---
+    # The app's shared model is only replaced on request; otherwise this fit
+    # is saved next to the data file
+    save_region_model(model, REGION_MODEL_PATH if replace_app_model else batch_model_path(file_path))
 
     # --- 3. Verification and Save ---
-    missing_after_fix = df['cluster'].isnull().sum()
+    # The old, faulty cluster column is replaced chunk by chunk
+    try:
+        _, missing_after_fix = write_region_column(file_path, model, column_name='cluster')
+    except PermissionError:
+        print(f"Error: Permission denied. Could not write to {file_path}. Please ensure the file is not open.")
+        return
+
     if missing_after_fix > 0:
         print(f"Error: Could not fix the cluster allocation. {missing_after_fix} rows are still null.")
     else:
-        try:
-            df.to_csv(file_path, index=False)
-            print(f"Successfully fixed and updated the 'cluster' column in {file_path}")
-        except PermissionError:
-            print(f"Error: Permission denied. Could not write to {file_path}. Please ensure the file is not open.")
+        print(f"Successfully fixed and updated the 'cluster' column in {file_path}")
 
 if __name__ == "__main__":
-    fix_cluster_column()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fit the region model on the patient file and rewrite its region column.")
+    parser.add_argument('--replace-app-model', action='store_true',
+                        help="Save this fit as the app's shared region model instead of next to the data file")
+    args = parser.parse_args()
+    fix_cluster_column(replace_app_model=args.replace_app_model)
@@ -1,7 +1,62 @@
 
+import os
+import tempfile
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
+from openpyxl import Workbook
+from geo_clustering import load_or_fit_region_model, assign_regions
+from columnar_snapshot import write_snapshot, load_snapshot, load_multihot, row_positions
+from medical_history import condition_counts
+
+REGION_ORDER = ["North", "West", "South", "East", "Central"]
+REPORT_COLUMNS = ['region', 'age', 'annual_salary', 'number_of_children', 'marital_status', 'has_college_degree',
+                  'gender', 'ethnicity', 'drug_needs', 'us_county']
+
+def summarize_region(snapshot_dir, region_name, distance_column):
+    """
+    Build the report blocks for one region from the shared columnar snapshot.
+    Runs in a worker process; returns plain rows so only small results are
+    sent back to the parent. Only the region column is scanned in full; the
+    other columns are gathered at the region's row positions.
+    """
+    region_rows = row_positions(snapshot_dir, 'region', region_name)
+    if not len(region_rows):
+        return region_name, []
+    cluster_df = load_snapshot(snapshot_dir, REPORT_COLUMNS + [distance_column], rows=region_rows)
+
+    blocks = []
+
+    # General Characteristics
+    blocks.append((['Metric', 'Value'], [
+        ['Total Patients', len(cluster_df)],
+        ['Average Age (years)', f"{cluster_df['age'].mean():.1f}"],
+        ['Average Annual Salary', f"${cluster_df['annual_salary'].mean():,.2f}"],
+        ['Average Number of Children', f"{cluster_df['number_of_children'].mean():.2f}"],
+    ]))
+
+    # Demographics
+    blocks.append((['Metric', 'Value'], [
+        ['Most Common Marital Status', cluster_df['marital_status'].mode()[0]],
+        ['College Degree Holders (%)', f"{cluster_df['has_college_degree'].mean()*100:.1f}%"],
+    ]))
+    gender_dist = cluster_df['gender'].value_counts(normalize=True, sort=True).mul(100).round(1)
+    blocks.append((['gender', 'Gender Distribution (%)'], [[k, float(v)] for k, v in gender_dist.items() if v > 0]))
+    ethnicity_dist = cluster_df['ethnicity'].value_counts(normalize=True, sort=True).mul(100).round(1)
+    blocks.append((['ethnicity', 'Ethnicity Distribution (%)'], [[k, float(v)] for k, v in ethnicity_dist.items() if v > 0]))
+
+    # Health Profile
+    blocks.append((['Metric', 'Value'], [['Most Common Drug Needs', cluster_df['drug_needs'].mode()[0]]]))
+    history_matrix, vocabulary = load_multihot(snapshot_dir, 'medical_history')
+    common_conditions = condition_counts(history_matrix, vocabulary, region_rows).nlargest(3)
+    blocks.append((['medical_history', 'Most Common Medical Conditions'], [[k, int(v)] for k, v in common_conditions.items()]))
+
+    # Pharmacy Distance
+    unit = 'km' if distance_column.endswith('_km') else 'miles'
+    county_distances = cluster_df.groupby('us_county', observed=True)[distance_column].mean().round(2)
+    blocks.append((['us_county', f'Avg Distance ({unit})'], [[k, float(v)] for k, v in county_distances.items()]))
+
+    return region_name, blocks
 
 def tabulate_cluster_analysis():
     # Define output path
@@ -14,102 +69,41 @@ def tabulate_cluster_analysis():
         print("Error: The file 'synthetic_patient_data_with_distances.csv' was not found.")
         return
 
-    # --- 1. Geographic Clustering ---
-    coords = df[['latitude', 'longitude']]
-    scaler = StandardScaler()
-    coords_scaled = scaler.fit_transform(coords)
-    kmeans = KMeans(n_clusters=5, random_state=42, n_init=10)
-    df['cluster'] = kmeans.fit_predict(coords_scaled)
-
-    # --- 2. Region Mapping ---
-    centroids = scaler.inverse_transform(kmeans.cluster_centers_)
-    lat_sorted_indices = sorted(range(len(centroids)), key=lambda k: centroids[k][0])
-    lon_sorted_indices = sorted(range(len(centroids)), key=lambda k: centroids[k][1])
-
-    cluster_map = {}
-    cluster_map[lon_sorted_indices[0]] = "West"
-    cluster_map[lon_sorted_indices[-1]] = "East"
-    cluster_map[lat_sorted_indices[-1]] = "North"
-    cluster_map[lat_sorted_indices[0]] = "South"
-    
-    for i in range(5):
-        if i not in cluster_map:
-            cluster_map[i] = "Central"
-            break
-
-    df['region'] = df['cluster'].map(cluster_map)
-
-    # --- 3. Create Excel Report ---
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        for region_name in ["North", "West", "South", "East", "Central"]:
-            cluster_df = df[df['region'] == region_name]
-            if cluster_df.empty:
-                continue
-
-            # --- Create Summary DataFrames ---
-            
-            # General Characteristics
-            general_stats = pd.DataFrame({
-                'Metric': ['Total Patients', 'Average Age (years)', 'Average Annual Salary', 'Average Number of Children'],
-                'Value': [
-                    len(cluster_df),
-                    f"{cluster_df['age'].mean():.1f}",
-                    f"${cluster_df['annual_salary'].mean():,.2f}",
-                    f"{cluster_df['number_of_children'].mean():.2f}"
-                ]
-            }).set_index('Metric')
-
-            # Demographics
-            demographics = pd.DataFrame({
-                'Metric': ['Most Common Marital Status', 'College Degree Holders (%)'],
-                'Value': [
-                    cluster_df['marital_status'].mode()[0],
-                    f"{cluster_df['has_college_degree'].mean()*100:.1f}%"
-                ]
-            }).set_index('Metric')
-            gender_dist = cluster_df['gender'].value_counts(normalize=True).mul(100).round(1).rename('Gender Distribution (%)')
-            ethnicity_dist = cluster_df['ethnicity'].value_counts(normalize=True).mul(100).round(1).rename('Ethnicity Distribution (%)')
-
-            # Health Profile
-            try:
-                exploded_history = cluster_df.copy()
-                exploded_history['medical_history'] = exploded_history['medical_history'].apply(eval)
-                exploded_history = exploded_history.explode('medical_history')
-                common_conditions = exploded_history['medical_history'].value_counts().nlargest(3)
-            except Exception:
-                common_conditions = pd.Series({"Error": "Could not parse conditions"})
-
-            health_profile = pd.DataFrame({
-                'Metric': ['Most Common Drug Needs'],
-                'Value': [cluster_df['drug_needs'].mode()[0]]
-            }).set_index('Metric')
-            common_conditions.name = 'Most Common Medical Conditions'
-
-            # Pharmacy Distance
-            county_distances = cluster_df.groupby('us_county')['distance_to_pharmacy_km'].mean().round(2).rename('Avg Distance (km)')
-
-            # --- Write DataFrames to Excel Sheet ---
-            start_row = 1
-            general_stats.to_excel(writer, sheet_name=region_name, startrow=start_row, startcol=0)
-            start_row += len(general_stats) + 2
-
-            demographics.to_excel(writer, sheet_name=region_name, startrow=start_row, startcol=0)
-            start_row += len(demographics) + 1
-            gender_dist.to_excel(writer, sheet_name=region_name, startrow=start_row, startcol=0, header=True)
-            start_row += len(gender_dist) + 2
-            ethnicity_dist.to_excel(writer, sheet_name=region_name, startrow=start_row, startcol=0, header=True)
-            start_row += len(ethnicity_dist) + 2
-
-            health_profile.to_excel(writer, sheet_name=region_name, startrow=start_row, startcol=0)
-            start_row += len(health_profile) + 1
-            common_conditions.to_excel(writer, sheet_name=region_name, startrow=start_row, startcol=0, header=True)
-            start_row += len(common_conditions) + 2
-
-            county_distances.to_excel(writer, sheet_name=region_name, startrow=start_row, startcol=0, header=True)
-
-            # Add a title
-            worksheet = writer.sheets[region_name]
-            worksheet.cell(row=1, column=1, value=f"{region_name.upper()} CLUSTER ANALYSIS")
+    # --- 1. Geographic Clustering & Region Mapping ---
+    # Reuse the persisted region model; it is only fitted if no artifact exists yet
+    model = load_or_fit_region_model("synthetic_patient_data_with_distances.csv")
+    df['region'] = assign_regions(model, df['latitude'], df['longitude'])
+
+    distance_column = 'distance_to_pharmacy_km' if 'distance_to_pharmacy_km' in df.columns else 'distance_to_nearest_pharmacy_miles'
+
+    # --- 2. Summarize regions in parallel from a shared columnar snapshot ---
+    # medical_history is parsed once into a multi-hot matrix while the snapshot is written
+    snapshot_dir = os.path.join(tempfile.mkdtemp(prefix="cluster_report_"), "snapshot")
+    try:
+        write_snapshot(df[REPORT_COLUMNS + [distance_column, 'medical_history']], snapshot_dir)
+        with ProcessPoolExecutor(max_workers=min(len(REGION_ORDER), os.cpu_count() or 1)) as executor:
+            futures = [
+                executor.submit(summarize_region, snapshot_dir, region_name, distance_column)
+                for region_name in REGION_ORDER
+            ]
+            summaries = dict(future.result() for future in futures)
+    finally:
+        shutil.rmtree(os.path.dirname(snapshot_dir), ignore_errors=True)
+
+    # --- 3. Create Excel Report in a single streaming write ---
+    workbook = Workbook(write_only=True)
+    for region_name in REGION_ORDER:
+        blocks = summaries.get(region_name)
+        if not blocks:
+            continue
+        worksheet = workbook.create_sheet(title=region_name)
+        worksheet.append([f"{region_name.upper()} CLUSTER ANALYSIS"])
+        for header, rows in blocks:
+            worksheet.append(header)
+            for row in rows:
+                worksheet.append(row)
+            worksheet.append([])
+    workbook.save(output_path)
 
     print(f"Successfully created cluster analysis report at {output_path}")
 
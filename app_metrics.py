@@ -0,0 +1,119 @@
+
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import Response, g, request
+
+# --- Configuration ---
+# Histogram bucket upper bounds in seconds (the Prometheus client defaults)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_lock = threading.Lock()
+# metric name -> (type, help text)
+_metadata = {
+    'app_requests_total': ('counter', "HTTP requests handled, by endpoint, method and status."),
+    'app_request_errors_total': ('counter', "Requests that returned a 5xx status or raised, by endpoint."),
+    'app_rows_processed_total': ('counter', "Data rows processed by handlers, by endpoint."),
+    'app_request_duration_seconds': ('histogram', "Request latency by endpoint."),
+    'app_phase_duration_seconds': ('histogram', "Latency of phases inside handlers, by endpoint and phase."),
+}
+# metric name -> {label tuple: value} for counters, {label tuple: [bucket counts, sum, count]} for histograms
+_counters = {name: {} for name, (kind, _) in _metadata.items() if kind == 'counter'}
+_histograms = {name: {} for name, (kind, _) in _metadata.items() if kind == 'histogram'}
+
+def _labels(**labels):
+    return tuple(sorted(labels.items()))
+
+def inc(name, amount=1, **labels):
+    key = _labels(**labels)
+    with _lock:
+        _counters[name][key] = _counters[name].get(key, 0) + amount
+
+def observe(name, seconds, **labels):
+    key = _labels(**labels)
+    bucket = bisect_left(LATENCY_BUCKETS, seconds)
+    with _lock:
+        series = _histograms[name].get(key)
+        if series is None:
+            series = _histograms[name][key] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0]
+        series[0][bucket] += 1
+        series[1] += seconds
+        series[2] += 1
+
+def _endpoint():
+    return (request.endpoint or 'unknown') if request else 'none'
+
+def count_rows(rows):
+    """Add to the rows-processed counter of the current endpoint."""
+    inc('app_rows_processed_total', int(rows), endpoint=_endpoint())
+
+@contextmanager
+def span(phase):
+    """Time a phase of the current handler into app_phase_duration_seconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe('app_phase_duration_seconds', time.perf_counter() - start, endpoint=_endpoint(), phase=phase)
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        for name, (kind, help_text) in _metadata.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == 'counter':
+                for key, value in sorted(_counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+                continue
+            for key, (buckets, total, count) in sorted(_histograms[name].items()):
+                cumulative = 0
+                for bound, bucket_count in zip(LATENCY_BUCKETS + (float('inf'),), buckets):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+    return "\n".join(lines) + "\n"
+
+def init_metrics(app):
+    """Time every request of `app` and serve the metrics on GET /metrics."""
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            endpoint = _endpoint()
+            observe('app_request_duration_seconds', time.perf_counter() - start, endpoint=endpoint)
+            inc('app_requests_total', endpoint=endpoint, method=request.method, status=response.status_code)
+            if response.status_code >= 500:
+                inc('app_request_errors_total', endpoint=endpoint)
+        return response
+
+    @app.teardown_request
+    def _record_exception(exc):
+        # Unhandled exceptions skip after_request
+        start = g.pop('metrics_start', None)
+        if exc is not None and start is not None:
+            endpoint = _endpoint()
+            observe('app_request_duration_seconds', time.perf_counter() - start, endpoint=endpoint)
+            inc('app_requests_total', endpoint=endpoint, method=request.method, status=500)
+            inc('app_request_errors_total', endpoint=endpoint)
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
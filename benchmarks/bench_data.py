@@ -0,0 +1,132 @@
+
+import os
+import sys
+import json
+import shutil
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+import ingest_pipeline
+from generate_patient_data import generate_patient_data
+from geo_clustering import load_region_model, assign_regions, REGION_MODEL_PATH
+from county_names import GAZETTEER_PATH, load_gazetteer_table
+
+# --- Configuration ---
+DATA_ROOT = os.path.join(BENCH_DIR, ".data")
+DATASET_SEED = 42
+CHUNK_SIZE = 500000
+KM_TO_MILES = 0.621371
+# Synthetic training label: a pharmacy was found within this many miles
+PHARMACY_FOUND_MILES = 10
+PHARMACY_JITTER_DEGREES = 0.15
+UPLOAD_ROWS = 1000
+
+# File names the legacy scripts read from their working directory. The
+# Windows paths have no directory on POSIX, so they resolve to plain file
+# names (backslashes included) inside the benchmark's working directory.
+PATIENTS_FILE = "synthetic_patient_data_with_distances.csv"
+RAW_PATIENTS_FILE = r"C:\Users\703401801\Desktop\Cigna\synthetic_patient_data.csv"
+TRAINING_FILE = "C:\\Users\\703401801\\Desktop\\Cigna\\synthetic_patient_data_with_clusters.csv"
+TRAINED_MODEL_FILE = "C:\\Users\\703401801\\Desktop\\Cigna\\pharmacy_found_model.joblib"
+PHARMACIES_FILE = "Pharmacies.csv"
+PHARMACIES_SEMICOLON_FILE = "pharmacies_semicolon.csv"
+UPLOAD_FILE = "upload_sample.csv"
+APP_DATA_FILE = "patient_data_with_imputed_distances.csv"
+STAMP_FILE = "dataset.json"
+
+def parse_count(text):
+    """'10k' -> 10000, '1m' -> 1000000, '250' -> 250."""
+    text = str(text).strip().lower().replace('_', '')
+    multiplier = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text[:-1] if multiplier > 1 else text) * multiplier)
+
+def count_label(count):
+    for suffix, size in (('m', 1000000), ('k', 1000)):
+        if count >= size and count % size == 0:
+            return f"{count // size}{suffix}"
+    return str(count)
+
+def dataset_dir(num_patients, num_pharmacies, root=DATA_ROOT):
+    return os.path.join(root, f"p{count_label(num_patients)}_rx{count_label(num_pharmacies)}")
+
+def raw_patients_path(num_patients, root=DATA_ROOT):
+    """Generator output for a patient count, shared by every pharmacy count."""
+    return os.path.join(root, f"patients_{count_label(num_patients)}.csv")
+
+def generate_pharmacies(num_pharmacies, seed=DATASET_SEED):
+    """
+    Pharmacies scattered around random Gazetteer county centroids, with the
+    NAME/X/Y columns of the national pharmacy list.
+    """
+    rng = np.random.default_rng(seed)
+    table = load_gazetteer_table(GAZETTEER_PATH)
+    picks = rng.integers(0, len(table['geoid']), size=num_pharmacies)
+    jitter = rng.uniform(-PHARMACY_JITTER_DEGREES, PHARMACY_JITTER_DEGREES, size=(2, num_pharmacies))
+    return pd.DataFrame({
+        'NAME': [f"Pharmacy {i + 1}" for i in range(num_pharmacies)],
+        'X': np.round(table['lon'][picks] + jitter[1], 6),
+        'Y': np.round(table['lat'][picks] + jitter[0], 6),
+    })
+
+def write_analysis_patients(raw_path, output_path, training_path, chunksize=CHUNK_SIZE):
+    """
+    Derive the analysis inputs from the raw generator output in chunks: the
+    miles distance and region group the downstream scripts expect, plus the
+    training file with its Group and Pharmacy_Found_Class columns.
+    """
+    region_model = load_region_model(REGION_MODEL_PATH)
+    for i, chunk in enumerate(pd.read_csv(raw_path, chunksize=chunksize)):
+        chunk['distance_to_nearest_pharmacy_miles'] = (chunk['distance_to_pharmacy_km'] * KM_TO_MILES).round(2)
+        chunk['group'] = assign_regions(region_model, chunk['latitude'], chunk['longitude'])
+        chunk.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        chunk['Group'] = chunk.pop('group')
+        chunk['Pharmacy_Found_Class'] = (chunk['distance_to_nearest_pharmacy_miles'] <= PHARMACY_FOUND_MILES).astype(int)
+        chunk.to_csv(training_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+
+def run_ingest(data_dir):
+    """Build the app's patient file with the ingest pipeline, caching its stages inside data_dir."""
+    ingest_pipeline.CACHE_DIR = os.path.join(data_dir, ".ingest_cache")
+    ingest_pipeline.STATE_FILE = os.path.join(ingest_pipeline.CACHE_DIR, "state.json")
+    ingest_pipeline.run_pipeline(data_dir, write_checkpoints=True, input_overrides={'gazetteer': GAZETTEER_PATH})
+    shutil.rmtree(ingest_pipeline.CACHE_DIR, ignore_errors=True)
+
+def build_dataset(num_patients, num_pharmacies, root=DATA_ROOT, seed=DATASET_SEED, force=False):
+    """
+    Generate (or reuse) the benchmark inputs for one scale in their own
+    directory. Patients are generated once per patient count and shared
+    between pharmacy counts. Returns the directory.
+    """
+    data_dir = dataset_dir(num_patients, num_pharmacies, root)
+    stamp_path = os.path.join(data_dir, STAMP_FILE)
+    params = {'patients': num_patients, 'pharmacies': num_pharmacies, 'seed': seed}
+    if not force and os.path.exists(stamp_path):
+        with open(stamp_path) as f:
+            if json.load(f) == params:
+                return data_dir
+    os.makedirs(data_dir, exist_ok=True)
+
+    raw_path = raw_patients_path(num_patients, root)
+    if force or not os.path.exists(raw_path):
+        print(f"Generating {num_patients} patients")
+        generate_patient_data(num_patients, raw_path, seed)
+
+    print(f"Generating {num_pharmacies} pharmacies")
+    pharmacy_df = generate_pharmacies(num_pharmacies, seed)
+    pharmacy_df.to_csv(os.path.join(data_dir, PHARMACIES_FILE), index=False)
+    pharmacy_df.to_csv(os.path.join(data_dir, PHARMACIES_SEMICOLON_FILE), sep=';', index=False)
+
+    print("Deriving analysis and training files")
+    write_analysis_patients(raw_path, os.path.join(data_dir, PATIENTS_FILE), os.path.join(data_dir, TRAINING_FILE))
+    pd.read_csv(os.path.join(data_dir, PATIENTS_FILE), nrows=UPLOAD_ROWS).to_csv(os.path.join(data_dir, UPLOAD_FILE), index=False)
+
+    print("Running the ingest pipeline")
+    run_ingest(data_dir)
+
+    with open(stamp_path, 'w') as f:
+        json.dump(params, f)
+    return data_dir
@@ -0,0 +1,359 @@
+
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import socket
+import argparse
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlsplit, urlencode, quote
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+# --- Configuration ---
+DEFAULT_CONCURRENCY = 8
+DEFAULT_DURATION = 60
+STARTUP_TIMEOUT = 600
+REQUEST_TIMEOUT = 120
+UPLOAD_SOURCE = os.path.join(REPO_DIR, "synthetic_patient_data_with_distances.csv")
+UPLOAD_ROWS = 200
+MAX_VIEWPORT_PAGES = 20
+# Continental US, where the map starts
+VIEWPORT_LON = (-125.0, -67.0)
+VIEWPORT_LAT = (25.0, 49.0)
+VIEWPORT_ZOOMS = range(4, 11)
+MEDICAL_CONDITIONS = ['Diabetes', 'Hypertension', 'Asthma', 'Pain Management']
+# Distances the server rounds to 2 decimals; larger gaps mean a mixed-up response
+DISTANCE_TOLERANCE_MILES = 0.02
+
+# The user actions of the dashboard and how often each happens, relative
+# to the others. Most actions are one request; a map viewport follows
+# next_cursor like the frontend does.
+ACTION_WEIGHTS = {
+    'county_search': 30,
+    'find_pharmacies': 20,
+    'deserts_viewport': 15,
+    'cluster_analysis': 10,
+    'suggestions': 10,
+    'clusters': 5,
+    'deserts_stats': 5,
+    'counties': 4,
+    'predict_upload': 1,
+}
+
+_SERVER_SCRIPT = (
+    "import sys\n"
+    "from pharmacy_app import app\n"
+    "processes = int(sys.argv[2])\n"
+    "app.run(host='127.0.0.1', port=int(sys.argv[1]), threaded=processes == 1, processes=processes)\n"
+)
+
+# --- HTTP ---
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """Same formula as pharmacy_app.haversine_distance."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a)) * 0.621371
+
+def multipart_body(field, file_name, content):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{file_name}"\r\n'
+        "Content-Type: text/csv\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+class _Client(threading.local):
+    # One keep-alive connection per worker thread; http.client reopens it
+    # whenever the server closed the previous one
+    connection = None
+
+_client = _Client()
+
+def send_request(base_url, method, path, body=None, content_type=None):
+    """Send one request; returns (status, parsed JSON or None, seconds)."""
+    if _client.connection is None:
+        parts = urlsplit(base_url)
+        _client.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=REQUEST_TIMEOUT)
+    headers = {'Accept-Encoding': 'identity'}
+    if content_type:
+        headers['Content-Type'] = content_type
+    start = time.perf_counter()
+    try:
+        _client.connection.request(method, path, body=body, headers=headers)
+        response = _client.connection.getresponse()
+        payload = response.read()
+    except (OSError, http.client.HTTPException):
+        _client.connection.close()
+        raise
+    elapsed = time.perf_counter() - start
+    if response.will_close:
+        _client.connection.close()
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        data = None
+    return response.status, data, elapsed
+
+# --- Scenario ---
+def load_scenario_data(base_url, upload_file, upload_rows):
+    """County and cluster names from the server and the CSV used for uploads."""
+    _, counties, _ = send_request(base_url, 'GET', '/api/counties')
+    _, clusters, _ = send_request(base_url, 'GET', '/api/clusters')
+    with open(upload_file, 'rb') as f:
+        upload = b"".join(line for _, line in zip(range(upload_rows + 1), f))
+    return {'counties': counties['counties'], 'clusters': clusters['clusters'], 'upload': upload}
+
+def check_find_pharmacies(request_body, data):
+    """
+    The nearest pharmacy must be the closest one listed and its distance must
+    match the returned coordinates; a response computed from another
+    request's distances fails this.
+    """
+    nearest, user = data['nearest'], data['user_coords']
+    expected = haversine_miles(user['lat'], user['lon'], nearest['latitude'], nearest['longitude'])
+    if abs(expected - nearest['distance']) > DISTANCE_TOLERANCE_MILES:
+        return "nearest pharmacy distance does not match its coordinates"
+    if any(pharmacy['distance'] < nearest['distance'] for pharmacy in data['all_nearby']):
+        return "a listed pharmacy is closer than the nearest one"
+    return None
+
+def random_viewport(rng):
+    zoom = rng.choice(VIEWPORT_ZOOMS)
+    width = min(360 / 2 ** zoom * 4, 360)
+    lon = rng.uniform(*VIEWPORT_LON)
+    lat = rng.uniform(*VIEWPORT_LAT)
+    bbox = [max(lon - width / 2, -180), max(lat - width / 4, -90), min(lon + width / 2, 180), min(lat + width / 4, 90)]
+    return {'bbox': ",".join(f"{value:.4f}" for value in bbox), 'zoom': zoom}
+
+def action_requests(action, rng, scenario):
+    """
+    The requests of one user action as (label, method, path, body,
+    content_type, check) tuples. Viewport paging is driven by run_action.
+    """
+    if action == 'county_search':
+        county = rng.choice(scenario['counties']) if scenario['counties'] else ""
+        prefix = county[:rng.randint(1, 4)]
+        return [('GET /api/counties/search', 'GET', f"/api/counties/search?q={quote(prefix)}&limit=20", None, None, None)]
+    if action == 'find_pharmacies':
+        request_body = {
+            'county': rng.choice(scenario['counties']) if scenario['counties'] else "",
+            'medical_conditions': rng.sample(MEDICAL_CONDITIONS, rng.randint(0, 2)),
+            'is_pregnant': rng.random() < 0.1,
+        }
+        return [('POST /api/find_pharmacies', 'POST', '/api/find_pharmacies', json.dumps(request_body).encode(),
+                 'application/json', check_find_pharmacies)]
+    if action == 'cluster_analysis':
+        request_body = {'cluster': rng.choice(scenario['clusters']) if scenario['clusters'] else None}
+        return [('POST /api/cluster_analysis', 'POST', '/api/cluster_analysis', json.dumps(request_body).encode(),
+                 'application/json', None)]
+    if action == 'predict_upload':
+        body, content_type = multipart_body('file', "upload.csv", scenario['upload'])
+        return [('POST /api/predict_pharmacy', 'POST', '/api/predict_pharmacy', body, content_type, None)]
+    simple = {
+        'counties': ('GET /api/counties', '/api/counties'),
+        'clusters': ('GET /api/clusters', '/api/clusters'),
+        'suggestions': ('GET /api/pharmacy_suggestions', '/api/pharmacy_suggestions'),
+        'deserts_stats': ('GET /api/pharmacy_deserts?limit=0', '/api/pharmacy_deserts?limit=0'),
+    }
+    label, path = simple[action]
+    return [(label, 'GET', path, None, None, None)]
+
+def run_action(action, rng, scenario, base_url, record):
+    if action == 'deserts_viewport':
+        query = '/api/pharmacy_deserts?' + urlencode(random_viewport(rng))
+        cursor = None
+        for _ in range(MAX_VIEWPORT_PAGES):
+            path = f"{query}&cursor={cursor}" if cursor else query
+            data = timed_request(base_url, 'GET /api/pharmacy_deserts?bbox', 'GET', path, None, None, None, record)
+            cursor = data.get('next_cursor') if isinstance(data, dict) else None
+            if not cursor:
+                break
+        return
+    for label, method, path, body, content_type, check in action_requests(action, rng, scenario):
+        timed_request(base_url, label, method, path, body, content_type, check, record)
+
+def timed_request(base_url, label, method, path, body, content_type, check, record):
+    try:
+        status, data, elapsed = send_request(base_url, method, path, body, content_type)
+    except (OSError, http.client.HTTPException) as e:
+        record(label, None, 'error', f"{type(e).__name__}: {e}")
+        return None
+    if status >= 400 or data is None:
+        record(label, elapsed, 'error', f"HTTP {status}")
+    elif check and check(body, data):
+        record(label, elapsed, 'invalid', check(body, data))
+    else:
+        record(label, elapsed, 'ok', None)
+    return data
+
+# --- Runner ---
+def run_load(base_url, scenario, concurrency, duration, max_actions=None, think_time=0.0, seed=0):
+    """
+    Replay the action mix from `concurrency` threads for `duration` seconds
+    (or until `max_actions` actions ran). Returns the samples
+    {label: {'latencies': [...], 'unanswered': n, 'errors': n, 'invalid': n, 'messages': {...}}}
+    and the elapsed time.
+    """
+    samples = {}
+    lock = threading.Lock()
+    actions = list(ACTION_WEIGHTS)
+    weights = [ACTION_WEIGHTS[action] for action in actions]
+    deadline = time.perf_counter() + duration
+    remaining = [max_actions]
+
+    def record(label, elapsed, outcome, message):
+        with lock:
+            series = samples.setdefault(label, {'latencies': [], 'unanswered': 0, 'errors': 0, 'invalid': 0, 'messages': {}})
+            if elapsed is None:
+                series['unanswered'] += 1
+            else:
+                series['latencies'].append(elapsed)
+            if outcome != 'ok':
+                series['errors' if outcome == 'error' else 'invalid'] += 1
+                series['messages'][message] = series['messages'].get(message, 0) + 1
+
+    def take_action():
+        with lock:
+            if remaining[0] is not None:
+                if remaining[0] <= 0:
+                    return False
+                remaining[0] -= 1
+        return time.perf_counter() < deadline
+
+    def worker(worker_id):
+        rng = random.Random(seed * 1000 + worker_id)
+        while take_action():
+            run_action(rng.choices(actions, weights)[0], rng, scenario, base_url, record)
+            if think_time:
+                time.sleep(rng.expovariate(1 / think_time))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - start
+
+def summarize(samples, elapsed):
+    """Per-label request counts, errors, throughput and latency percentiles in ms."""
+    summary = {}
+    for label, series in sorted(samples.items()):
+        latencies = np.array(series['latencies']) * 1000
+        # Requests that got no response have no latency but still count
+        requests = len(latencies) + series['unanswered']
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (np.nan, np.nan, np.nan)
+        summary[label] = {
+            'requests': int(requests),
+            'errors': series['errors'],
+            'invalid': series['invalid'],
+            'throughput_rps': requests / elapsed if elapsed else 0.0,
+            'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99),
+            'max_ms': float(latencies.max()) if len(latencies) else float('nan'),
+            'messages': series['messages'],
+        }
+    return summary
+
+def print_summary(summary, elapsed, concurrency):
+    total = sum(row['requests'] for row in summary.values())
+    print(f"\n{total} requests in {elapsed:.1f}s from {concurrency} workers ({total / elapsed:.1f} req/s)\n")
+    print(f"{'endpoint':<38} {'requests':>9} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7} {'invalid':>8}")
+    for label, row in summary.items():
+        print(f"{label:<38} {row['requests']:>9} {row['throughput_rps']:>8.1f} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+              f"{row['p99_ms']:>9.1f} {row['max_ms']:>9.1f} {row['errors']:>7} {row['invalid']:>8}")
+    for label, row in summary.items():
+        for message, count in row['messages'].items():
+            print(f"  {label}: {count} x {message}")
+
+# --- Local server ---
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(port, processes=1, data_path=None, log_file=None):
+    """Start pharmacy_app on 127.0.0.1:<port> in a child process."""
+    env = dict(os.environ)
+    if data_path:
+        env['PATIENT_DATA_PATH'] = os.path.abspath(data_path)
+    return subprocess.Popen([sys.executable, '-c', _SERVER_SCRIPT, str(port), str(processes)], cwd=REPO_DIR, env=env,
+                            stdout=log_file or subprocess.DEVNULL, stderr=subprocess.STDOUT)
+
+def wait_until_ready(base_url, server, timeout=STARTUP_TIMEOUT):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"server exited with code {server.returncode} during startup")
+        try:
+            status, _, _ = send_request(base_url, 'GET', '/api/clusters')
+            if status == 200:
+                return
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"server did not answer within {timeout}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a mix of dashboard requests against pharmacy_app at a given concurrency.")
+    parser.add_argument('--url', help="Base URL of a running server (default: start pharmacy_app locally)")
+    parser.add_argument('--data', help="PATIENT_DATA_PATH for the local server, e.g. a benchmarks/.data dataset")
+    parser.add_argument('--processes', type=int, default=1, help="Worker processes of the local server (1 = threaded)")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="Simulated users sending requests at once")
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help="Seconds to run")
+    parser.add_argument('--actions', type=int, help="Stop after this many user actions")
+    parser.add_argument('--think-time', type=float, default=0.0, help="Mean pause between a user's actions in seconds")
+    parser.add_argument('--upload-file', default=UPLOAD_SOURCE, help="CSV whose first rows are uploaded to /api/predict_pharmacy")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the request mix")
+    parser.add_argument('--output', help="Write the summary as JSON to this path")
+    parser.add_argument('--server-log', help="Write the local server's output to this file")
+    args = parser.parse_args()
+
+    server = None
+    log_file = open(args.server_log, 'w') if args.server_log else None
+    exports_dir = os.path.join(REPO_DIR, "static", "exports")
+    exports_before = set(os.listdir(exports_dir)) if os.path.isdir(exports_dir) else set()
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        print(f"Starting pharmacy_app on {base_url} ({args.processes} process{'es' if args.processes > 1 else ''})")
+        server = start_server(port, args.processes, args.data, log_file)
+
+    try:
+        wait_until_ready(base_url, server)
+        scenario = load_scenario_data(base_url, args.upload_file, UPLOAD_ROWS)
+        print(f"Running {args.concurrency} workers for {args.duration:g}s against {len(scenario['counties'])} counties")
+        samples, elapsed = run_load(base_url, scenario, args.concurrency, args.duration, args.actions, args.think_time, args.seed)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+            # Prediction exports written by the upload requests
+            if os.path.isdir(exports_dir):
+                for file_name in set(os.listdir(exports_dir)) - exports_before:
+                    os.remove(os.path.join(exports_dir, file_name))
+        if log_file:
+            log_file.close()
+
+    summary = summarize(samples, elapsed)
+    print_summary(summary, elapsed, args.concurrency)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'url': base_url, 'concurrency': args.concurrency, 'elapsed_seconds': elapsed,
+                       'endpoints': summary}, f, indent=2)
+        print(f"\nSummary written to {args.output}")
+    if any(row['errors'] or row['invalid'] for row in summary.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+
+import os
+import sys
+import json
+import time
+import shutil
+import runpy
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from bench_data import (
+    BENCH_DIR, REPO_DIR, DATA_ROOT, parse_count, count_label, build_dataset, raw_patients_path,
+    RAW_PATIENTS_FILE, TRAINING_FILE, TRAINED_MODEL_FILE, PHARMACIES_SEMICOLON_FILE,
+    UPLOAD_FILE, APP_DATA_FILE,
+)
+
+# --- Configuration ---
+DEFAULT_PATIENTS = "10k,1m,10m"
+DEFAULT_PHARMACIES = "10,60k"
+DEFAULT_ITERATIONS = 5
+DEFAULT_THRESHOLD = 0.20
+DEFAULT_TIMEOUT = 4 * 3600
+# Differences below this are timer noise, never a regression
+MIN_REGRESSION_SECONDS = 0.05
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+RESULT_PREFIX = "BENCH_RESULT "
+
+ADD_DISTANCE_OUTPUT = "patients_with_pharmacy_miles.csv"
+CLUSTER_REPORT_FILE = r"C:\Users\703401801\Desktop\cluster_analysis_results.xlsx"
+EXPORTS_DIR = os.path.join(REPO_DIR, "static", "exports")
+
+def peak_rss_mb():
+    """Peak resident set size of this process and its finished children, in MB."""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def _require_output(path):
+    # The legacy scripts print their errors instead of raising
+    if not os.path.exists(path):
+        raise RuntimeError(f"expected output {path} was not written")
+
+def _remove(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+# --- Offline entry points ---
+# Each runs in the dataset directory and returns the number of rows it processed.
+
+def bench_calculate_nearest_pharmacy(scale):
+    from calculate_distances import calculate_nearest_pharmacy
+    _remove("county_pharmacy_distances.csv")
+    calculate_nearest_pharmacy()
+    _require_output("county_pharmacy_distances.csv")
+    return scale['patients']
+
+def bench_add_distance_to_pharmacy(scale):
+    import add_distance_to_pharmacy
+    _remove(ADD_DISTANCE_OUTPUT)
+    patients_path = raw_patients_path(scale['patients'], scale['data_root'])
+    sys.argv = ["add_distance_to_pharmacy.py", patients_path, PHARMACIES_SEMICOLON_FILE, ADD_DISTANCE_OUTPUT]
+    add_distance_to_pharmacy.main()
+    _require_output(ADD_DISTANCE_OUTPUT)
+    return scale['patients']
+
+def bench_find_optimal_pharmacies(scale):
+    from find_optimal_pharmacies import find_optimal_pharmacies_with_jitter
+    find_optimal_pharmacies_with_jitter()
+    return scale['patients']
+
+def bench_tabulate_cluster_analysis(scale):
+    from analyze_clusters import tabulate_cluster_analysis
+    _remove(CLUSTER_REPORT_FILE)
+    tabulate_cluster_analysis()
+    _require_output(CLUSTER_REPORT_FILE)
+    return scale['patients']
+
+def bench_train_model(scale):
+    _remove(TRAINED_MODEL_FILE)
+    runpy.run_path(os.path.join(REPO_DIR, "train_classification_model.py"), run_name="__main__")
+    _require_output(TRAINED_MODEL_FILE)
+    return scale['patients']
+
+def bench_score_model(scale):
+    import joblib
+    import pandas as pd
+    from medical_history import parse_medical_history, multihot_frame
+    if not os.path.exists(TRAINED_MODEL_FILE):
+        raise RuntimeError("no trained model; run the train_model benchmark first")
+    model = joblib.load(TRAINED_MODEL_FILE)
+    df = pd.read_csv(TRAINING_FILE)
+    history_matrix, history_vocabulary = parse_medical_history(df['medical_history'])
+    history_features = multihot_frame(history_matrix, history_vocabulary, index=df.index)
+    X = pd.concat([df.drop(columns=['medical_history', 'Pharmacy_Found_Class']), history_features], axis=1)
+    model.predict_proba(X)
+    return len(X)
+
+def _prepare_find_optimal(scale):
+    # The script rewrites its input in place, so every run starts from the generator output
+    shutil.copyfile(raw_patients_path(scale['patients'], scale['data_root']), RAW_PATIENTS_FILE)
+
+# name -> run function, optional setup (untimed) and default patient cap.
+# Caps keep the quadratic or row-at-a-time scripts out of the largest
+# scales; `max_pairs` limits patients x pharmacies instead.
+OFFLINE_CASES = {
+    'calculate_nearest_pharmacy': {'run': bench_calculate_nearest_pharmacy},
+    'add_distance_to_pharmacy': {'run': bench_add_distance_to_pharmacy, 'max_pairs': 50_000_000},
+    'find_optimal_pharmacies': {'run': bench_find_optimal_pharmacies, 'setup': _prepare_find_optimal,
+                                'max_patients': 1_000_000},
+    'tabulate_cluster_analysis': {'run': bench_tabulate_cluster_analysis},
+    'train_model': {'run': bench_train_model, 'max_patients': 1_000_000},
+    'score_model': {'run': bench_score_model, 'max_patients': 1_000_000},
+}
+
+# --- Flask endpoints ---
+ENDPOINT_CASE = 'endpoints'
+
+def _endpoint_requests(app_module):
+    county = app_module.unique_county_names[0] if app_module.unique_county_names else ""
+    clusters = app_module.clusters_payload()['clusters']
+    upload_path = os.path.abspath(UPLOAD_FILE)
+
+    def upload():
+        return {'data': {'file': (open(upload_path, 'rb'), UPLOAD_FILE)}, 'content_type': 'multipart/form-data'}
+
+    return [
+        ('GET /api/counties', 'get', '/api/counties', dict),
+        ('GET /api/counties/search', 'get', f"/api/counties/search?q={county[:2]}", dict),
+        ('POST /api/find_pharmacies', 'post', '/api/find_pharmacies', lambda: {'json': {'county': county}}),
+        ('GET /api/clusters', 'get', '/api/clusters', dict),
+        ('POST /api/cluster_analysis', 'post', '/api/cluster_analysis',
+         lambda: {'json': {'cluster': clusters[0] if clusters else None}}),
+        ('GET /api/pharmacy_deserts', 'get', '/api/pharmacy_deserts', dict),
+        ('GET /api/pharmacy_deserts?bbox', 'get', '/api/pharmacy_deserts?bbox=-125,24,-66,50&zoom=4', dict),
+        ('GET /api/pharmacy_suggestions', 'get', '/api/pharmacy_suggestions', dict),
+        ('POST /api/predict_pharmacy', 'post', '/api/predict_pharmacy', upload),
+        ('GET /metrics', 'get', '/metrics', dict),
+    ]
+
+def _clear_app_caches(app_module):
+    from response_cache import clear_response_cache
+    clear_response_cache()
+    app_module._payload_cache.clear()
+    app_module._grid_cache.clear()
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+def bench_endpoints(scale, iterations):
+    """
+    Time every endpoint through the Flask test client. Cold timings clear
+    the response and payload caches before each request; warm timings repeat
+    the request against the filled caches. Yields one result per endpoint.
+    """
+    os.environ['PATIENT_DATA_PATH'] = os.path.abspath(APP_DATA_FILE)
+    start = time.perf_counter()
+    import pharmacy_app
+    startup = time.perf_counter() - start
+    rows = len(pharmacy_app.patient_data_df)
+    yield {'benchmark': 'app_startup', 'wall_seconds': startup, 'rows': rows, 'peak_rss_mb': peak_rss_mb()}
+
+    client = pharmacy_app.app.test_client()
+    exports_before = set(os.listdir(EXPORTS_DIR)) if os.path.isdir(EXPORTS_DIR) else set()
+    try:
+        for name, method, path, request_kwargs in _endpoint_requests(pharmacy_app):
+            cold, warm = [], []
+            for _ in range(iterations):
+                for timings, clear in ((cold, True), (warm, False)):
+                    if clear:
+                        _clear_app_caches(pharmacy_app)
+                    request_start = time.perf_counter()
+                    response = getattr(client, method)(path, **request_kwargs())
+                    response.get_data()
+                    timings.append(time.perf_counter() - request_start)
+                    if response.status_code >= 400:
+                        raise RuntimeError(f"{name} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+            wall = _median(cold)
+            yield {
+                'benchmark': name, 'wall_seconds': wall, 'warm_seconds': _median(warm), 'rows': rows,
+                'requests_per_second': 1 / _median(warm) if _median(warm) else None, 'peak_rss_mb': peak_rss_mb(),
+            }
+    finally:
+        # Prediction exports written by the upload requests
+        if os.path.isdir(EXPORTS_DIR):
+            for file_name in set(os.listdir(EXPORTS_DIR)) - exports_before:
+                os.remove(os.path.join(EXPORTS_DIR, file_name))
+
+# --- Worker ---
+def run_worker(case, scale, iterations):
+    """Run one case in this process and print its results as tagged JSON lines."""
+    os.chdir(scale['data_dir'])
+    if case == ENDPOINT_CASE:
+        results = bench_endpoints(scale, iterations)
+    else:
+        spec = OFFLINE_CASES[case]
+        if spec.get('setup'):
+            spec['setup'](scale)
+        start = time.perf_counter()
+        rows = spec['run'](scale)
+        results = [{'benchmark': case, 'wall_seconds': time.perf_counter() - start, 'rows': rows,
+                    'peak_rss_mb': peak_rss_mb()}]
+    for result in results:
+        print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+def skip_reason(case, scale, use_caps):
+    spec = OFFLINE_CASES.get(case, {})
+    if not use_caps:
+        return None
+    if spec.get('max_patients') and scale['patients'] > spec['max_patients']:
+        return f"patients above cap of {spec['max_patients']}"
+    if spec.get('max_pairs') and scale['patients'] * scale['pharmacies'] > spec['max_pairs']:
+        return f"patients x pharmacies above cap of {spec['max_pairs']}"
+    return None
+
+def run_case(case, scale, iterations, timeout, verbose):
+    """Run a case in a fresh interpreter so its peak RSS and imports are its own."""
+    command = [sys.executable, os.path.abspath(__file__), '--run-one', case,
+               '--patients', str(scale['patients']), '--pharmacies', str(scale['pharmacies']),
+               '--data-root', scale['data_root'], '--iterations', str(iterations)]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get('PYTHONPATH')])))
+    try:
+        proc = subprocess.run(command, cwd=scale['data_dir'], env=env, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return [{'benchmark': case, 'status': 'failed', 'note': f"timed out after {timeout}s"}]
+    if verbose:
+        sys.stdout.write(proc.stdout)
+        sys.stderr.write(proc.stderr)
+    results = [json.loads(line[len(RESULT_PREFIX):]) for line in proc.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+    for result in results:
+        result['status'] = 'ok'
+    if proc.returncode != 0:
+        error_lines = proc.stderr.strip().splitlines()
+        results.append({'benchmark': case, 'status': 'failed', 'note': error_lines[-1] if error_lines else f"exit code {proc.returncode}"})
+    return results
+
+# --- Comparison ---
+def result_key(result):
+    return (result['benchmark'], result['patients'], result['pharmacies'])
+
+def compare_results(results, baseline, threshold):
+    """
+    Rows comparing wall time and peak RSS with a baseline run. A benchmark
+    regresses when either grows by more than `threshold` (a fraction).
+    """
+    previous = {result_key(result): result for result in baseline['results'] if result.get('status') == 'ok'}
+    rows = []
+    for result in results:
+        base = previous.get(result_key(result))
+        if result.get('status') != 'ok' or base is None:
+            continue
+        wall_ratio = result['wall_seconds'] / base['wall_seconds'] if base['wall_seconds'] else None
+        regressed = (result['wall_seconds'] > base['wall_seconds'] * (1 + threshold)
+                     and result['wall_seconds'] - base['wall_seconds'] > MIN_REGRESSION_SECONDS)
+        rss_ratio = None
+        if result.get('peak_rss_mb') and base.get('peak_rss_mb'):
+            rss_ratio = result['peak_rss_mb'] / base['peak_rss_mb']
+            regressed = regressed or rss_ratio > 1 + threshold
+        rows.append({'key': result_key(result), 'wall_seconds': result['wall_seconds'], 'baseline_wall_seconds': base['wall_seconds'],
+                     'wall_ratio': wall_ratio, 'rss_ratio': rss_ratio, 'regressed': regressed})
+    return rows
+
+def print_results(results):
+    print(f"\n{'benchmark':<32} {'patients':>9} {'rx':>6} {'wall s':>10} {'rows/s':>12} {'peak MB':>9}  status")
+    for result in results:
+        if result.get('status') == 'ok':
+            rate = f"{result['rows_per_second']:,.0f}" if result.get('rows_per_second') else "-"
+            rss = f"{result['peak_rss_mb']:,.0f}" if result.get('peak_rss_mb') else "-"
+            print(f"{result['benchmark']:<32} {count_label(result['patients']):>9} {count_label(result['pharmacies']):>6} "
+                  f"{result['wall_seconds']:>10.3f} {rate:>12} {rss:>9}  ok")
+        else:
+            print(f"{result['benchmark']:<32} {count_label(result['patients']):>9} {count_label(result['pharmacies']):>6} "
+                  f"{'-':>10} {'-':>12} {'-':>9}  {result['status']}: {result.get('note', '')}")
+
+def print_comparison(rows, threshold):
+    print(f"\nCompared with baseline (threshold {threshold:.0%}):")
+    for row in rows:
+        benchmark, patients, pharmacies = row['key']
+        rss = f"{row['rss_ratio']:.2f}x" if row['rss_ratio'] else "-"
+        flag = "REGRESSION" if row['regressed'] else ""
+        print(f"  {benchmark:<32} {count_label(patients):>6}/{count_label(pharmacies):<6} "
+              f"{row['baseline_wall_seconds']:.3f}s -> {row['wall_seconds']:.3f}s ({row['wall_ratio'] or 0:.2f}x), rss {rss} {flag}")
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Flask endpoints and offline scripts on synthetic data.")
+    parser.add_argument('--patients', default=DEFAULT_PATIENTS, help="Comma-separated patient counts, e.g. 10k,1m,10m")
+    parser.add_argument('--pharmacies', default=DEFAULT_PHARMACIES, help="Comma-separated pharmacy counts, e.g. 10,60k")
+    parser.add_argument('--cases', help=f"Comma-separated cases to run (default all): {ENDPOINT_CASE}, {', '.join(OFFLINE_CASES)}")
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS, help="Requests per endpoint (median is reported)")
+    parser.add_argument('--no-caps', action='store_true', help="Run capped cases at every scale")
+    parser.add_argument('--data-root', default=DATA_ROOT, help="Where generated datasets are kept between runs")
+    parser.add_argument('--output', help="Results JSON path (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--baseline', help="Earlier results JSON to compare against; exits 1 on regressions")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown or memory growth as a fraction")
+    parser.add_argument('--timeout', type=int, default=DEFAULT_TIMEOUT, help="Seconds allowed per case")
+    parser.add_argument('--verbose', action='store_true', help="Show the output of the benchmarked code")
+    parser.add_argument('--run-one', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        num_patients, num_pharmacies = parse_count(args.patients), parse_count(args.pharmacies)
+        scale = {'patients': num_patients, 'pharmacies': num_pharmacies, 'data_root': args.data_root,
+                 'data_dir': build_dataset(num_patients, num_pharmacies, args.data_root)}
+        run_worker(args.run_one, scale, args.iterations)
+        return
+
+    cases = args.cases.split(',') if args.cases else [ENDPOINT_CASE] + list(OFFLINE_CASES)
+    unknown = [case for case in cases if case != ENDPOINT_CASE and case not in OFFLINE_CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+
+    results = []
+    for num_patients in [parse_count(value) for value in args.patients.split(',')]:
+        for num_pharmacies in [parse_count(value) for value in args.pharmacies.split(',')]:
+            print(f"\n=== {count_label(num_patients)} patients, {count_label(num_pharmacies)} pharmacies ===")
+            build_start = time.perf_counter()
+            data_dir = build_dataset(num_patients, num_pharmacies, args.data_root)
+            print(f"Dataset ready in {time.perf_counter() - build_start:.1f}s: {data_dir}")
+            scale = {'patients': num_patients, 'pharmacies': num_pharmacies, 'data_root': args.data_root, 'data_dir': data_dir}
+            for case in cases:
+                reason = skip_reason(case, scale, not args.no_caps)
+                if reason:
+                    case_results = [{'benchmark': case, 'status': 'skipped', 'note': reason}]
+                else:
+                    print(f"- {case}")
+                    case_results = run_case(case, scale, args.iterations, args.timeout, args.verbose)
+                for result in case_results:
+                    result.update(patients=num_patients, pharmacies=num_pharmacies)
+                    if result.get('status') == 'ok' and result['wall_seconds']:
+                        result['rows_per_second'] = result['rows'] / result['wall_seconds']
+                results.extend(case_results)
+
+    print_results(results)
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+    output_path = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output_path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            comparison = compare_results(results, json.load(f), args.threshold)
+        print_comparison(comparison, args.threshold)
+        if any(row['regressed'] for row in comparison):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 import pandas as pd
 import numpy as np
 from scipy.spatial.distance import cdist
+from county_names import FIPS_COLUMN, fips_codes
 
 def haversine_distance(lon1, lat1, lon2, lat2):
     lon1, lat1, lon2, lat2 = map(np.radians, [lon1, lat1, lon2, lat2])
@@ -12,6 +13,43 @@ def haversine_distance(lon1, lat1, lon2, lat2):
     r = 3956 # Radius of Earth in miles
     return c * r
 
+def compute_county_pharmacy_distances(patient_df, pharmacy_df):
+    """
+    For every distinct county (by FIPS code) in the patient data, find the
+    nearest pharmacy (Y/X columns) to its centroid and the distance in miles.
+    """
+    # --- Data Preparation ---
+    # Get unique county coordinates, one row per county FIPS code
+    county_coords = patient_df.assign(**{FIPS_COLUMN: fips_codes(patient_df)})
+    county_coords = county_coords[['us_county', 'us_state', FIPS_COLUMN, 'correct_county_lat', 'correct_county_lon']].dropna()
+    county_coords = county_coords.drop_duplicates(subset=[FIPS_COLUMN])
+
+    # Prepare pharmacy coordinates
+    pharmacy_coords = pharmacy_df[['Y', 'X']].dropna()
+
+    # --- Distance Calculation ---
+    # Do not convert to radians here, the haversine function will do it.
+    county_deg = county_coords[['correct_county_lat', 'correct_county_lon']].values
+    pharmacy_deg = pharmacy_coords[['Y', 'X']].values
+
+    # Use a more efficient haversine implementation for cdist
+    dist_matrix = cdist(county_deg, pharmacy_deg, lambda u, v: haversine_distance(v[1], v[0], u[1], u[0]))
+
+    # Find the minimum distance for each county
+    min_distances = dist_matrix.min(axis=1)
+    nearest_pharmacy_indices = dist_matrix.argmin(axis=1)
+
+    # --- Create Final DataFrame ---
+    results_df = county_coords.copy()
+    results_df['distance_to_nearest_pharmacy'] = min_distances
+
+    # Get the details of the nearest pharmacy
+    nearest_pharmacies = pharmacy_coords.join(pharmacy_df[['NAME']]).iloc[nearest_pharmacy_indices]
+    results_df['nearest_pharmacy_name'] = nearest_pharmacies['NAME'].values
+    results_df['nearest_pharmacy_lat'] = nearest_pharmacies['Y'].values
+    results_df['nearest_pharmacy_lon'] = nearest_pharmacies['X'].values
+    return results_df
+
 def calculate_nearest_pharmacy():
     try:
         # Load the patient data with correct coordinates
@@ -22,34 +60,7 @@ def calculate_nearest_pharmacy():
         pharmacy_df = pd.read_csv("Pharmacies.csv")
         print("Successfully loaded pharmacy data.")
 
-        # --- Data Preparation ---
-        # Get unique county coordinates
-        county_coords = patient_df[['us_county', 'us_state', 'correct_county_lat', 'correct_county_lon']].drop_duplicates().dropna()
-
-        # Prepare pharmacy coordinates
-        pharmacy_coords = pharmacy_df[['Y', 'X']].dropna()
-
-        # --- Distance Calculation ---
-        # Do not convert to radians here, the haversine function will do it.
-        county_deg = county_coords[['correct_county_lat', 'correct_county_lon']].values
-        pharmacy_deg = pharmacy_coords[['Y', 'X']].values
-
-        # Use a more efficient haversine implementation for cdist
-        dist_matrix = cdist(county_deg, pharmacy_deg, lambda u, v: haversine_distance(v[1], v[0], u[1], u[0]))
-
-        # Find the minimum distance for each county
-        min_distances = dist_matrix.min(axis=1)
-        nearest_pharmacy_indices = dist_matrix.argmin(axis=1)
-
-        # --- Create Final DataFrame ---
-        results_df = county_coords.copy()
-        results_df['distance_to_nearest_pharmacy'] = min_distances
-        
-        # Get the details of the nearest pharmacy
-        nearest_pharmacies = pharmacy_df.iloc[nearest_pharmacy_indices]
-        results_df['nearest_pharmacy_name'] = nearest_pharmacies['NAME'].values
-        results_df['nearest_pharmacy_lat'] = nearest_pharmacies['Y'].values
-        results_df['nearest_pharmacy_lon'] = nearest_pharmacies['X'].values
+        results_df = compute_county_pharmacy_distances(patient_df, pharmacy_df)
 
         # --- Save to New File ---
         output_filename = "county_pharmacy_distances.csv"
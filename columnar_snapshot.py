@@ -0,0 +1,103 @@
+
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from medical_history import parse_medical_history
+
+# --- Configuration ---
+MANIFEST_FILE = "manifest.json"
+
+def write_snapshot(df, snapshot_dir, multihot_columns=('medical_history',)):
+    """
+    Write a DataFrame as a columnar snapshot: one .npy file per column plus a
+    JSON manifest. Numeric and boolean columns are stored as-is; everything
+    else is stored as int32 category codes with the categories in the manifest.
+    Stringified list columns in `multihot_columns` are additionally parsed
+    once into a multi-hot uint8 matrix with its vocabulary.
+    The snapshot is built in a temporary directory and swapped in at the end.
+    """
+    tmp_dir = snapshot_dir.rstrip(os.sep) + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    manifest = {'rows': int(len(df)), 'columns': {}}
+    for i, col in enumerate(df.columns):
+        file_name = f"col_{i:03d}.npy"
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            np.save(os.path.join(tmp_dir, file_name), series.to_numpy())
+            manifest['columns'][col] = {'kind': 'values', 'file': file_name}
+        else:
+            categorical = series.astype('category')
+            np.save(os.path.join(tmp_dir, file_name), categorical.cat.codes.to_numpy(dtype=np.int32))
+            manifest['columns'][col] = {
+                'kind': 'category',
+                'file': file_name,
+                'categories': [str(c) for c in categorical.cat.categories],
+            }
+
+    manifest['multihot'] = {}
+    for col in multihot_columns:
+        if col in df.columns:
+            matrix, vocabulary = parse_medical_history(df[col])
+            file_name = f"{col}_multihot.npy"
+            np.save(os.path.join(tmp_dir, file_name), matrix)
+            manifest['multihot'][col] = {'file': file_name, 'vocabulary': vocabulary}
+
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f)
+
+    if os.path.exists(snapshot_dir):
+        shutil.rmtree(snapshot_dir)
+    os.replace(tmp_dir, snapshot_dir)
+    return snapshot_dir
+
+def read_manifest(snapshot_dir):
+    with open(os.path.join(snapshot_dir, MANIFEST_FILE), 'r') as f:
+        return json.load(f)
+
+def row_positions(snapshot_dir, column, value):
+    """
+    Positions of the rows whose `column` equals `value`, found by scanning the
+    memory-mapped column alone (category columns compare their int32 codes).
+    """
+    info = read_manifest(snapshot_dir)['columns'][column]
+    values = np.load(os.path.join(snapshot_dir, info['file']), mmap_mode='r')
+    if info['kind'] == 'category':
+        if value not in info['categories']:
+            return np.array([], dtype=np.int64)
+        value = info['categories'].index(value)
+    return np.flatnonzero(values == value)
+
+def load_snapshot(snapshot_dir, columns=None, mmap=True, rows=None):
+    """
+    Load a snapshot back into a DataFrame. Only the requested columns are
+    read, and with `mmap=True` the arrays are memory-mapped so several worker
+    processes can share the same pages instead of each holding a copy.
+    With `rows` (positions, e.g. from row_positions) only those rows are
+    gathered from each column.
+    """
+    manifest = read_manifest(snapshot_dir)
+    columns = columns or list(manifest['columns'])
+    mmap_mode = 'r' if mmap else None
+
+    data = {}
+    for col in columns:
+        info = manifest['columns'][col]
+        values = np.load(os.path.join(snapshot_dir, info['file']), mmap_mode=mmap_mode)
+        if rows is not None:
+            values = values[rows]
+        if info['kind'] == 'category':
+            data[col] = pd.Categorical.from_codes(np.asarray(values), categories=info['categories'])
+        else:
+            data[col] = values
+    return pd.DataFrame(data)
+
+def load_multihot(snapshot_dir, column='medical_history', mmap=True):
+    """Return the (matrix, vocabulary) multi-hot encoding stored for `column`."""
+    info = read_manifest(snapshot_dir)['multihot'][column]
+    matrix = np.load(os.path.join(snapshot_dir, info['file']), mmap_mode='r' if mmap else None)
+    return matrix, info['vocabulary']
@@ -1,5 +1,6 @@
 
 import pandas as pd
+from county_names import fips_codes
 
 def count_unique_counties():
     files_to_check = {
@@ -25,12 +26,12 @@ def count_unique_counties():
                 print(f"\nCould not find standard county/state columns in: {file_path}")
                 continue
 
-            # Clean and count unique county-state pairs
-            df[county_col] = df[county_col].astype(str).str.strip().str.lower()
-            df[state_col] = df[state_col].astype(str).str.strip().str.lower()
-            
-            unique_count = len(df[[county_col, state_col]].drop_duplicates())
-            
+            # Count distinct counties by FIPS code; names the crosswalk cannot
+            # resolve are counted as distinct county/state pairs
+            geoids = fips_codes(df, county_col, state_col)
+            unresolved = df.loc[geoids.isna(), [county_col, state_col]].drop_duplicates()
+            unique_count = geoids.nunique() + len(unresolved)
+
             print(f"\nFile: {file_path} ({description})")
             print(f"Number of unique counties: {unique_count}")
 
@@ -0,0 +1,286 @@
+
+import os
+import re
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GAZETTEER_PATH = os.path.join(BASE_DIR, "2025_Gaz_counties_national.txt")
+COUNTY_CACHE_DIR = os.path.join(BASE_DIR, ".county_cache")
+FIPS_COLUMN = 'county_fips_code'
+FIPS_ARRAY_SIZE = 100000  # one slot per 5-digit state+county code; slot 0 is never a county
+
+STATE_NAME_TO_USPS = {
+    'Alabama': 'AL', 'Alaska': 'AK', 'Arizona': 'AZ', 'Arkansas': 'AR', 'California': 'CA',
+    'Colorado': 'CO', 'Connecticut': 'CT', 'Delaware': 'DE', 'District of Columbia': 'DC', 'Florida': 'FL',
+    'Georgia': 'GA', 'Hawaii': 'HI', 'Idaho': 'ID', 'Illinois': 'IL', 'Indiana': 'IN',
+    'Iowa': 'IA', 'Kansas': 'KS', 'Kentucky': 'KY', 'Louisiana': 'LA', 'Maine': 'ME',
+    'Maryland': 'MD', 'Massachusetts': 'MA', 'Michigan': 'MI', 'Minnesota': 'MN', 'Mississippi': 'MS',
+    'Missouri': 'MO', 'Montana': 'MT', 'Nebraska': 'NE', 'Nevada': 'NV', 'New Hampshire': 'NH',
+    'New Jersey': 'NJ', 'New Mexico': 'NM', 'New York': 'NY', 'North Carolina': 'NC', 'North Dakota': 'ND',
+    'Ohio': 'OH', 'Oklahoma': 'OK', 'Oregon': 'OR', 'Pennsylvania': 'PA', 'Puerto Rico': 'PR',
+    'Rhode Island': 'RI', 'South Carolina': 'SC', 'South Dakota': 'SD', 'Tennessee': 'TN', 'Texas': 'TX',
+    'Utah': 'UT', 'Vermont': 'VT', 'Virginia': 'VA', 'Washington': 'WA', 'West Virginia': 'WV',
+    'Wisconsin': 'WI', 'Wyoming': 'WY'
+}
+USPS_TO_STATE_NAME = {usps: name for name, usps in STATE_NAME_TO_USPS.items()}
+
+# County-equivalent suffixes, longest first so "city and borough" wins over "borough".
+# "city and" covers names already truncated by the old suffix stripping ("Sitka City And").
+_SUFFIX_PATTERN = re.compile(
+    r"\s+(city and borough|census area|municipality|borough|county|parish|city and)$"
+)
+_NON_ALNUM_PATTERN = re.compile(r"[^a-z0-9]")
+_SAINT_PATTERN = re.compile(r"^saint\s+|^ste?\.?\s+")
+
+# Renamed or merged counties that still appear in older extracts: (USPS, old name) -> GEOID
+LEGACY_COUNTY_NAMES = {
+    ('AK', "Valdez-Cordova Census Area"): 2063,   # split into Chugach and Copper River in 2019
+    ('AK', "Wade Hampton Census Area"): 2158,     # renamed Kusilvak in 2015
+    ('AK', "Prince of Wales-Outer Ketchikan Census Area"): 2198,
+    ('SD', "Shannon County"): 46102,              # renamed Oglala Lakota in 2015
+    ('VA', "Bedford city"): 51019,                # merged into Bedford County in 2013
+}
+
+_table_cache = {}
+_dimension_cache = {}
+_alias_index_cache = {}
+_geometry_cache = {}
+
+def clean_county_name(county_name):
+    """
+    Lower-case a county name, collapse whitespace and drop the county-equivalent
+    suffix ("Kodiak Island Borough" -> "kodiak island").
+    """
+    if not isinstance(county_name, str):
+        return county_name
+    county_name = " ".join(county_name.lower().split())
+    return _SUFFIX_PATTERN.sub("", county_name)
+
+def county_key(county_name):
+    """
+    Matching key for a county name: the cleaned name with "Saint"/"St." folded
+    and all punctuation and spaces removed, so "St. Louis", "Saint Louis" and
+    "DeKalb"/"De Kalb" variants collide.
+    """
+    county_name = clean_county_name(county_name)
+    if not isinstance(county_name, str):
+        return None
+    county_name = _SAINT_PATTERN.sub("st ", county_name)
+    return _NON_ALNUM_PATTERN.sub("", county_name)
+
+# The same aliases as (USPS, county key) -> GEOID
+LEGACY_ALIASES = {(usps, county_key(name)): geoid for (usps, name), geoid in LEGACY_COUNTY_NAMES.items()}
+
+def state_usps(state):
+    """Two-letter USPS code for a state given its name or code (any case)."""
+    if not isinstance(state, str):
+        return None
+    state = " ".join(state.split())
+    if state.upper() in USPS_TO_STATE_NAME:
+        return state.upper()
+    for name, usps in STATE_NAME_TO_USPS.items():
+        if name.lower() == state.lower():
+            return usps
+    return None
+
+def _table_cache_path(gazetteer_path):
+    name = os.path.splitext(os.path.basename(gazetteer_path))[0]
+    return os.path.join(COUNTY_CACHE_DIR, f"{name}.npz")
+
+def load_gazetteer_table(gazetteer_path=GAZETTEER_PATH):
+    """
+    County table from the Census Gazetteer as a dict of aligned arrays:
+    geoid, usps, name, lat, lon, aland_sqmi, awater_sqmi.
+
+    The text file is parsed once and kept as a binary .npz under
+    .county_cache; later loads read the arrays directly. The cache is rebuilt
+    whenever the Gazetteer file's size or mtime changes.
+    """
+    if gazetteer_path in _table_cache:
+        return _table_cache[gazetteer_path]
+
+    stat = os.stat(gazetteer_path)
+    source_stamp = np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+    cache_path = _table_cache_path(gazetteer_path)
+    table = None
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            if np.array_equal(cached['source_stamp'], source_stamp):
+                table = {key: cached[key] for key in cached.files if key != 'source_stamp'}
+
+    if table is None:
+        gaz = pd.read_csv(gazetteer_path, sep='|', dtype={'GEOID': str})
+        gaz.columns = gaz.columns.str.strip()
+        table = {
+            'geoid': gaz['GEOID'].astype(np.int32).to_numpy(),
+            'usps': gaz['USPS'].to_numpy(dtype=str),
+            'name': gaz['NAME'].to_numpy(dtype=str),
+            'lat': gaz['INTPTLAT'].to_numpy(dtype=np.float64),
+            'lon': gaz['INTPTLONG'].to_numpy(dtype=np.float64),
+            'aland_sqmi': gaz['ALAND_SQMI'].to_numpy(dtype=np.float64),
+            'awater_sqmi': gaz['AWATER_SQMI'].to_numpy(dtype=np.float64),
+        }
+        os.makedirs(COUNTY_CACHE_DIR, exist_ok=True)
+        tmp_path = cache_path + ".tmp.npz"
+        np.savez(tmp_path, source_stamp=source_stamp, **table)
+        os.replace(tmp_path, cache_path)
+
+    _table_cache[gazetteer_path] = table
+    return table
+
+def load_county_dimension(gazetteer_path=GAZETTEER_PATH):
+    """
+    Canonical county dimension keyed by integer FIPS GEOID, built from the
+    Census Gazetteer: geoid, usps, state_name, county_name, county_key.
+    """
+    if gazetteer_path not in _dimension_cache:
+        table = load_gazetteer_table(gazetteer_path)
+        dimension = pd.DataFrame({
+            'geoid': table['geoid'].astype(int),
+            'usps': table['usps'].astype(object),
+            'county_name': table['name'].astype(object),
+        })
+        dimension.insert(2, 'state_name', dimension['usps'].map(USPS_TO_STATE_NAME))
+        dimension['county_key'] = dimension['county_name'].map(county_key)
+        _dimension_cache[gazetteer_path] = dimension
+    return _dimension_cache[gazetteer_path]
+
+def county_geometry(gazetteer_path=GAZETTEER_PATH):
+    """
+    FIPS-indexed Gazetteer arrays: lat, lon (internal point), aland_sqmi and
+    awater_sqmi. Index with fips_positions(...) to broadcast onto rows;
+    counties missing from the Gazetteer read NaN.
+    """
+    if gazetteer_path not in _geometry_cache:
+        table = load_gazetteer_table(gazetteer_path)
+        _geometry_cache[gazetteer_path] = {
+            column: fips_array(table['geoid'], table[column])
+            for column in ('lat', 'lon', 'aland_sqmi', 'awater_sqmi')
+        }
+    return _geometry_cache[gazetteer_path]
+
+def build_alias_index(dimension=None):
+    """
+    (USPS, county key) -> GEOID lookup covering the canonical names, the full
+    names with their suffix (e.g. "yakutatcityandborough") and LEGACY_ALIASES.
+    """
+    if dimension is None:
+        if GAZETTEER_PATH not in _alias_index_cache:
+            _alias_index_cache[GAZETTEER_PATH] = build_alias_index(load_county_dimension())
+        return _alias_index_cache[GAZETTEER_PATH]
+    index = dict(LEGACY_ALIASES)
+    for geoid, usps, county_name, key in dimension[['geoid', 'usps', 'county_name', 'county_key']].itertuples(index=False):
+        index[(usps, _NON_ALNUM_PATTERN.sub("", county_name.lower()))] = geoid
+        index[(usps, key)] = geoid
+    return index
+
+def legacy_name_aliases(display_names):
+    """
+    Old "County, State" names from LEGACY_COUNTY_NAMES mapped to the entry of
+    `display_names` ("Oglala Lakota County, South Dakota") that now covers the
+    same GEOID. Aliases whose county is not among display_names are left out.
+    """
+    display_names = list(display_names)
+    parts = [name.rpartition(",") for name in display_names]
+    geoids = county_geoids(pd.Series([county.strip() for county, _, _ in parts], dtype=object),
+                           [state.strip() for _, _, state in parts])
+    by_geoid = {}
+    for geoid, name in zip(geoids, display_names):
+        if not pd.isna(geoid):
+            by_geoid.setdefault(int(geoid), name)
+    return {
+        f"{name}, {USPS_TO_STATE_NAME[usps]}": by_geoid[geoid]
+        for (usps, name), geoid in LEGACY_COUNTY_NAMES.items()
+        if geoid in by_geoid
+    }
+
+def clean_county_names(counties):
+    """Vectorized clean_county_name: each distinct name is cleaned once."""
+    counties = pd.Series(counties)
+    codes, uniques = pd.factorize(counties)
+    cleaned = np.array([clean_county_name(name) for name in uniques] + [np.nan], dtype=object)
+    return pd.Series(cleaned[codes], index=counties.index)
+
+def clean_state_names(states):
+    """Lower-cased, whitespace-collapsed state names; each distinct value is cleaned once."""
+    states = pd.Series(states)
+    codes, uniques = pd.factorize(states)
+    cleaned = np.array([" ".join(str(state).lower().split()) for state in uniques] + [np.nan], dtype=object)
+    return pd.Series(cleaned[codes], index=states.index)
+
+def county_geoids(counties, states, alias_index=None):
+    """
+    Resolve county/state name columns to integer GEOIDs.
+
+    Each distinct (county, state) pair is normalized once, so the cost scales
+    with the number of counties rather than the number of rows. Returns a
+    nullable Int64 Series aligned with `counties`; unmatched pairs are <NA>.
+    """
+    if alias_index is None:
+        alias_index = build_alias_index()
+    counties = pd.Series(counties)
+    states = pd.Series(np.asarray(states, dtype=object), index=counties.index)
+
+    county_codes, county_uniques = pd.factorize(counties)
+    state_codes, state_uniques = pd.factorize(states)
+    # Missing values factorize to -1; shift state codes so each pair packs into one int
+    stride = len(state_uniques) + 1
+    pair_codes, pair_uniques = pd.factorize(county_codes.astype(np.int64) * stride + (state_codes + 1))
+
+    resolved = np.full(len(pair_uniques), -1, dtype=np.int64)
+    for i, pair in enumerate(pair_uniques):
+        county_idx, state_idx = divmod(int(pair), stride)
+        state_idx -= 1
+        if county_idx < 0 or state_idx < 0:
+            continue
+        usps = state_usps(state_uniques[state_idx])
+        geoid = alias_index.get((usps, county_key(county_uniques[county_idx])))
+        if geoid is not None:
+            resolved[i] = geoid
+
+    geoids = pd.Series(resolved[pair_codes], index=counties.index, dtype='Int64')
+    return geoids.mask(geoids < 0)
+
+def fips_codes(df, county_col='us_county', state_col='us_state'):
+    """
+    Integer county FIPS code per row as a nullable Int64 Series. Uses the
+    county_fips_code column when the table carries one and only falls back to
+    resolving county/state names for rows where it is missing.
+    """
+    if FIPS_COLUMN in df.columns:
+        fips = pd.to_numeric(df[FIPS_COLUMN], errors='coerce').astype('Int64')
+        missing = fips.isna()
+        if missing.any():
+            fips[missing] = county_geoids(df.loc[missing, county_col], df.loc[missing, state_col])
+        return fips
+    return county_geoids(df[county_col], df[state_col])
+
+def fips_positions(fips):
+    """
+    Index array into FIPS-indexed lookup arrays. Missing and out-of-range
+    codes point at slot 0, so lookups read the array's fill_value.
+    """
+    codes = pd.to_numeric(pd.Series(fips), errors='coerce').fillna(0)
+    return codes.where((codes >= 1) & (codes < FIPS_ARRAY_SIZE), 0).to_numpy(dtype=np.int64)
+
+def fips_array(fips, values, fill_value=np.nan):
+    """
+    Dense lookup array with out[fips] = value, so a county-level column can be
+    broadcast onto patient rows with out[fips_positions(patient_fips)].
+    The first value wins when a code repeats; unknown codes read fill_value.
+    """
+    positions = fips_positions(fips)
+    values = np.asarray(values)
+    dtype = object if values.dtype == object else np.result_type(values.dtype, np.asarray(fill_value).dtype)
+    out = np.full(FIPS_ARRAY_SIZE, fill_value, dtype=dtype)
+    out[positions[::-1]] = values[::-1]
+    out[0] = fill_value
+    return out
+
+def fips_counts(fips):
+    """Number of rows per county FIPS code as a FIPS-indexed int64 array."""
+    counts = np.bincount(fips_positions(fips), minlength=FIPS_ARRAY_SIZE)
+    counts[0] = 0
+    return counts
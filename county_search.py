@@ -0,0 +1,78 @@
+
+import re
+from bisect import bisect_left
+import numpy as np
+from county_names import clean_county_name, state_usps
+
+# --- Configuration ---
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+_NON_ALNUM_PATTERN = re.compile(r"[^a-z0-9]+")
+_SAINT_PATTERN = re.compile(r"^(saint|st|ste)\s+")
+
+def normalize_search_text(text):
+    """Lower-case and reduce punctuation to single spaces: 'St. Louis, Missouri' -> 'st louis missouri'."""
+    return " ".join(_NON_ALNUM_PATTERN.sub(" ", str(text).lower()).split())
+
+def _county_variants(county_name):
+    """Spellings a user may start typing: the full name, without its suffix, and St./Saint forms."""
+    variants = {normalize_search_text(county_name), normalize_search_text(clean_county_name(county_name))}
+    for variant in list(variants):
+        match = _SAINT_PATTERN.match(variant)
+        if match:
+            rest = variant[match.end():]
+            variants.update({f"st {rest}", f"saint {rest}"})
+    return variants
+
+def _search_keys(display_name):
+    county_name, _, state_name = display_name.rpartition(",")
+    if not county_name:
+        county_name, state_name = state_name, ""
+    state_variants = {normalize_search_text(state_name)}
+    usps = state_usps(state_name)
+    if usps:
+        state_variants.add(usps.lower())
+    return {f"{county} {state}".strip() for county in _county_variants(county_name) for state in state_variants}
+
+def build_county_search_index(names, weights, aliases=None):
+    """
+    Prefix index over county display names ("Autauga County, Alabama"). Every
+    normalized spelling of a name (with and without the county suffix,
+    St./Saint, full state name or USPS code) plus the same spellings of any
+    `aliases` ("Shannon County, South Dakota" -> display name) is stored in
+    one sorted key array, so a prefix query is two bisects. `weights` (e.g.
+    patient counts) rank the matches.
+    """
+    names = list(names)
+    position = {name: i for i, name in enumerate(names)}
+    entries = {(key, i) for i, name in enumerate(names) for key in _search_keys(name)}
+    for alias, name in (aliases or {}).items():
+        if name in position:
+            entries.update((key, position[name]) for key in _search_keys(alias))
+    entries = sorted(entries)
+    return {
+        'keys': [key for key, _ in entries],
+        'targets': np.array([target for _, target in entries], dtype=np.int64),
+        'names': names,
+        'weights': np.asarray(weights, dtype=np.int64),
+    }
+
+def search_counties(index, query, limit=DEFAULT_LIMIT):
+    """
+    Up to `limit` display names whose spellings start with `query`, most
+    weighted first (ties alphabetical). An empty query returns the overall
+    top counties. Returns a list of (name, weight) pairs.
+    """
+    prefix = normalize_search_text(query)
+    if prefix:
+        lo = bisect_left(index['keys'], prefix)
+        hi = bisect_left(index['keys'], prefix + "\uffff", lo)
+        candidates = np.unique(index['targets'][lo:hi])
+    else:
+        candidates = np.arange(len(index['names']))
+    if not len(candidates):
+        return []
+    # Names are sorted case-insensitively, so position breaks weight ties alphabetically
+    order = np.lexsort((candidates, -index['weights'][candidates]))[:limit]
+    return [(index['names'][i], int(index['weights'][i])) for i in candidates[order]]
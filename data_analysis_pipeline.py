@@ -1,9 +1,19 @@
 
-import csv
+import json
 import sqlite3
+import threading
+from urllib.request import pathname2url
+from datetime import datetime, timezone
+import numpy as np
 import pandas as pd
-import google.generativeai as genai
 import os
+from file_hashing import file_sha256
+import nlq_cache
+
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
 
 # --- Configuration ---
 CSV_FILE_PATH = "C:\\Users\\703401801\\Desktop\\Cigna\\synthetic_patient_data_with_distances.csv"
@@ -11,55 +21,285 @@ DB_FILE_PATH = "C:\\Users\\703401801\\Desktop\\Cigna\\patient_data.db"
 TABLE_NAME = "patient_data"
 GEMINI_API_KEY = "YOUR_GEMINI_API_KEY" # <<< IMPORTANT: Replace with your actual Gemini API Key
 
-# Configure Gemini API
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel('gemini-pro')
+# --- Model backend ---
+# Any callable taking a prompt and returning the response text can replace
+# gemini_backend (e.g. a local stub when testing without an API key).
+_gemini_model = None
+
+def gemini_backend(prompt):
+    global _gemini_model
+    if _gemini_model is None:
+        if genai is None:
+            raise ImportError("The Gemini backend requires google-generativeai (pip install google-generativeai).")
+        # Configure Gemini API
+        genai.configure(api_key=GEMINI_API_KEY)
+        _gemini_model = genai.GenerativeModel('gemini-pro')
+    return _gemini_model.generate_content(prompt).text
+
+model_backend = gemini_backend
 
 # --- Part 1: CSV to SQLite ---
+LOAD_CHUNK_SIZE = 100000
+METADATA_TABLE = "_load_metadata"
+UPSERT_KEY = 'patient_id'
+# Key types the upsert can match on exactly; other key types rebuild the table
+UPSERT_KEY_TYPES = ('INTEGER', 'TEXT')
+INDEXED_COLUMNS = ['us_county', 'us_state', 'group', 'distance_to_nearest_pharmacy_miles',
+                   'distance_to_nearest_pharmacy', 'distance_to_pharmacy_km']
+_BOOLEAN_STRINGS = {'True': 1, 'False': 0, 'true': 1, 'false': 0}
+
+def _chunk_column_type(series):
+    """SQLite type for one chunk of a column: BOOLEAN, INTEGER, REAL or TEXT (None if all null)."""
+    values = series.dropna()
+    if values.empty:
+        return None
+    if pd.api.types.is_bool_dtype(values):
+        return 'BOOLEAN'
+    if pd.api.types.is_integer_dtype(values):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(values):
+        # pandas reads integer columns with gaps as float
+        return 'INTEGER' if (values == values.round()).all() else 'REAL'
+    if values.isin(_BOOLEAN_STRINGS.keys()).all():
+        return 'BOOLEAN'
+    return 'TEXT'
+
+def _merge_types(current, new):
+    if current is None or current == new:
+        return new or current
+    if new is None:
+        return current
+    if {current, new} <= {'INTEGER', 'REAL'}:
+        return 'REAL'
+    return 'TEXT'
+
+def infer_column_types(csv_file_path, chunk_size=LOAD_CHUNK_SIZE):
+    """
+    Infer a SQLite type per column from the whole file, chunk by chunk.
+    Columns that mix types are widened (INTEGER + REAL -> REAL, anything else
+    -> TEXT); columns that are entirely empty become TEXT.
+    """
+    types = {}
+    for chunk in pd.read_csv(csv_file_path, chunksize=chunk_size, encoding='utf-8'):
+        for col in chunk.columns:
+            types[col] = _merge_types(types.get(col), _chunk_column_type(chunk[col]))
+    return {col: sql_type or 'TEXT' for col, sql_type in types.items()}
+
+def _sqlite_frame(chunk, column_types):
+    """Convert a chunk to plain Python values matching the typed schema (None for missing)."""
+    converted = {}
+    for col, sql_type in column_types.items():
+        series = chunk[col]
+        if sql_type == 'BOOLEAN':
+            series = series.map(lambda v: _BOOLEAN_STRINGS.get(v, v) if isinstance(v, str) else v)
+            series = series.astype('Int64')
+        elif sql_type == 'INTEGER':
+            series = series.astype('Int64')
+        elif sql_type == 'TEXT':
+            series = series.where(series.isna(), series.astype(str))
+        converted[col] = series.astype(object).where(series.notna(), None)
+    return pd.DataFrame(converted)
+
+def _sqlite_rows(chunk, column_types):
+    """Plain Python tuples in column_types order, ready for executemany."""
+    return _sqlite_frame(chunk, column_types).itertuples(index=False, name=None)
+
+def _insert_sql(table_name, headers):
+    """INSERT with an explicit column list, so values never depend on the table's column order."""
+    columns = ", ".join(f'"{col}"' for col in headers)
+    return f'INSERT INTO "{table_name}" ({columns}) VALUES ({", ".join("?" for _ in headers)})'
+
+def _load_metadata(cursor, table_name):
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS "{METADATA_TABLE}" ('
+                   'table_name TEXT PRIMARY KEY, source_path TEXT, source_sha256 TEXT, '
+                   'row_count INTEGER, column_types TEXT, loaded_at TEXT)')
+    row = cursor.execute(f'SELECT source_sha256, row_count, column_types FROM "{METADATA_TABLE}" WHERE table_name = ?',
+                         (table_name,)).fetchone()
+    if row is None:
+        return None
+    return {'source_sha256': row[0], 'row_count': row[1], 'column_types': json.loads(row[2])}
+
+def _table_row_count(cursor, table_name):
+    exists = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)).fetchone()
+    if not exists:
+        return None
+    return cursor.execute(f'SELECT COUNT(*) FROM "{table_name}"').fetchone()[0]
+
+def _has_unique_key(cursor, table_name):
+    return cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?",
+                          (f"uq_{table_name}_{UPSERT_KEY}",)).fetchone() is not None
+
+def _rebuild_table(cursor, csv_file_path, table_name, column_types):
+    """Drop and bulk load the table, then build the indexes. Returns the row count."""
+    headers = list(column_types)
+    columns_with_types = [f'"{col}" {column_types[col]}' for col in headers]
+    insert_sql = _insert_sql(table_name, headers)
+
+    cursor.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+    cursor.execute(f'CREATE TABLE "{table_name}" ({", ".join(columns_with_types)})')
+    row_count = 0
+    for chunk in pd.read_csv(csv_file_path, chunksize=LOAD_CHUNK_SIZE, encoding='utf-8'):
+        cursor.executemany(insert_sql, _sqlite_rows(chunk, column_types))
+        row_count += len(chunk)
+
+    # Indexes are built after the bulk load, which is much cheaper than maintaining them per insert
+    for col in INDEXED_COLUMNS:
+        if col in column_types:
+            cursor.execute(f'CREATE INDEX "idx_{table_name}_{col}" ON "{table_name}" ("{col}")')
+    if UPSERT_KEY in column_types:
+        try:
+            cursor.execute(f'CREATE UNIQUE INDEX "uq_{table_name}_{UPSERT_KEY}" ON "{table_name}" ("{UPSERT_KEY}")')
+        except sqlite3.IntegrityError:
+            print(f"Note: {UPSERT_KEY} is not unique in {csv_file_path}; later loads will rebuild instead of upserting.")
+    return row_count
+
+def _upsert_table(cursor, csv_file_path, table_name, column_types):
+    """
+    Upsert every source row by patient_id, rewriting only rows whose values
+    changed, and delete rows whose patient_id is no longer in the source.
+    The seen keys are collected in a temp table of the key column's own type,
+    holding the same converted values that are written to the table.
+    Returns (row_count, changed_rows).
+    """
+    headers = list(column_types)
+    update_columns = [col for col in headers if col != UPSERT_KEY]
+    upsert_sql = (
+        _insert_sql(table_name, headers) + ' '
+        f'ON CONFLICT("{UPSERT_KEY}") DO UPDATE SET '
+        + ", ".join(f'"{col}" = excluded."{col}"' for col in update_columns)
+        + " WHERE " + " OR ".join(f'"{table_name}"."{col}" IS NOT excluded."{col}"' for col in update_columns)
+    )
+    cursor.execute(f'CREATE TEMP TABLE "_source_ids" ("{UPSERT_KEY}" {column_types[UPSERT_KEY]} PRIMARY KEY)')
+    row_count = 0
+    changed = 0
+    for chunk in pd.read_csv(csv_file_path, chunksize=LOAD_CHUNK_SIZE, encoding='utf-8'):
+        rows = _sqlite_frame(chunk, column_types)
+        changes_before = cursor.connection.total_changes
+        cursor.executemany(upsert_sql, rows.itertuples(index=False, name=None))
+        changed += cursor.connection.total_changes - changes_before
+        cursor.executemany(f'INSERT OR IGNORE INTO "_source_ids" ("{UPSERT_KEY}") VALUES (?)',
+                           ((key,) for key in rows[UPSERT_KEY] if key is not None))
+        row_count += len(chunk)
+    cursor.execute(f'DELETE FROM "{table_name}" WHERE "{UPSERT_KEY}" NOT IN (SELECT "{UPSERT_KEY}" FROM "_source_ids")')
+    changed += cursor.rowcount
+    cursor.execute('DROP TABLE "_source_ids"')
+    return row_count, changed
+
 def csv_to_sqlite(csv_file_path, db_file_path, table_name):
+    """
+    Load a CSV into a typed SQLite table, idempotently.
+
+    The source file's sha256 and row count are recorded in a metadata table.
+    When they match the previous load the call returns immediately. When the
+    schema is unchanged, rows are upserted by patient_id (only changed rows
+    are rewritten and removed ids are deleted); otherwise the table is rebuilt.
+    Column types are inferred from the data, rows are bulk inserted with
+    executemany inside a single transaction (WAL journal, synchronous=OFF
+    while loading) and the filter columns used by generated queries are
+    indexed after a rebuild.
+    """
+    source_sha256 = file_sha256(csv_file_path)
+
     conn = sqlite3.connect(db_file_path)
     cursor = conn.cursor()
-
-    # Read CSV to infer schema and get column names
-    with open(csv_file_path, 'r', newline='', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        headers = next(reader) # Get header row
-
-    # Create CREATE TABLE statement
-    # For simplicity, initially assume all columns are TEXT.
-    # In a more robust solution, you'd infer types more carefully.
-    columns_with_types = [f'"{col}" TEXT' for col in headers]
-    create_table_sql = f'CREATE TABLE IF NOT EXISTS {table_name} ({ ", ".join(columns_with_types) })"
-    cursor.execute(create_table_sql)
+    cursor.execute("PRAGMA journal_mode=WAL")
+    metadata = _load_metadata(cursor, table_name)
+    current_rows = _table_row_count(cursor, table_name)
     conn.commit()
+    if metadata and metadata['source_sha256'] == source_sha256 and metadata['row_count'] == current_rows:
+        conn.close()
+        print(f"{csv_file_path} is unchanged since the last load ({current_rows} rows in {table_name}); skipping.")
+        return
 
-    # Use pandas to read CSV in chunks and insert into SQLite
-    # This is more efficient for large files than row-by-row insertion
-    chunk_size = 10000
-    for chunk in pd.read_csv(csv_file_path, chunksize=chunk_size, encoding='utf-8'):
-        # Rename columns to match the SQL table (pandas might alter names)
-        chunk.columns = headers 
-        chunk.to_sql(table_name, conn, if_exists='append', index=False)
-    
-    conn.close()
-    print(f"Data from {csv_file_path} successfully loaded into {db_file_path} table {table_name}.")
+    column_types = infer_column_types(csv_file_path)
+    # Same columns in the same order with the same types; a reordered header rebuilds
+    can_upsert = (
+        metadata is not None and current_rows is not None
+        and list(metadata['column_types'].items()) == list(column_types.items())
+        and column_types.get(UPSERT_KEY) in UPSERT_KEY_TYPES
+        and _has_unique_key(cursor, table_name)
+    )
+
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-200000")
+    try:
+        cursor.execute("BEGIN")
+        if can_upsert:
+            row_count, changed = _upsert_table(cursor, csv_file_path, table_name, column_types)
+            action = f"upserted by {UPSERT_KEY} ({changed} rows changed)"
+        else:
+            row_count = _rebuild_table(cursor, csv_file_path, table_name, column_types)
+            action = "loaded"
+        cursor.execute(
+            f'INSERT OR REPLACE INTO "{METADATA_TABLE}" '
+            '(table_name, source_path, source_sha256, row_count, column_types, loaded_at) VALUES (?, ?, ?, ?, ?, ?)',
+            (table_name, os.path.abspath(csv_file_path), source_sha256, row_count,
+             json.dumps(column_types), datetime.now(timezone.utc).isoformat(timespec='seconds'))
+        )
+        conn.commit()
+        cursor.execute(f'ANALYZE "{table_name}"')
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        conn.close()
+    print(f"Data from {csv_file_path} successfully {action} into {db_file_path} table {table_name}.")
 
 # --- Part 2: Get SQLite Table Schema ---
+_read_connections = threading.local()
+_schema_cache = {}
+
+def get_read_connection(db_file_path):
+    """
+    Persistent read-only connection for the calling thread. The database is
+    opened with mode=ro and PRAGMA query_only, so generated SQL can never
+    modify it, and each thread reuses its own connection (and sqlite3's
+    prepared-statement cache) instead of reconnecting per query.
+    """
+    connections = getattr(_read_connections, 'by_path', None)
+    if connections is None:
+        connections = _read_connections.by_path = {}
+    if db_file_path not in connections:
+        uri = f"file:{pathname2url(os.path.abspath(db_file_path))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, cached_statements=256)
+        conn.execute("PRAGMA query_only=ON")
+        connections[db_file_path] = conn
+    return connections[db_file_path]
+
 def get_sqlite_schema(db_file_path, table_name):
-    conn = sqlite3.connect(db_file_path)
-    cursor = conn.cursor()
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    schema_info = cursor.fetchall()
-    conn.close()
-    
+    """
+    Schema description for the prompt. Cached per table and only re-read
+    when SQLite's schema_version changes (i.e. after the table is rebuilt).
+    """
+    conn = get_read_connection(db_file_path)
+    schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    cache_key = (os.path.abspath(db_file_path), table_name)
+    cached = _schema_cache.get(cache_key)
+    if cached and cached[0] == schema_version:
+        return cached[1]
+
+    schema_info = conn.execute(f'PRAGMA table_info("{table_name}")').fetchall()
     schema_str = f"Table: {table_name}\nColumns:\n"
     for col_info in schema_info:
         cid, name, ctype, notnull, dflt_value, pk = col_info
         schema_str += f"- {name} ({ctype})\n"
+    _schema_cache[cache_key] = (schema_version, schema_str)
     return schema_str
 
 # --- Part 3: NLQ to SQL using Gemini ---
-def nlq_to_sql(natural_language_query, db_schema, gemini_api_key):
+def nlq_to_sql(natural_language_query, db_schema, gemini_api_key, backend=None, use_cache=True):
+    """
+    Translate a question to SQL. Translations are cached per schema in
+    nlq_cache, so repeated (or trivially reworded) questions skip the model.
+    """
+    if use_cache:
+        cached_sql = nlq_cache.lookup(natural_language_query, db_schema)
+        if cached_sql is not None:
+            print("Using cached SQL translation.")
+            return cached_sql
+
     prompt = f"""
     You are a helpful assistant that translates natural language queries into SQL queries.
     You are working with a SQLite database.
@@ -74,40 +314,210 @@ def nlq_to_sql(natural_language_query, db_schema, gemini_api_key):
     SQL Query:
     """
     
-    response = model.generate_content(prompt)
-    sql_query = response.text.strip()
+    sql_query = (backend or model_backend)(prompt).strip()
+    if use_cache:
+        nlq_cache.store(natural_language_query, db_schema, sql_query)
     return sql_query
 
 # --- Part 4: Execute SQL Query ---
-def execute_sql_query(db_file_path, sql_query):
-    conn = sqlite3.connect(db_file_path)
-    cursor = conn.cursor()
+FETCH_BATCH_SIZE = 1000
+MAX_ROWS_FOR_LLM = 100
+
+def execute_sql_query(db_file_path, sql_query, max_rows=MAX_ROWS_FOR_LLM, on_batch=None):
+    """
+    Run a query on the thread's read-only connection and stream the result
+    with fetchmany. Only the first max_rows rows are kept (all rows when
+    max_rows is None); the rest are counted, not stored. `on_batch`, if
+    given, is called with (column_names, batch) for every fetched batch, so
+    the whole result can be summarized without holding it in memory.
+    Returns (column_names, rows, total_rows), or (None, error_message, 0).
+    """
+    cursor = get_read_connection(db_file_path).cursor()
     try:
         cursor.execute(sql_query)
-        results = cursor.fetchall()
-        column_names = [description[0] for description in cursor.description]
-        return column_names, results
+        column_names = [description[0] for description in cursor.description or []]
+        rows = []
+        total_rows = 0
+        while True:
+            batch = cursor.fetchmany(FETCH_BATCH_SIZE)
+            if not batch:
+                break
+            total_rows += len(batch)
+            if on_batch is not None:
+                on_batch(column_names, batch)
+            if max_rows is None:
+                rows.extend(batch)
+            elif len(rows) < max_rows:
+                rows.extend(batch[:max_rows - len(rows)])
+        return column_names, rows, total_rows
     except sqlite3.Error as e:
-        return None, f"SQL Error: {e}"
+        return None, f"SQL Error: {e}", 0
     finally:
-        conn.close()
+        cursor.close()
 
 # --- Part 5: Get Insights from Queried Data using Gemini ---
-def get_insights_from_data(queried_data_columns, queried_data_rows, natural_language_query, gemini_api_key):
+PROFILE_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+PROFILE_TOP_K = 5
+# Values counted per column; beyond this only the most frequent are kept
+# and distinct counts become lower bounds
+PROFILE_TRACKED_VALUES = 1000
+# Quantiles are computed from a uniform sample of at most this many rows
+QUANTILE_SAMPLE_ROWS = 10000
+# Rows of the result shown to the model next to its profile
+PROFILE_SAMPLE_ROWS = 20
+# Categorical columns with at most this many values are used for group-by deltas
+GROUP_MAX_CARDINALITY = 60
+GROUP_MAX_COLUMNS = 3
+
+def _round(value):
+    return round(float(value), 4) if value is not None and pd.notna(value) else None
+
+def new_result_profile(seed=0):
+    """Empty running profile, filled batch by batch with update_result_profile."""
+    return {'rows': 0, 'columns': {}, 'groups': {}, 'sample': None, 'rng': np.random.default_rng(seed)}
+
+def _new_column_state():
+    return {'non_null': 0, 'numeric': None, 'n': 0, 'mean': 0.0, 'm2': 0.0, 'min': None, 'max': None,
+            'counts': {}, 'counts_truncated': False}
+
+def _merge_moments(state, values):
+    # Chan et al.'s pairwise update of count, mean and sum of squared deviations
+    n_b = len(values)
+    if not n_b:
+        return
+    mean_b = float(values.mean())
+    m2_b = float(((values - mean_b) ** 2).sum())
+    n = state['n'] + n_b
+    delta = mean_b - state['mean']
+    state['m2'] += m2_b + delta * delta * state['n'] * n_b / n
+    state['mean'] += delta * n_b / n
+    state['n'] = n
+    state['min'] = float(values.min()) if state['min'] is None else min(state['min'], float(values.min()))
+    state['max'] = float(values.max()) if state['max'] is None else max(state['max'], float(values.max()))
+
+def _merge_counts(state, series):
+    counts = state['counts']
+    for value, count in series.value_counts().items():
+        counts[value] = counts.get(value, 0) + int(count)
+    if len(counts) > PROFILE_TRACKED_VALUES:
+        kept = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:PROFILE_TRACKED_VALUES]
+        state['counts'] = dict(kept)
+        state['counts_truncated'] = True
+
+def update_result_profile(profile, column_names, batch):
+    """
+    Fold one fetched batch into the running profile. Per column this keeps
+    non-null counts, running count/mean/variance/min/max for numeric values
+    and a bounded value counter; per low-cardinality column, per-group sums
+    and counts of the numeric columns; and a bounded uniform row sample for
+    quantiles. Memory stays bounded however many rows the query returns.
+    """
+    df = pd.DataFrame.from_records(batch, columns=column_names)
+    profile['rows'] += len(df)
+    numeric = {}
+    for col in df.columns:
+        state = profile['columns'].setdefault(col, _new_column_state())
+        values = df[col].dropna()
+        if values.empty:
+            continue
+        state['non_null'] += len(values)
+        _merge_counts(state, values)
+        if state['numeric'] is not False:
+            # SQLite returns numbers as int/float; numeric-looking TEXT stays categorical
+            if pd.api.types.infer_dtype(values, skipna=True) in ('integer', 'floating', 'mixed-integer-float'):
+                state['numeric'] = True
+                _merge_moments(state, values.astype(float))
+                numeric[col] = df[col].astype(float)
+            else:
+                state['numeric'] = False
+
+    if numeric:
+        numeric_df = pd.DataFrame(numeric)
+        for col in df.columns:
+            state = profile['columns'][col]
+            if state['counts_truncated'] or len(state['counts']) > GROUP_MAX_CARDINALITY:
+                profile['groups'].pop(col, None)
+                continue
+            grouped = numeric_df.groupby(df[col], observed=True).agg(['sum', 'count'])
+            previous = profile['groups'].get(col)
+            profile['groups'][col] = grouped if previous is None else previous.add(grouped, fill_value=0)
+
+        # Bottom-k on uniform random keys keeps a uniform sample across batches
+        numeric_df['_key'] = profile['rng'].random(len(numeric_df))
+        sample = numeric_df if profile['sample'] is None else pd.concat([profile['sample'], numeric_df], ignore_index=True)
+        profile['sample'] = sample.nsmallest(QUANTILE_SAMPLE_ROWS, '_key') if len(sample) > QUANTILE_SAMPLE_ROWS else sample
+
+def finish_result_profile(profile):
+    """
+    Compact profile for the insight prompt: row count, per-column counts,
+    numeric mean/std/min/max and quantiles, top-k categories and, for
+    low-cardinality categorical columns, how each group's numeric means
+    differ from the overall mean.
+    """
+    result = {'rows': profile['rows'], 'columns': {}}
+    numeric_columns = [col for col, state in profile['columns'].items() if state['numeric']]
+    sample = profile['sample']
+    if sample is not None and len(sample) < profile['rows']:
+        result['quantile_sample_rows'] = int(len(sample))
+    for col, state in profile['columns'].items():
+        column_profile = {'non_null': state['non_null'], 'distinct': len(state['counts'])}
+        if state['counts_truncated']:
+            column_profile['distinct_is_lower_bound'] = True
+        if col in numeric_columns:
+            column_profile.update({
+                'mean': _round(state['mean']),
+                'std': _round((state['m2'] / (state['n'] - 1)) ** 0.5) if state['n'] > 1 else None,
+                'min': _round(state['min']),
+                'max': _round(state['max']),
+            })
+            quantiles = sample[col].quantile(PROFILE_QUANTILES)
+            column_profile['quantiles'] = {f"p{int(q * 100)}": _round(quantiles[q]) for q in PROFILE_QUANTILES}
+        else:
+            top = sorted(state['counts'].items(), key=lambda item: item[1], reverse=True)[:PROFILE_TOP_K]
+            column_profile['top'] = {str(value): count for value, count in top}
+        result['columns'][col] = column_profile
+
+    # Group-by deltas: mean of each numeric column per group minus the overall mean
+    group_columns = [
+        col for col, state in profile['columns'].items()
+        if col not in numeric_columns and col in profile['groups'] and 1 < len(state['counts']) <= GROUP_MAX_CARDINALITY
+    ][:GROUP_MAX_COLUMNS]
+    if numeric_columns and group_columns:
+        result['group_deltas'] = {}
+        for group_col in group_columns:
+            grouped = profile['groups'][group_col]
+            column_deltas = {}
+            for col in numeric_columns:
+                if (col, 'sum') not in grouped.columns:
+                    continue
+                means = grouped[(col, 'sum')] / grouped[(col, 'count')].where(grouped[(col, 'count')] > 0)
+                ranked = (means - profile['columns'][col]['mean']).dropna().sort_values()
+                extremes = pd.concat([ranked.head(PROFILE_TOP_K // 2 + 1), ranked.tail(PROFILE_TOP_K // 2 + 1)])
+                column_deltas[col] = {str(group): _round(delta) for group, delta in extremes[~extremes.index.duplicated()].items()}
+            result['group_deltas'][group_col] = column_deltas
+    return result
+
+def get_insights_from_data(queried_data_columns, queried_data_rows, natural_language_query, gemini_api_key, total_rows=None,
+                           backend=None, result_profile=None):
     if not queried_data_rows:
         return "No data returned from the SQL query to generate insights."
 
     # Summarize data if it's too large for the LLM context window
-    # For simplicity, we'll take a sample of rows and include column names
-    max_rows_for_llm = 100
-    data_summary = f"Data from query (first {min(len(queried_data_rows), max_rows_for_llm)} rows):\n"
+    # execute_sql_query already keeps only the first MAX_ROWS_FOR_LLM rows;
+    # total_rows is the full result size. With a profile of the full result
+    # only a small sample of rows is sent alongside it.
+    total_rows = total_rows if total_rows is not None else len(queried_data_rows)
+    shown_rows = queried_data_rows[:PROFILE_SAMPLE_ROWS if result_profile else MAX_ROWS_FOR_LLM]
+    data_summary = ""
+    if result_profile:
+        data_summary += ("Profile of the full result (per-column counts, quantiles and top categories, "
+                         f"group-by deltas from the overall mean):\n{json.dumps(result_profile)}\n\n")
+    data_summary += f"Data from query (first {len(shown_rows)} rows):\n"
     data_summary += f"Columns: {queried_data_columns}\n"
-    for i, row in enumerate(queried_data_rows):
-        if i >= max_rows_for_llm:
-            break
+    for i, row in enumerate(shown_rows):
         data_summary += f"Row {i+1}: {row}\n"
-    if len(queried_data_rows) > max_rows_for_llm:
-        data_summary += f"... (truncated, {len(queried_data_rows) - max_rows_for_llm} more rows)\n"
+    if total_rows > len(shown_rows):
+        data_summary += f"... (truncated, {total_rows - len(shown_rows)} more rows)\n"
 
     prompt = f"""
     You are a helpful assistant that provides insights from data.
@@ -120,8 +530,7 @@ def get_insights_from_data(queried_data_columns, queried_data_rows, natural_lang
     Focus on trends, anomalies, and actionable recommendations.
     """
     
-    response = model.generate_content(prompt)
-    insights = response.text.strip()
+    insights = (backend or model_backend)(prompt).strip()
     return insights
 
 # --- Main Execution ---
@@ -153,15 +562,19 @@ if __name__ == "__main__":
 
         # 4. Execute SQL Query
         print("\nExecuting SQL query...")
-        columns, results = execute_sql_query(DB_FILE_PATH, sql_query)
+        result_profile = new_result_profile()
+        columns, results, total_rows = execute_sql_query(DB_FILE_PATH, sql_query, on_batch=lambda cols, batch: update_result_profile(result_profile, cols, batch))
 
         if columns is None:
             print(f"Error executing SQL query: {results}")
+            # Don't keep serving a translation that fails
+            nlq_cache.discard(natural_language_query, db_schema)
         else:
-            print(f"Query returned {len(results)} rows.")
-            # 5. Get Insights from Queried Data
+            print(f"Query returned {total_rows} rows.")
+            # 5. Get Insights from a profile of the full result and a sample of its rows
             print("\nGenerating insights from queried data using Gemini...")
-            insights = get_insights_from_data(columns, results, natural_language_query, GEMINI_API_KEY)
+            insights = get_insights_from_data(columns, results, natural_language_query, GEMINI_API_KEY, total_rows,
+                                              result_profile=finish_result_profile(result_profile))
             print("\n--- Insights from Gemini ---")
             print(insights)
             print("----------------------------")
@@ -0,0 +1,238 @@
+
+import os
+import sys
+import re
+import json
+import shutil
+import hashlib
+import argparse
+import urllib.request
+from datetime import datetime, timezone
+import pandas as pd
+from file_hashing import file_sha256
+
+# --- Configuration ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, ".dataset_cache")
+LOCK_FILE = os.path.join(BASE_DIR, "datasets.lock.json")
+DOWNLOAD_BLOCK_SIZE = 1 << 20
+
+# Remote datasets the scripts depend on: name -> source URL and read_csv options.
+# Checksums are pinned in datasets.lock.json, which is committed with the
+# code. `pin <name> <sha256>` records a checksum verified outside the cache;
+# a dataset without a pin is only cached when prefetched or imported with --pin.
+DATASETS = {
+    'us_county_latlng': {
+        'url': "https://gist.githubusercontent.com/russellsamora/12be4f9f574e92413ea3f92ce1bc58e6/raw/us_county_latlng.csv",
+        'read_csv': {},
+    },
+    'us_cities_states_counties': {
+        'url': "https://raw.githubusercontent.com/grammakov/USA-cities-and-states/master/us_cities_states_counties.csv",
+        'read_csv': {'on_bad_lines': 'skip'},
+    },
+}
+
+_frame_cache = {}
+
+def _raw_path(name):
+    return os.path.join(CACHE_DIR, f"{name}.raw")
+
+def _frame_path(name):
+    return os.path.join(CACHE_DIR, f"{name}.pkl")
+
+def _meta_path(name):
+    return os.path.join(CACHE_DIR, f"{name}.json")
+
+def _dataset(name):
+    if name not in DATASETS:
+        raise KeyError(f"Unknown dataset '{name}'. Known datasets: {', '.join(sorted(DATASETS))}")
+    return DATASETS[name]
+
+def load_lock():
+    try:
+        with open(LOCK_FILE, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_lock(lock):
+    with open(LOCK_FILE, 'w') as f:
+        json.dump(lock, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def _read_meta(name):
+    try:
+        with open(_meta_path(name), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def _copy_and_hash(source, dest_path):
+    """Stream `source` (a file object) into dest_path, returning its sha256."""
+    digest = hashlib.sha256()
+    tmp_path = dest_path + ".tmp"
+    with open(tmp_path, 'wb') as out:
+        for block in iter(lambda: source.read(DOWNLOAD_BLOCK_SIZE), b''):
+            digest.update(block)
+            out.write(block)
+    os.replace(tmp_path, dest_path)
+    return digest.hexdigest()
+
+def _store(name, source, origin, pin=False):
+    """
+    Copy a raw dataset into the cache, verify it against the pinned checksum
+    and save the parsed frame as a pickle. A dataset with no pin is rejected
+    unless `pin` is set, in which case its checksum is recorded in the lock.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    raw_path = _raw_path(name)
+    sha256 = _copy_and_hash(source, raw_path)
+
+    lock = load_lock()
+    pinned = lock.get(name)
+    if pinned and pinned != sha256:
+        os.remove(raw_path)
+        raise ValueError(f"Checksum mismatch for dataset '{name}': expected {pinned}, got {sha256}")
+    if not pinned and not pin:
+        os.remove(raw_path)
+        raise ValueError(
+            f"Dataset '{name}' has no pinned checksum in {os.path.basename(LOCK_FILE)} (downloaded sha256 {sha256}). "
+            f"Check the source, then rerun with --pin to record it"
+        )
+    if not pinned:
+        lock[name] = sha256
+        save_lock(lock)
+        print(f"Pinned {name} to sha256 {sha256} in {os.path.basename(LOCK_FILE)}")
+
+    df = pd.read_csv(raw_path, **_dataset(name)['read_csv'])
+    df.to_pickle(_frame_path(name))
+    with open(_meta_path(name), 'w') as f:
+        json.dump({
+            'sha256': sha256,
+            'frame_sha256': file_sha256(_frame_path(name)),
+            'origin': origin,
+            'rows': int(len(df)),
+            'fetched_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }, f, indent=2)
+    _frame_cache.pop(name, None)
+    return df
+
+def prefetch(name, timeout=60, pin=False):
+    """Download a registered dataset into the local cache."""
+    url = _dataset(name)['url']
+    print(f"Fetching {name} from {url}")
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        df = _store(name, response, url, pin=pin)
+    print(f"Cached {name}: {len(df)} rows")
+    return df
+
+def import_file(name, file_path, pin=False):
+    """Seed the cache from a local copy of a dataset (for air-gapped machines)."""
+    _dataset(name)
+    with open(file_path, 'rb') as source:
+        df = _store(name, source, os.path.abspath(file_path), pin=pin)
+    print(f"Cached {name} from {file_path}: {len(df)} rows")
+    return df
+
+def load_dataset(name):
+    """
+    Return a registered dataset as a DataFrame from the local cache. Nothing
+    is fetched here: a dataset missing from the cache, or one whose cached raw
+    file no longer hashes to the pin, raises FileNotFoundError naming the
+    prefetch command to run. A dataset with no pin raises ValueError. The
+    pickle is re-parsed from the verified raw file if it no longer matches
+    the digest recorded when it was written.
+    """
+    if name in _frame_cache:
+        return _frame_cache[name].copy()
+
+    _dataset(name)
+    pinned = load_lock().get(name)
+    if not pinned:
+        raise ValueError(
+            f"Dataset '{name}' has no pinned checksum in {os.path.basename(LOCK_FILE)}. "
+            f"Run: python dataset_cache.py prefetch --pin {name}"
+        )
+    meta = _read_meta(name)
+    raw_path = _raw_path(name)
+    if meta is None or not os.path.exists(raw_path):
+        raise FileNotFoundError(
+            f"Dataset '{name}' is not cached. Run: python dataset_cache.py prefetch {name}"
+        )
+    if file_sha256(raw_path) != pinned:
+        raise FileNotFoundError(
+            f"Cached dataset '{name}' does not match its pinned checksum. Run: python dataset_cache.py prefetch {name}"
+        )
+
+    frame_path = _frame_path(name)
+    if not os.path.exists(frame_path) or file_sha256(frame_path) != meta.get('frame_sha256'):
+        print(f"Rebuilding the cached frame for {name} from its verified raw file")
+        df = pd.read_csv(raw_path, **_dataset(name)['read_csv'])
+        df.to_pickle(frame_path)
+        meta['frame_sha256'] = file_sha256(frame_path)
+        with open(_meta_path(name), 'w') as f:
+            json.dump(meta, f, indent=2)
+        _frame_cache[name] = df
+    else:
+        _frame_cache[name] = pd.read_pickle(frame_path)
+    return _frame_cache[name].copy()
+
+def pin_checksum(name, sha256):
+    """
+    Record a checksum obtained independently of the cache (e.g. from a
+    reviewed download) in the lock file, replacing any previous pin.
+    """
+    _dataset(name)
+    sha256 = sha256.strip().lower()
+    if not re.fullmatch(r"[0-9a-f]{64}", sha256):
+        raise ValueError(f"'{sha256}' is not a sha256 hex digest")
+    lock = load_lock()
+    lock[name] = sha256
+    save_lock(lock)
+    print(f"Pinned {name} to sha256 {sha256} in {os.path.basename(LOCK_FILE)}")
+
+def list_datasets():
+    lock = load_lock()
+    for name in sorted(DATASETS):
+        meta = _read_meta(name)
+        status = f"cached, {meta['rows']} rows, fetched {meta['fetched_at']}" if meta else "not cached"
+        print(f"- {name}: {status}")
+        print(f"    pinned sha256: {lock.get(name, 'not pinned')}")
+
+def clear_cache():
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+    _frame_cache.clear()
+    print(f"Removed {CACHE_DIR}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the local cache of remote county datasets.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    prefetch_parser = subparsers.add_parser('prefetch', help="Download datasets into the cache")
+    prefetch_parser.add_argument('names', nargs='*', help="Datasets to fetch (default: all)")
+    prefetch_parser.add_argument('--pin', action='store_true', help="Record the checksum of datasets that have no pin yet")
+    import_parser = subparsers.add_parser('import', help="Seed the cache from a local file")
+    import_parser.add_argument('name')
+    import_parser.add_argument('file_path')
+    import_parser.add_argument('--pin', action='store_true', help="Record the checksum if the dataset has no pin yet")
+    pin_parser = subparsers.add_parser('pin', help="Record a checksum verified outside the cache")
+    pin_parser.add_argument('name')
+    pin_parser.add_argument('sha256')
+    subparsers.add_parser('list', help="Show cached datasets and pinned checksums")
+    subparsers.add_parser('clear', help="Delete the local cache")
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'prefetch':
+            for dataset_name in args.names or sorted(DATASETS):
+                prefetch(dataset_name, pin=args.pin)
+        elif args.command == 'import':
+            import_file(args.name, args.file_path, pin=args.pin)
+        elif args.command == 'pin':
+            pin_checksum(args.name, args.sha256)
+        elif args.command == 'list':
+            list_datasets()
+        else:
+            clear_cache()
+    except (KeyError, ValueError, OSError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
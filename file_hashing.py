@@ -0,0 +1,12 @@
+import hashlib
+
+# --- Configuration ---
+HASH_BLOCK_SIZE = 1 << 20
+
+def file_sha256(path):
+    """Hex sha256 of a file's contents, read in HASH_BLOCK_SIZE blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -2,28 +2,39 @@
 import pandas as pd
 import numpy as np
 
+# Define the imputation values
+MONTANA_AVG_DISTANCE = 15.42
+IMPUTATION_NAME = "Estimated - Montana Average"
+
+def impute_missing_distances(df):
+    """
+    Fill missing nearest pharmacy distances with the Montana average.
+    Returns the imputed frame and the number of rows that were filled.
+    """
+    df = df.copy()
+
+    # Find the rows where distance is missing
+    missing_mask = df['distance_to_nearest_pharmacy'].isnull()
+    num_missing = int(missing_mask.sum())
+
+    if num_missing > 0:
+        # Impute the missing values
+        df.loc[missing_mask, 'distance_to_nearest_pharmacy'] = MONTANA_AVG_DISTANCE
+        df.loc[missing_mask, 'nearest_pharmacy_name'] = IMPUTATION_NAME
+        # Ensure the other related columns are empty (NaN)
+        df.loc[missing_mask, 'nearest_pharmacy_lat'] = np.nan
+        df.loc[missing_mask, 'nearest_pharmacy_lon'] = np.nan
+    return df, num_missing
+
 def fill_missing_distances():
     try:
         # Load the data file that has the 9 missing records
         df = pd.read_csv("patient_data_with_full_distances.csv")
 
-        # Define the imputation values
-        montana_avg_distance = 15.42
-        imputation_name = "Estimated - Montana Average"
-
-        # Find the rows where distance is missing
-        missing_mask = df['distance_to_nearest_pharmacy'].isnull()
-        num_missing = missing_mask.sum()
+        df, num_missing = impute_missing_distances(df)
 
         if num_missing > 0:
-            print(f"Found {num_missing} records with missing distance information. Proceeding with imputation.")
-
-            # Impute the missing values
-            df.loc[missing_mask, 'distance_to_nearest_pharmacy'] = montana_avg_distance
-            df.loc[missing_mask, 'nearest_pharmacy_name'] = imputation_name
-            # Ensure the other related columns are empty (NaN)
-            df.loc[missing_mask, 'nearest_pharmacy_lat'] = np.nan
-            df.loc[missing_mask, 'nearest_pharmacy_lon'] = np.nan
+            print(f"Found {num_missing} records with missing distance information. Imputed them with the Montana average.")
 
             # --- Save to New File ---
             output_filename = "patient_data_with_imputed_distances.csv"
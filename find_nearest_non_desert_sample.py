@@ -2,14 +2,14 @@
 import pandas as pd
 import numpy as np
 from geopy.distance import geodesic
+from dataset_cache import load_dataset
 
 # Load the first 5 rows of the patient data
 patient_data_path = "C:\\Users\\703401801\\Desktop\\Cigna\\synthetic_patient_data_processed.csv"
 df_sample = pd.read_csv(patient_data_path, nrows=5)
 
-# Load the county data from the URL
-county_data_url = "https://gist.githubusercontent.com/russellsamora/12be4f9f574e92413ea3f92ce1bc58e6/raw/us_county_latlng.csv"
-county_df = pd.read_csv(county_data_url)
+# Load the county data from the local dataset cache (run `python dataset_cache.py prefetch` once)
+county_df = load_dataset('us_county_latlng')
 county_df.rename(columns={'name': 'county', 'lat': 'latitude', 'lng': 'longitude'}, inplace=True)
 
 # Realistic simulation of pharmacy data
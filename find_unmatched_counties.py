@@ -1,26 +1,21 @@
 
+import numpy as np
 import pandas as pd
+from county_names import fips_codes, fips_positions, county_geometry
 
 def find_unmatched_counties():
     try:
         patient_df = pd.read_csv("synthetic_patient_data_with_distances.csv")
-        coords_df = pd.read_csv("county_coordinates.csv")
+        geometry = county_geometry()
 
-        # Standardize column names and values for comparison
-        coords_df.rename(columns={'County': 'us_county', 'State': 'us_state'}, inplace=True)
-        
-        patient_df['us_county_lower'] = patient_df['us_county'].astype(str).str.strip().str.lower()
-        patient_df['us_state_lower'] = patient_df['us_state'].astype(str).str.strip().str.lower()
-        
-        coords_df['us_county_lower'] = coords_df['us_county'].astype(str).str.strip().str.lower()
-        coords_df['us_state_lower'] = coords_df['us_state'].astype(str).str.strip().str.lower()
+        # Resolve each distinct patient county to its FIPS code
+        patient_locations = patient_df.drop_duplicates(subset=['us_county', 'us_state']).copy()
+        patient_locations['geoid'] = fips_codes(patient_locations)
 
-        # Create unique identifiers for each county/state pair
-        patient_locations = set(zip(patient_df['us_county_lower'], patient_df['us_state_lower']))
-        coords_locations = set(zip(coords_df['us_county_lower'], coords_df['us_state_lower']))
-
-        # Find the locations that are in the patient data but not in the coordinates data
-        unmatched_locations = sorted(list(patient_locations - coords_locations))
+        # Patient counties with no FIPS code, or whose code has no Gazetteer coordinates
+        has_coords = ~np.isnan(geometry['lat'][fips_positions(patient_locations['geoid'])])
+        unmatched = patient_locations[~has_coords]
+        unmatched_locations = sorted(zip(unmatched['us_county'].astype(str), unmatched['us_state'].astype(str)))
 
         if unmatched_locations:
             print("--- Unmatched County, State Pairs ---")
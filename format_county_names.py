@@ -1,6 +1,14 @@
 
 import pandas as pd
 
+def title_case_locations(df):
+    """Return a copy of df with 'us_county' and 'us_state' in title case."""
+    df = df.copy()
+    # Ensure they are strings before applying .title()
+    df['us_county'] = df['us_county'].astype(str).str.title()
+    df['us_state'] = df['us_state'].astype(str).str.title()
+    return df
+
 def format_county_names():
     try:
         # Load the final dataset
@@ -8,9 +16,7 @@ def format_county_names():
         df = pd.read_csv(file_path)
 
         # Convert 'us_county' and 'us_state' to title case
-        # Ensure they are strings before applying .title()
-        df['us_county'] = df['us_county'].astype(str).apply(lambda x: x.title())
-        df['us_state'] = df['us_state'].astype(str).apply(lambda x: x.title())
+        df = title_case_locations(df)
 
         # Save the modified DataFrame, overwriting the original file
         df.to_csv(file_path, index=False)
@@ -0,0 +1,79 @@
+
+import json
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Frame layouts a payload can be serialized in: a list of row objects, or
+# one array per column ({"county": [...], "latitude": [...]})
+FRAME_FORMATS = ('records', 'columns')
+
+def _dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value).encode()
+
+def _split_array(values):
+    """JSON text of each element of a numeric or boolean array, from one dumps of the whole array."""
+    if orjson is not None:
+        # orjson writes NaN and infinities as null
+        return np.array(orjson.dumps(np.ascontiguousarray(values), option=orjson.OPT_SERIALIZE_NUMPY)[1:-1].decode().split(','), dtype=object)
+    encoded = np.array(json.dumps(values.tolist())[1:-1].split(', '), dtype=object)
+    if values.dtype.kind == 'f':
+        encoded[~np.isfinite(values)] = 'null'
+    return encoded
+
+def encode_column(series):
+    """
+    JSON text of every value in a column as an object array, computed per
+    column: numbers and booleans are encoded with a single dumps of the whole
+    array, strings once per distinct value, and missing values become null.
+    """
+    if len(series) == 0:
+        return np.array([], dtype=object)
+    if series.dtype.kind in 'biuf':
+        return _split_array(series.to_numpy())
+    codes, uniques = pd.factorize(series)
+    encoded = np.array([json.dumps(str(value)) for value in uniques] + ['null'], dtype=object)
+    return encoded[codes]
+
+def frame_to_records_json(df):
+    """
+    Serialize a DataFrame as a JSON array of row objects by concatenating the
+    encoded columns, without building a Python dict per row.
+    """
+    if df.empty:
+        return b'[]'
+    rows = None
+    for i, col in enumerate(df.columns):
+        prefix = ('{' if i == 0 else ',') + json.dumps(str(col)) + ':'
+        rows = prefix + encode_column(df[col]) if rows is None else rows + prefix + encode_column(df[col])
+    return ('[' + ','.join(rows + '}') + ']').encode()
+
+def frame_to_columns_json(df):
+    """Serialize a DataFrame as one JSON array per column."""
+    if orjson is not None:
+        columns = {
+            str(col): np.ascontiguousarray(df[col].to_numpy()) if df[col].dtype.kind in 'biuf' else df[col].astype(object).where(df[col].notna(), None).tolist()
+            for col in df.columns
+        }
+        return orjson.dumps(columns, option=orjson.OPT_SERIALIZE_NUMPY)
+    parts = [json.dumps(str(col)) + ':[' + ','.join(encode_column(df[col])) + ']' for col in df.columns]
+    return ('{' + ','.join(parts) + '}').encode()
+
+def dumps_payload(payload, frame_format='records'):
+    """
+    Serialize a top-level dict whose values may be DataFrames. Frames are
+    encoded column-wise in `frame_format`; other values go through orjson
+    (when installed) or the json module.
+    """
+    frame_encoder = frame_to_columns_json if frame_format == 'columns' else frame_to_records_json
+    parts = []
+    for key, value in payload.items():
+        encoded = frame_encoder(value) if isinstance(value, pd.DataFrame) else _dumps(value)
+        parts.append(json.dumps(str(key)).encode() + b':' + encoded)
+    return b'{' + b','.join(parts) + b'}'
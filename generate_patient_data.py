@@ -1,8 +1,13 @@
-
-import pandas as pd
+import os
+import sys
+import argparse
+from datetime import date
+from itertools import permutations
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-import random
-from datetime import datetime, timedelta
+import pandas as pd
+from sharded_dataset import part_file_name, write_manifest
+from file_hashing import file_sha256
 
 # County data collected from web searches with FIPS codes
 county_data = [
@@ -38,8 +43,19 @@ county_data = [
     {'county': 'Brown County', 'state': 'Illinois', 'latitude': 40.0052, 'longitude': -90.7215, 'FIPS_STATE_CODE': '17', 'county_fips_code': '17009'},
 ]
 
-num_patients = 5000
-patients = []
+
+# Counties designated as "pharmacy deserts" when desert distances are requested
+PHARMACY_DESERT_COUNTIES = [
+    'Calaveras County', 'Archer County', 'Baker County',
+    'Allegany County', 'Alexander County', 'Bond County', 'Aransas County'
+]
+
+# --- Generation parameters ---
+DEFAULT_NUM_PATIENTS = 5000
+DEFAULT_SEED = 42
+DEFAULT_CHUNK_SIZE = 1_000_000
+DEFAULT_REFERENCE_DATE = date(2025, 1, 1)  # last_checkup_date is drawn from the 3 years before this day
+OUTPUT_PATH = r"C:\Users\703401801\Desktop\synthetic_patient_data.csv"
 
 medical_histories = ['Hypertension', 'Diabetes', 'Asthma', 'Arthritis', 'None', 'High Cholesterol', 'Depression']
 pharmacies = ['CVS', 'Walgreens', 'Rite Aid', 'Walmart Pharmacy', 'Costco Pharmacy', 'Independent Pharmacy']
@@ -49,55 +65,287 @@ drug_needs = ['Painkillers', 'Antidepressants', 'Blood Pressure Medication', 'St
 ethnicities = ['White', 'Hispanic', 'Black', 'Asian', 'American Indian or Alaska Native', 'Native Hawaiian or Other Pacific Islander', 'Two or More Races']
 ethnicity_weights = [0.58, 0.20, 0.13, 0.06, 0.01, 0.005, 0.015] # Approximate US distribution
 
-# Generate synthetic NPI numbers for each pharmacy
-pharmacy_npi = {name: str(random.randint(1000000000, 9999999999)) for name in pharmacies}
+MAX_CONDITIONS = 3
+
+def _history_table():
+    """
+    Every ordered sample of 1-3 conditions as its stringified list, keyed by
+    k * n^3 + a * n^2 + b * n + c (unused positions are 0), so a whole column
+    of random samples maps to category codes without per-row formatting.
+    """
+    n = len(medical_histories)
+    key_to_code = np.full((MAX_CONDITIONS + 1) * n ** MAX_CONDITIONS, -1, dtype=np.int32)
+    categories = []
+    for k in range(1, MAX_CONDITIONS + 1):
+        for sample in permutations(range(n), k):
+            padded = list(sample) + [0] * (MAX_CONDITIONS - k)
+            key = k * n ** 3 + padded[0] * n ** 2 + padded[1] * n + padded[2]
+            key_to_code[key] = len(categories)
+            categories.append(str([medical_histories[i] for i in sample]))
+    return key_to_code, categories
 
-for i in range(num_patients):
-    age = random.randint(18, 95)
-    gender = random.choice(genders)
-    
-    is_pregnant = False
-    if gender == 'Female' and 18 <= age <= 45:
-        is_pregnant = random.choice([True, False])
+_HISTORY_KEY_TO_CODE, _HISTORY_CATEGORIES = _history_table()
+_BLOOD_PRESSURE_CATEGORIES = [f"{s}/{d}" for s in range(110, 161) for d in range(70, 101)]
 
-    county_info = random.choice(county_data)
-    pharmacy_name = random.choice(pharmacies)
+def _labels(codes, categories):
+    return pd.Categorical.from_codes(codes, categories=categories)
 
-    patient = {
-        'patient_id': i + 1,
+def _medical_history_column(rng, n):
+    """random.sample(medical_histories, k=randint(1, 3)) for n rows at once."""
+    num_conditions = len(medical_histories)
+    order = np.argsort(rng.random((n, num_conditions)), axis=1)[:, :MAX_CONDITIONS]
+    k = rng.integers(1, MAX_CONDITIONS + 1, size=n)
+    key = (k * num_conditions ** 3
+           + order[:, 0] * num_conditions ** 2
+           + np.where(k >= 2, order[:, 1], 0) * num_conditions
+           + np.where(k >= 3, order[:, 2], 0))
+    return _labels(_HISTORY_KEY_TO_CODE[key], _HISTORY_CATEGORIES)
+
+def generate_patients(rng, county_idx, start_id, pharmacy_npi, desert_counties=None,
+                      reference_date=DEFAULT_REFERENCE_DATE):
+    """
+    Build one block of synthetic patients column by column.
+
+    county_idx holds the county_data index of each row (drawn up front so
+    county totals are known before any block is written). Distances are
+    uniform 0.5-25 km, or 18-50 km in desert_counties and 1-15 km elsewhere
+    when a desert list is given. Checkup dates count back from reference_date.
+    """
+    n = len(county_idx)
+    counties = pd.DataFrame(county_data)
+    reference_date = np.datetime64(reference_date, 'D')
+
+    age = rng.integers(18, 96, size=n)
+    gender = rng.integers(0, len(genders), size=n)
+    is_female = np.asarray(genders)[gender] == 'Female'
+    is_pregnant = is_female & (age >= 18) & (age <= 45) & (rng.random(n) < 0.5)
+
+    if desert_counties is None:
+        distance = rng.uniform(0.5, 25.0, size=n)
+    else:
+        in_desert = counties['county'].isin(desert_counties).to_numpy()[county_idx]
+        distance = np.where(in_desert, rng.uniform(18.0, 50.0, size=n), rng.uniform(1.0, 15.0, size=n))
+
+    pharmacy = rng.integers(0, len(pharmacies), size=n)
+    checkup_days = rng.integers(30, 1096, size=n)
+    checkup_categories = (reference_date - np.arange(30, 1096)).astype(str)
+    systolic = rng.integers(110, 161, size=n)
+    diastolic = rng.integers(70, 101, size=n)
+
+    return pd.DataFrame({
+        'patient_id': np.arange(start_id, start_id + n, dtype=np.int64),
         'age': age,
-        'gender': gender,
-        'marital_status': random.choice(marital_statuses),
-        'number_of_children': random.randint(0, 5) if age > 20 else 0,
-        'annual_salary': round(np.random.lognormal(mean=11, sigma=0.7)),
-        'us_county': county_info['county'],
-        'us_state': county_info['state'],
-        'latitude': county_info['latitude'],
-        'longitude': county_info['longitude'],
-        'FIPS_STATE_CODE': county_info['FIPS_STATE_CODE'],
-        'county_fips_code': county_info['county_fips_code'],
-        'medical_history': random.sample(medical_histories, k=random.randint(1, 3)),
-        'nearest_pharmacy': pharmacy_name,
-        'NPI_NBR': pharmacy_npi[pharmacy_name],
-        'distance_to_pharmacy_km': round(random.uniform(0.5, 25.0), 2),
+        'gender': _labels(gender, genders),
+        'marital_status': _labels(rng.integers(0, len(marital_statuses), size=n), marital_statuses),
+        'number_of_children': np.where(age > 20, rng.integers(0, 6, size=n), 0),
+        'annual_salary': np.round(rng.lognormal(mean=11, sigma=0.7, size=n)).astype(np.int64),
+        'us_county': _labels(county_idx, counties['county'].tolist()),
+        'us_state': counties['state'].to_numpy()[county_idx],
+        'latitude': counties['latitude'].to_numpy()[county_idx],
+        'longitude': counties['longitude'].to_numpy()[county_idx],
+        'FIPS_STATE_CODE': counties['FIPS_STATE_CODE'].to_numpy()[county_idx],
+        'county_fips_code': counties['county_fips_code'].to_numpy()[county_idx],
+        'medical_history': _medical_history_column(rng, n),
+        'nearest_pharmacy': _labels(pharmacy, pharmacies),
+        'NPI_NBR': np.asarray(pharmacy_npi)[pharmacy],
+        'distance_to_pharmacy_km': np.round(distance, 2),
         'is_senior_citizen': age >= 65,
         'is_pregnant': is_pregnant,
-        'has_college_degree': random.choice([True, False]),
-        'ethnicity': random.choices(ethnicities, weights=ethnicity_weights, k=1)[0],
-        'drug_needs': random.choice(drug_needs),
-        'has_chronic_illness': random.choices([True, False], weights=[0.3, 0.7], k=1)[0],
-        'last_checkup_date': (datetime.now() - timedelta(days=random.randint(30, 1095))).strftime('%Y-%m-%d'),
-        'blood_pressure': f"{random.randint(110, 160)}/{random.randint(70, 100)}",
-        'heart_rate': random.randint(60, 100)
-    }
-    patients.append(patient)
+        'has_college_degree': rng.random(n) < 0.5,
+        'ethnicity': _labels(rng.choice(len(ethnicities), size=n, p=ethnicity_weights), ethnicities),
+        'drug_needs': _labels(rng.integers(0, len(drug_needs), size=n), drug_needs),
+        'has_chronic_illness': rng.random(n) < 0.3,
+        'last_checkup_date': _labels(checkup_days - 30, checkup_categories),
+        'blood_pressure': _labels((systolic - 110) * 31 + (diastolic - 70), _BLOOD_PRESSURE_CATEGORIES),
+        'heart_rate': rng.integers(60, 101, size=n),
+    })
+
+def _open_parquet_writer(output_path, first_block):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Writing Parquet output requires pyarrow (pip install pyarrow); use a .csv output path instead.")
+    schema = pa.Table.from_pandas(first_block, preserve_index=False).schema
+    return pa, pq.ParquetWriter(output_path, schema)
+
+def write_patient_blocks(blocks, output_path):
+    """
+    Write an iterable of patient blocks to one file: appended CSV blocks, or
+    Parquet row groups when output_path ends in .parquet. The file is written
+    under a temporary name and moved into place once complete; a 0-row
+    block still writes the header (or the Parquet schema).
+    Returns the number of rows written.
+    """
+    tmp_path = output_path + ".tmp"
+    is_parquet = output_path.endswith(".parquet")
+    parquet_writer = None
+    rows = 0
+    blocks_written = 0
+    try:
+        for block in blocks:
+            if is_parquet:
+                if parquet_writer is None:
+                    pa, parquet_writer = _open_parquet_writer(tmp_path, block)
+                parquet_writer.write_table(pa.Table.from_pandas(block, schema=parquet_writer.schema, preserve_index=False))
+            else:
+                block.to_csv(tmp_path, mode='w' if blocks_written == 0 else 'a', header=blocks_written == 0, index=False)
+            rows += len(block)
+            blocks_written += 1
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+
+    if not blocks_written:
+        raise ValueError(f"No patient blocks to write to {output_path}")
+    os.replace(tmp_path, output_path)
+    return rows
+
+def _county_totals(county_counts):
+    """patients_in_county per county_data index from per-index row counts (totals are by county name)."""
+    name_codes = pd.factorize(pd.Series([c['county'] for c in county_data]))[0]
+    patients_by_name = np.bincount(name_codes, weights=county_counts, minlength=name_codes.max() + 1)
+    return patients_by_name.astype(np.int64)[name_codes]
+
+def generate_patient_data(num_patients=DEFAULT_NUM_PATIENTS, output_path=OUTPUT_PATH, seed=DEFAULT_SEED,
+                          chunk_size=DEFAULT_CHUNK_SIZE, desert_counties=None,
+                          reference_date=DEFAULT_REFERENCE_DATE):
+    """
+    Generate num_patients synthetic patients with a seeded NumPy Generator and
+    write them in blocks of chunk_size rows: appended CSV blocks, or Parquet
+    row groups when output_path ends in .parquet. The same seed, chunk size
+    and reference_date always produce the same file, whatever day it runs.
+    num_patients=0 writes a header-only file.
+    """
+    if num_patients < 0:
+        raise ValueError(f"num_patients must be 0 or more, got {num_patients}")
+    rng = np.random.default_rng(seed)
+
+    # Synthetic NPI numbers for each pharmacy
+    pharmacy_npi = rng.integers(1000000000, 10000000000, size=len(pharmacies)).astype(str)
+
+    # Counties are drawn for every row first so patients_in_county is exact across blocks
+    county_idx = rng.integers(0, len(county_data), size=num_patients, dtype=np.int32)
+    patients_in_county = _county_totals(np.bincount(county_idx, minlength=len(county_data)))
+
+    def blocks():
+        # One pass even for 0 patients, so the empty block carries the columns
+        for start in range(0, max(num_patients, 1), chunk_size):
+            block_counties = county_idx[start:start + chunk_size]
+            block = generate_patients(rng, block_counties, start + 1, pharmacy_npi, desert_counties, reference_date)
+            block['patients_in_county'] = patients_in_county[block_counties]
+            if len(block):
+                print(f"  Generated rows {start + 1}-{start + len(block)}")
+            yield block
+
+    write_patient_blocks(blocks(), output_path)
+    print(f"Successfully generated {num_patients} patient records and saved to {output_path}")
+    return output_path
+
+# --- Sharded generation ---
+def _shard_counties(county_seed, rows):
+    return np.random.default_rng(county_seed).integers(0, len(county_data), size=rows, dtype=np.int32)
+
+def _generate_shard(task):
+    """
+    Worker: generate and write one shard. Each shard draws from its own
+    spawned seed streams (one for counties, one for everything else), so its
+    contents depend only on the root seed and the shard index.
+    """
+    (shard_index, first_patient_id, rows, county_seed, column_seed, part_path,
+     pharmacy_npi, patients_in_county, desert_counties, reference_date) = task
+    county_idx = _shard_counties(county_seed, rows)
+    block = generate_patients(np.random.default_rng(column_seed), county_idx, first_patient_id,
+                              pharmacy_npi, desert_counties, reference_date)
+    block['patients_in_county'] = patients_in_county[county_idx]
+    write_patient_blocks([block], part_path)
+    return shard_index, list(block.columns), file_sha256(part_path)
+
+def generate_sharded_patient_data(num_patients, output_dir, seed=DEFAULT_SEED, shard_size=DEFAULT_CHUNK_SIZE,
+                                  workers=None, file_format='csv', desert_counties=None,
+                                  reference_date=DEFAULT_REFERENCE_DATE):
+    """
+    Generate num_patients synthetic patients as shard part files in output_dir
+    on a process pool, plus a manifest.json listing the parts.
+
+    The root seed is split with SeedSequence.spawn into one child per shard,
+    so the output is identical for any worker count. County totals
+    (patients_in_county) are computed up front from the per-shard county
+    streams, which are cheap to draw twice. reference_date is recorded in the
+    manifest. num_patients=0 writes a manifest with no parts.
+    """
+    if num_patients < 0:
+        raise ValueError(f"num_patients must be 0 or more, got {num_patients}")
+    os.makedirs(output_dir, exist_ok=True)
+    num_shards = -(-num_patients // shard_size)
+    root_seed = np.random.SeedSequence(seed)
+    pharmacy_npi = np.random.default_rng(root_seed).integers(1000000000, 10000000000, size=len(pharmacies)).astype(str)
+    shard_seeds = [shard_seed.spawn(2) for shard_seed in root_seed.spawn(num_shards)]
+    shard_rows = [min(shard_size, num_patients - i * shard_size) for i in range(num_shards)]
+
+    county_counts = np.zeros(len(county_data), dtype=np.int64)
+    for (county_seed, _), rows in zip(shard_seeds, shard_rows):
+        county_counts += np.bincount(_shard_counties(county_seed, rows), minlength=len(county_data))
+    patients_in_county = _county_totals(county_counts)
+
+    tasks = [
+        (i, i * shard_size + 1, shard_rows[i], shard_seeds[i][0], shard_seeds[i][1],
+         os.path.join(output_dir, part_file_name(i, file_format)),
+         pharmacy_npi, patients_in_county, desert_counties, reference_date)
+        for i in range(num_shards)
+    ]
 
-df = pd.DataFrame(patients)
+    parts = [None] * num_shards
+    columns = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        for shard_index, columns, sha256 in executor.map(_generate_shard, tasks):
+            parts[shard_index] = {
+                'file': part_file_name(shard_index, file_format),
+                'rows': shard_rows[shard_index],
+                'first_patient_id': shard_index * shard_size + 1,
+                'sha256': sha256,
+            }
+            print(f"  Wrote shard {shard_index + 1}/{num_shards}")
 
-# Add total number of patients per county
-df['patients_in_county'] = df.groupby('us_county')['us_county'].transform('count')
+    manifest_file = write_manifest(output_dir, {
+        'format': file_format,
+        'rows': num_patients,
+        'seed': seed,
+        'shard_size': shard_size,
+        'desert_counties': desert_counties,
+        'reference_date': reference_date.isoformat(),
+        'columns': columns,
+        'parts': parts,
+    })
+    print(f"Successfully generated {num_patients} patient records in {num_shards} shards; manifest at {manifest_file}")
+    return manifest_file
 
-output_path = r"C:\Users\703401801\Desktop\synthetic_patient_data.csv"
-df.to_csv(output_path, index=False)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic patient dataset.")
+    parser.add_argument('num_patients', nargs='?', type=int, default=DEFAULT_NUM_PATIENTS, help="Number of patients to generate")
+    parser.add_argument('--output', default=OUTPUT_PATH, help="Output .csv or .parquet path (a directory with --shard-size)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="Random seed")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows generated and written per block")
+    parser.add_argument('--reference-date', type=date.fromisoformat, default=DEFAULT_REFERENCE_DATE,
+                        help="YYYY-MM-DD day that last_checkup_date counts back from (default: %(default)s)")
+    parser.add_argument('--shard-size', type=int, help="Write part files of this many rows plus a manifest, generated in parallel")
+    parser.add_argument('--workers', type=int, help="Worker processes for sharded generation (default: all cores)")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help="Part file format for sharded generation")
+    parser.add_argument('--desert-distances', action='store_true',
+                        help="Use 18-50 km distances in PHARMACY_DESERT_COUNTIES and 1-15 km elsewhere")
+    args = parser.parse_args()
+    desert_counties = PHARMACY_DESERT_COUNTIES if args.desert_distances else None
 
-print(f"Successfully generated {num_patients} patient records and saved to {output_path}")
+    try:
+        if args.shard_size:
+            generate_sharded_patient_data(args.num_patients, args.output, args.seed, args.shard_size,
+                                          args.workers, args.format, desert_counties, args.reference_date)
+        else:
+            generate_patient_data(args.num_patients, args.output, args.seed, args.chunk_size, desert_counties,
+                                  args.reference_date)
+    except (OSError, ImportError) as e:
+        print(f"An error occurred while saving the file: {e}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -0,0 +1,243 @@
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.preprocessing import StandardScaler
+
+# --- Configuration ---
+N_CLUSTERS = 5
+CHUNK_SIZE = 200000
+SAMPLE_SIZE = 500000
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REGION_MODEL_PATH = os.path.join(BASE_DIR, "region_cluster_model.joblib")
+
+_region_model_cache = {}
+
+def iter_coordinate_chunks(file_path, chunksize=CHUNK_SIZE):
+    """
+    Stream the latitude/longitude columns of a CSV as float64 arrays,
+    one chunk at a time, skipping rows with missing or non-numeric values.
+    """
+    for chunk in pd.read_csv(file_path, usecols=['latitude', 'longitude'], chunksize=chunksize):
+        coords = chunk.apply(pd.to_numeric, errors='coerce').dropna()
+        if not coords.empty:
+            yield coords[['latitude', 'longitude']].to_numpy(dtype=np.float64)
+
+def map_clusters_to_regions(centroids):
+    """
+    Map cluster indices to North/South/East/West/Central from their
+    (latitude, longitude) centroids in degrees.
+    """
+    lat_sorted_indices = sorted(range(len(centroids)), key=lambda k: centroids[k][0])
+    lon_sorted_indices = sorted(range(len(centroids)), key=lambda k: centroids[k][1])
+
+    cluster_map = {}
+    available_regions = ["North", "South", "East", "West", "Central"]
+
+    # Assign North and South, as they are the most distinct vertically
+    north_idx = lat_sorted_indices[-1]
+    cluster_map[north_idx] = "North"
+    available_regions.remove("North")
+
+    south_idx = lat_sorted_indices[0]
+    cluster_map[south_idx] = "South"
+    available_regions.remove("South")
+
+    # Assign East and West if they haven't been taken by North/South
+    east_idx = lon_sorted_indices[-1]
+    if east_idx not in cluster_map:
+        cluster_map[east_idx] = "East"
+        available_regions.remove("East")
+
+    west_idx = lon_sorted_indices[0]
+    if west_idx not in cluster_map:
+        cluster_map[west_idx] = "West"
+        available_regions.remove("West")
+
+    # Assign any remaining regions to the unmapped clusters, west to east, so the
+    # labels don't depend on the arbitrary order in which the clusters were found
+    west_to_east = {"West": 0, "Central": 1, "East": 2}
+    available_regions.sort(key=lambda region: west_to_east[region])
+    for i in sorted(range(len(centroids)), key=lambda k: centroids[k][1]):
+        if i not in cluster_map:
+            cluster_map[i] = available_regions.pop(0)
+
+    return cluster_map
+
+def fit_region_model(file_path, n_clusters=N_CLUSTERS, chunksize=CHUNK_SIZE, sample_size=SAMPLE_SIZE, random_state=42):
+    """
+    Fit the geographic region model on coordinates streamed from a CSV.
+
+    A single pass updates the scaler incrementally and keeps a uniform
+    reservoir sample of at most `sample_size` points, so memory stays bounded
+    regardless of file size. MiniBatchKMeans is then fitted on the scaled
+    sample. When the file is smaller than the sample, every point is used.
+    """
+    rng = np.random.default_rng(random_state)
+    scaler = StandardScaler()
+    sample = np.empty((0, 2))
+    sample_keys = np.empty(0)
+    rows_seen = 0
+
+    for coords in iter_coordinate_chunks(file_path, chunksize):
+        scaler.partial_fit(coords)
+        rows_seen += len(coords)
+
+        # Reservoir sampling by random priority: keep the smallest keys seen so far
+        sample = np.vstack([sample, coords])
+        sample_keys = np.concatenate([sample_keys, rng.random(len(coords))])
+        if len(sample) > sample_size:
+            keep = np.argpartition(sample_keys, sample_size)[:sample_size]
+            sample, sample_keys = sample[keep], sample_keys[keep]
+
+    if rows_seen < n_clusters:
+        raise ValueError(f"Need at least {n_clusters} rows with valid coordinates to cluster, found {rows_seen}.")
+
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state, n_init=10,
+                             batch_size=min(len(sample), 4096))
+    kmeans.fit(scaler.transform(sample))
+
+    centroids = scaler.inverse_transform(kmeans.cluster_centers_)
+    return {
+        'scaler': scaler,
+        'centroids_scaled': kmeans.cluster_centers_,
+        'centroids': centroids,
+        'region_map': map_clusters_to_regions(centroids),
+        'rows_seen': rows_seen,
+        'sample_size': len(sample),
+    }
+
+def batch_model_path(file_path):
+    """
+    Where a batch script saves a model fitted on `file_path`: next to the data
+    file, never over the shared REGION_MODEL_PATH the app loads.
+    """
+    return os.path.splitext(file_path)[0] + "_region_model.joblib"
+
+def save_region_model(model, model_path=REGION_MODEL_PATH):
+    joblib.dump(model, model_path)
+    _region_model_cache[model_path] = model
+    print(f"Saved region model ({len(model['centroids'])} centroids) to {model_path}")
+
+def region_model_from_labels(df, label_column='group'):
+    """
+    Build a region model that reproduces an existing labelled assignment.
+    Each region's centroid is the mean of its points, which is exactly what
+    the KMeans fit that produced the labels converged to.
+    """
+    labelled = df[['latitude', 'longitude', label_column]].dropna()
+    coords = labelled[['latitude', 'longitude']].to_numpy(dtype=np.float64)
+    scaler = StandardScaler().fit(coords)
+    scaled = pd.DataFrame(scaler.transform(coords), columns=['latitude', 'longitude'], index=labelled.index)
+    centroids_scaled = scaled.groupby(labelled[label_column]).mean()
+
+    return {
+        'scaler': scaler,
+        'centroids_scaled': centroids_scaled.to_numpy(),
+        'centroids': scaler.inverse_transform(centroids_scaled.to_numpy()),
+        'region_map': {i: str(region) for i, region in enumerate(centroids_scaled.index)},
+        'rows_seen': len(labelled),
+        'sample_size': len(labelled),
+    }
+
+def load_region_model(model_path=REGION_MODEL_PATH):
+    """
+    Load a persisted region model. Models are cached per path, so repeated
+    calls (e.g. one per request) only hit the disk once.
+    """
+    if model_path not in _region_model_cache:
+        _region_model_cache[model_path] = joblib.load(model_path)
+    return _region_model_cache[model_path]
+
+def load_or_fit_region_model(file_path, model_path=REGION_MODEL_PATH):
+    """
+    Return the persisted region model, fitting and saving one from `file_path`
+    only if none exists yet.
+    """
+    if os.path.exists(model_path):
+        return load_region_model(model_path)
+    model = fit_region_model(file_path)
+    save_region_model(model, model_path)
+    return model
+
+def assign_group(lat, lon, model=None):
+    """
+    Assign a single point to its region in O(k) by comparing it against the
+    k scaled centroids. Returns None when the coordinates are missing.
+    """
+    if model is None:
+        model = load_region_model()
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if np.isnan(lat) or np.isnan(lon):
+        return None
+
+    mean, scale = model['scaler'].mean_, model['scaler'].scale_
+    x = (lat - mean[0]) / scale[0]
+    y = (lon - mean[1]) / scale[1]
+    centroids = model['centroids_scaled']
+    nearest = min(range(len(centroids)), key=lambda i: (x - centroids[i][0]) ** 2 + (y - centroids[i][1]) ** 2)
+    return model['region_map'][nearest]
+
+def assign_regions(model, latitudes, longitudes):
+    """
+    Assign region names to arrays of coordinates by nearest scaled centroid.
+    Rows with missing coordinates get None.
+    """
+    coords = np.column_stack([
+        pd.to_numeric(pd.Series(latitudes), errors='coerce').to_numpy(dtype=np.float64),
+        pd.to_numeric(pd.Series(longitudes), errors='coerce').to_numpy(dtype=np.float64),
+    ])
+    valid = ~np.isnan(coords).any(axis=1)
+    regions = np.full(len(coords), None, dtype=object)
+    if valid.any():
+        scaled = model['scaler'].transform(coords[valid])
+        sq_dist = ((scaled[:, None, :] - model['centroids_scaled'][None, :, :]) ** 2).sum(axis=2)
+        labels = sq_dist.argmin(axis=1)
+        region_names = np.array([model['region_map'][i] for i in range(len(model['centroids_scaled']))], dtype=object)
+        regions[valid] = region_names[labels]
+    return regions
+
+def write_region_column(file_path, model, column_name='group', output_path=None, chunksize=CHUNK_SIZE):
+    """
+    Stream a CSV through the region model and write it back with `column_name`
+    (re)computed. The output is written to a temporary file and swapped in at
+    the end, so the original is untouched if anything fails.
+    Returns the region counts and the number of rows left unassigned.
+    """
+    output_path = output_path or file_path
+    tmp_path = output_path + ".tmp"
+    counts = pd.Series(dtype='int64')
+    missing = 0
+
+    try:
+        for i, chunk in enumerate(pd.read_csv(file_path, chunksize=chunksize)):
+            if column_name in chunk.columns:
+                chunk = chunk.drop(columns=[column_name])
+            chunk[column_name] = assign_regions(model, chunk['latitude'], chunk['longitude'])
+            missing += int(chunk[column_name].isnull().sum())
+            counts = counts.add(chunk[column_name].value_counts(), fill_value=0)
+            chunk.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return counts.astype(int).sort_values(ascending=False), missing
+
+if __name__ == "__main__":
+    # Build the shared region artifact from the labelled app dataset so new
+    # patients get the same groups as the existing ones.
+    source_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(BASE_DIR, "patient_data_with_imputed_distances.csv")
+    try:
+        source_df = pd.read_csv(source_file, usecols=['latitude', 'longitude', 'group'])
+        region_model = region_model_from_labels(source_df, 'group')
+    except ValueError:
+        # No existing group column: fit a fresh model instead
+        region_model = fit_region_model(source_file)
+    save_region_model(region_model)
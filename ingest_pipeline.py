@@ -0,0 +1,248 @@
+
+import os
+import sys
+import json
+import hashlib
+import inspect
+import argparse
+import pandas as pd
+from merge_data import attach_county_coords
+from calculate_distances import compute_county_pharmacy_distances
+from merge_distance_data import attach_pharmacy_distances
+from fill_missing_distances import impute_missing_distances
+from format_county_names import title_case_locations
+from sharded_dataset import is_sharded_dataset, manifest_path, load_patient_table
+from file_hashing import file_sha256
+
+# --- Configuration ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, ".ingest_cache")
+STATE_FILE = os.path.join(CACHE_DIR, "state.json")
+
+# --- Stage functions ---
+# Each stage receives its input file paths and the frames of the stages it
+# depends on, and returns a single DataFrame.
+
+def load_patients(inputs, deps):
+    # A single CSV or a sharded dataset manifest (parts are read in parallel)
+    return load_patient_table(inputs['patients'])
+
+def merge_county_coords(inputs, deps):
+    return attach_county_coords(deps['patients'], inputs['gazetteer'])
+
+def county_pharmacy_distances(inputs, deps):
+    # Recompute from the raw pharmacy list when it is available, otherwise
+    # reuse the precomputed county distance table shipped with the data
+    if os.path.exists(inputs['pharmacies']):
+        return compute_county_pharmacy_distances(deps['patients_with_coords'], pd.read_csv(inputs['pharmacies']))
+    return pd.read_csv(inputs['county_distances'])
+
+def merge_pharmacy_distances(inputs, deps):
+    return attach_pharmacy_distances(deps['patients_with_coords'], deps['county_distances'])
+
+def impute_distances(inputs, deps):
+    df, num_missing = impute_missing_distances(deps['patients_with_distances'])
+    print(f"  Imputed {num_missing} missing distances")
+    return df
+
+def format_locations(inputs, deps):
+    return title_case_locations(deps['patients_imputed'])
+
+# Declarative pipeline: name -> input files, upstream stages, function and the
+# legacy file name written when intermediate checkpoints are requested.
+STAGES = [
+    {'name': 'patients', 'inputs': {'patients': "synthetic_patient_data_with_distances.csv"},
+     'deps': [], 'run': load_patients},
+    {'name': 'patients_with_coords', 'inputs': {'gazetteer': "2025_Gaz_counties_national.txt"},
+     'deps': ['patients'], 'run': merge_county_coords,
+     'checkpoint': "patient_data_with_correct_coords.csv"},
+    # The checkpoint must not overwrite the shipped table this stage reads, or
+    # every checkpointed run would change its own input and key
+    {'name': 'county_distances', 'inputs': {'pharmacies': "Pharmacies.csv", 'county_distances': "county_pharmacy_distances.csv"},
+     'deps': ['patients_with_coords'], 'run': county_pharmacy_distances,
+     'checkpoint': "county_pharmacy_distances_computed.csv"},
+    {'name': 'patients_with_distances', 'inputs': {},
+     'deps': ['patients_with_coords', 'county_distances'], 'run': merge_pharmacy_distances,
+     'checkpoint': "patient_data_with_full_distances.csv"},
+    {'name': 'patients_imputed', 'inputs': {},
+     'deps': ['patients_with_distances'], 'run': impute_distances},
+    {'name': 'final', 'inputs': {},
+     'deps': ['patients_imputed'], 'run': format_locations,
+     'output': "patient_data_with_imputed_distances.csv"},
+]
+
+# --- Content hashing ---
+def file_digest(path, hash_cache):
+    """
+    sha256 of a file's contents. Digests are remembered by (size, mtime) so
+    unchanged files are not re-read on every run.
+    """
+    if not os.path.exists(path):
+        return "missing"
+    stat = os.stat(path)
+    cache_key = f"{stat.st_size}:{stat.st_mtime_ns}"
+    cached = hash_cache.get(path)
+    if cached and cached['stat'] == cache_key:
+        return cached['sha256']
+
+    hash_cache[path] = {'stat': cache_key, 'sha256': file_sha256(path)}
+    return hash_cache[path]['sha256']
+
+def _local_module(obj):
+    """The repo module defining `obj` (or `obj` itself if it is one), else None."""
+    module = obj if inspect.ismodule(obj) else inspect.getmodule(obj)
+    module_file = getattr(module, '__file__', None)
+    if module_file and os.path.abspath(module_file).startswith(BASE_DIR + os.sep):
+        return module
+    return None
+
+def code_digest(func):
+    """
+    sha256 over the source of the repo modules whose functions `func` calls,
+    and every repo module those import, transitively, so editing a helper such
+    as attach_county_coords invalidates the stages that call it.
+    """
+    referenced = (func.__globals__.get(name) for name in func.__code__.co_names)
+    pending = [_local_module(obj) for obj in referenced
+               if inspect.ismodule(obj) or inspect.isfunction(obj) or inspect.isclass(obj)]
+    pending = [module for module in pending if module is not None and module.__name__ != func.__module__]
+    seen = {}
+    while pending:
+        module = pending.pop()
+        if module is None or module.__name__ in seen:
+            continue
+        seen[module.__name__] = inspect.getsource(module)
+        pending.extend(_local_module(value) for value in vars(module).values()
+                       if inspect.ismodule(value) or inspect.isfunction(value) or inspect.isclass(value))
+    digest = hashlib.sha256()
+    for name in sorted(seen):
+        digest.update(name.encode())
+        digest.update(seen[name].encode())
+    return digest.hexdigest()
+
+def resolve_inputs(stage, data_dir, input_overrides=None):
+    """
+    Absolute input paths for a stage. `input_overrides` maps an input label to
+    a path used instead of the default file; sharded datasets resolve to their
+    manifest, whose part checksums stand in for the data when hashing.
+    """
+    input_overrides = input_overrides or {}
+    inputs = {}
+    for label, file_name in stage['inputs'].items():
+        path = input_overrides.get(label) or os.path.join(data_dir, file_name)
+        inputs[label] = manifest_path(path) if is_sharded_dataset(path) else path
+    return inputs
+
+def stage_keys(stages, data_dir, hash_cache, input_overrides=None):
+    """
+    Compute a content key per stage from its input file digests, the source
+    code of its function (and the repo modules it uses) and the keys of its
+    upstream stages. A stage whose
+    key is unchanged since the last run produces the same output.
+    """
+    keys = {}
+    for stage in stages:
+        digest = hashlib.sha256()
+        digest.update(stage['name'].encode())
+        digest.update(inspect.getsource(stage['run']).encode())
+        digest.update(code_digest(stage['run']).encode())
+        for label, path in sorted(resolve_inputs(stage, data_dir, input_overrides).items()):
+            digest.update(f"{label}={file_digest(path, hash_cache)}".encode())
+        for dep in stage['deps']:
+            digest.update(keys[dep].encode())
+        keys[stage['name']] = digest.hexdigest()
+    return keys
+
+def load_state():
+    try:
+        with open(STATE_FILE, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'stages': {}, 'file_hashes': {}, 'outputs': {}}
+
+def save_state(state):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(STATE_FILE, 'w') as f:
+        json.dump(state, f, indent=2)
+
+def cache_path(stage_name):
+    return os.path.join(CACHE_DIR, f"{stage_name}.pkl")
+
+# --- Runner ---
+def run_pipeline(data_dir=BASE_DIR, write_checkpoints=False, force=False, stages=STAGES, input_overrides=None):
+    """
+    Run the ingest stages in memory over shared frames. Each stage's output
+    is cached under .ingest_cache and reused while its content key is
+    unchanged; only the final artifact (plus legacy intermediate CSVs when
+    `write_checkpoints` is set) is written next to the data. The final
+    artifact is rewritten unless its digest still matches the one recorded
+    when it was written for the current key.
+    `input_overrides` replaces input files by label, e.g. {'patients': <manifest>}.
+    """
+    state = load_state()
+    state.setdefault('outputs', {})
+    keys = stage_keys(stages, data_dir, state['file_hashes'], input_overrides)
+    by_name = {stage['name']: stage for stage in stages}
+    frames = {}
+    ran = []
+
+    def is_fresh(name):
+        return not force and state['stages'].get(name) == keys[name] and os.path.exists(cache_path(name))
+
+    def get_frame(name):
+        if name in frames:
+            return frames[name]
+        stage = by_name[name]
+        if is_fresh(name):
+            frames[name] = pd.read_pickle(cache_path(name))
+            print(f"- {name}: unchanged, loaded from cache")
+        else:
+            deps = {dep: get_frame(dep) for dep in stage['deps']}
+            inputs = resolve_inputs(stage, data_dir, input_overrides)
+            print(f"- {name}: running")
+            frames[name] = stage['run'](inputs, deps)
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            frames[name].to_pickle(cache_path(name))
+            state['stages'][name] = keys[name]
+            ran.append(name)
+        return frames[name]
+
+    for stage in stages:
+        output = stage.get('output')
+        if output:
+            output_path = os.path.join(data_dir, output)
+            written = state['outputs'].get(output_path)
+            if (is_fresh(stage['name']) and written and written['key'] == keys[stage['name']]
+                    and written['sha256'] == file_digest(output_path, state['file_hashes'])):
+                print(f"- {stage['name']}: unchanged, {output} is up to date")
+                continue
+            get_frame(stage['name']).to_csv(output_path, index=False)
+            state['outputs'][output_path] = {'key': keys[stage['name']],
+                                             'sha256': file_digest(output_path, state['file_hashes'])}
+            print(f"Wrote {len(frames[stage['name']])} rows to {output_path}")
+
+    if write_checkpoints:
+        for stage in stages:
+            if stage.get('checkpoint'):
+                checkpoint_path = os.path.join(data_dir, stage['checkpoint'])
+                get_frame(stage['name']).to_csv(checkpoint_path, index=False)
+                print(f"Wrote checkpoint {checkpoint_path}")
+
+    save_state(state)
+    return ran
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build patient_data_with_imputed_distances.csv from the raw inputs.")
+    parser.add_argument('--data-dir', default=BASE_DIR, help="Directory holding the input and output files")
+    parser.add_argument('--checkpoints', action='store_true', help="Also write the intermediate CSVs produced by the old scripts")
+    parser.add_argument('--force', action='store_true', help="Ignore cached stage outputs and rerun everything")
+    parser.add_argument('--patients', help="Patient input to use instead of the default CSV (a CSV or a sharded dataset directory/manifest)")
+    args = parser.parse_args()
+
+    try:
+        ran_stages = run_pipeline(args.data_dir, write_checkpoints=args.checkpoints, force=args.force,
+                                  input_overrides={'patients': args.patients} if args.patients else None)
+    except FileNotFoundError as e:
+        print(f"Error: A required file was not found. {e}")
+        sys.exit(1)
+    print(f"Pipeline complete. Stages run: {', '.join(ran_stages) if ran_stages else 'none'}")
@@ -0,0 +1,75 @@
+
+import re
+import numpy as np
+import pandas as pd
+
+# medical_history is stored as a stringified Python list, e.g. "['Hypertension', 'Arthritis']"
+_CONDITION_PATTERN = re.compile(r"""['"]([^'"]+)['"]""")
+
+MULTIHOT_PREFIX = "mh_"
+
+DRUG_MAPPING = {
+    'Hypertension': 'Blood Pressure Medication',
+    'Arthritis': 'Painkillers',
+    'Asthma': 'Asthma Inhaler',
+    'Diabetes': 'Insulin',
+    'High Cholesterol': 'Statins',
+    'Depression': 'Antidepressants'
+}
+
+def parse_conditions(medical_history):
+    """Parse one stringified medical_history list without eval()."""
+    if isinstance(medical_history, (list, tuple)):
+        return [str(c) for c in medical_history]
+    if not isinstance(medical_history, str):
+        return []
+    return _CONDITION_PATTERN.findall(medical_history)
+
+def parse_medical_history(series, vocabulary=None):
+    """
+    Convert a medical_history column into a multi-hot uint8 matrix.
+
+    Each distinct string is parsed once (patients share a small number of
+    histories), and rows are filled by indexing into the per-string result.
+    Returns (matrix, vocabulary) where matrix[i, j] == 1 if row i lists
+    vocabulary[j]. Conditions outside a given vocabulary are ignored.
+    """
+    codes, uniques = pd.factorize(pd.Series(series), use_na_sentinel=True)
+    parsed = [parse_conditions(value) for value in uniques]
+
+    if vocabulary is None:
+        vocabulary = sorted({c for conditions in parsed for c in conditions})
+    vocabulary = list(vocabulary)
+    position = {condition: j for j, condition in enumerate(vocabulary)}
+
+    # One extra all-zero row at the end catches missing values (code -1)
+    unique_matrix = np.zeros((len(uniques) + 1, len(vocabulary)), dtype=np.uint8)
+    for i, conditions in enumerate(parsed):
+        for condition in conditions:
+            j = position.get(condition)
+            if j is not None:
+                unique_matrix[i, j] = 1
+
+    return unique_matrix[codes], vocabulary
+
+def multihot_frame(matrix, vocabulary, index=None, prefix=MULTIHOT_PREFIX):
+    """Expose a multi-hot matrix as uint8 feature columns named <prefix><condition>."""
+    return pd.DataFrame(matrix, columns=[f"{prefix}{c}" for c in vocabulary], index=index)
+
+def condition_counts(matrix, vocabulary, mask=None):
+    """Count patients per condition, optionally restricted to a boolean row mask or row positions."""
+    rows = matrix if mask is None else matrix[np.asarray(mask)]
+    return pd.Series(rows.sum(axis=0, dtype=np.int64), index=vocabulary).sort_values(ascending=False)
+
+def get_drug_need(medical_history):
+    """Drug need for the first mapped illness in a patient's history."""
+    for illness in parse_conditions(medical_history):
+        if illness in DRUG_MAPPING:
+            return DRUG_MAPPING[illness]
+    return "Unknown"
+
+def get_drug_needs(series):
+    """Vectorized get_drug_need: each distinct history string is resolved once."""
+    codes, uniques = pd.factorize(pd.Series(series), use_na_sentinel=True)
+    needs = np.array([get_drug_need(value) for value in uniques] + ["Unknown"], dtype=object)
+    return pd.Series(needs[codes], index=getattr(series, 'index', None))
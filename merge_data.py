@@ -1,5 +1,29 @@
 
 import pandas as pd
+from county_names import GAZETTEER_PATH, FIPS_COLUMN, fips_codes, fips_positions, county_geometry, clean_county_names, clean_state_names
+
+def attach_county_coords(patient_df, gazetteer_path=GAZETTEER_PATH):
+    """
+    Attach county centroid coordinates (correct_county_lat/lon) to the patient
+    rows from the Census Gazetteer internal points. Rows are keyed on the
+    integer county FIPS code and the coordinates gathered from the cached
+    FIPS-indexed Gazetteer arrays, so no string join is involved.
+    """
+    patient_df = patient_df.copy()
+    geometry = county_geometry(gazetteer_path)
+
+    # Patient FIPS codes (resolved from names only where county_fips_code is missing)
+    patient_df[FIPS_COLUMN] = fips_codes(patient_df)
+    positions = fips_positions(patient_df[FIPS_COLUMN])
+
+    # Keep the cleaned lower-case names the downstream scripts expect
+    patient_df['us_county'] = clean_county_names(patient_df['us_county'])
+    patient_df['us_state'] = clean_state_names(patient_df['us_state'])
+
+    # --- Lookup ---
+    patient_df['correct_county_lat'] = geometry['lat'][positions]
+    patient_df['correct_county_lon'] = geometry['lon'][positions]
+    return patient_df
 
 def merge_data():
     try:
@@ -7,51 +31,9 @@ def merge_data():
         patient_df = pd.read_csv("synthetic_patient_data_with_distances.csv")
         print("Successfully loaded patient data.")
 
-        # Load the new county coordinates data from the Excel file
-        coords_df = pd.read_excel("uscounties.xlsx")
-        print("Successfully loaded county coordinates data from uscounties.xlsx.")
-
-        # --- Data Preparation for Merging ---
-        # 1. Prepare coords_df:
-        # Select and rename columns to be more explicit
-        coords_df = coords_df[['county', 'state_name', 'lat', 'lng']]
-        coords_df.rename(columns={
-            'county': 'us_county',
-            'state_name': 'us_state',
-            'lat': 'correct_county_lat',
-            'lng': 'correct_county_lon'
-        }, inplace=True)
-
-        # 2. Standardize join keys in both dataframes
-        # Function to clean county names for better matching
-        def clean_county_name(county_name):
-            if isinstance(county_name, str):
-                county_name = county_name.lower().strip()
-                # Remove common Alaskan suffixes
-                county_name = county_name.replace(' borough', '')
-                county_name = county_name.replace(' census area', '')
-                county_name = county_name.replace(' municipality', '')
-                county_name = county_name.replace(' city and borough', '')
-                county_name = county_name.replace(' county', '') # Also remove ' county' for general consistency
-            return county_name
-
-        # Convert to string, strip whitespace, and convert to lowercase
-        for df_obj in [patient_df, coords_df]:
-            df_obj['us_county'] = df_obj['us_county'].astype(str).apply(clean_county_name)
-            df_obj['us_state'] = df_obj['us_state'].astype(str).str.strip().str.lower()
-
-        # --- Merging ---
-        # Drop duplicates from coords_df to avoid creating extra rows in patient_df
-        coords_df.drop_duplicates(subset=['us_county', 'us_state'], inplace=True)
-
-        # Perform a left merge to keep all patient records
-        merged_df = pd.merge(
-            patient_df,
-            coords_df,
-            on=['us_county', 'us_state'],
-            how='left'
-        )
-        print("Successfully merged the two dataframes.")
+        # County coordinates come from the Census Gazetteer (cached locally after the first parse)
+        merged_df = attach_county_coords(patient_df)
+        print("Successfully attached Gazetteer county coordinates.")
 
         # --- Verification ---
         null_coords_count = merged_df['correct_county_lat'].isnull().sum()
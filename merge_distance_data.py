@@ -1,5 +1,30 @@
 
+import numpy as np
 import pandas as pd
+from county_names import fips_codes, fips_positions, fips_array
+
+def attach_pharmacy_distances(patient_df, distances_df):
+    """
+    Attach the county-level nearest pharmacy distance columns to the patient
+    rows, keyed on the integer county FIPS code.
+    """
+    patient_df = patient_df.copy()
+
+    # --- Data Preparation ---
+    # Only these columns are carried over from the county distance table
+    distance_columns = [
+        'distance_to_nearest_pharmacy',
+        'nearest_pharmacy_name', 'nearest_pharmacy_lat', 'nearest_pharmacy_lon'
+    ]
+    distances_fips = fips_codes(distances_df)
+    positions = fips_positions(fips_codes(patient_df))
+
+    # --- Lookup ---
+    # Each county column becomes a FIPS-indexed array gathered per patient
+    for col in distance_columns:
+        fill_value = None if distances_df[col].dtype == object else np.nan
+        patient_df[col] = fips_array(distances_fips, distances_df[col], fill_value)[positions]
+    return patient_df
 
 def merge_distance_data():
     try:
@@ -11,27 +36,7 @@ def merge_distance_data():
         distances_df = pd.read_csv("county_pharmacy_distances.csv")
         print("Successfully loaded county_pharmacy_distances.csv")
 
-        # --- Data Preparation for Merging ---
-        # Select only the required columns from the distances_df
-        distance_columns = [
-            'us_county', 'us_state', 'distance_to_nearest_pharmacy',
-            'nearest_pharmacy_name', 'nearest_pharmacy_lat', 'nearest_pharmacy_lon'
-        ]
-        distances_to_merge = distances_df[distance_columns]
-
-        # Standardize join keys in both dataframes for a robust merge
-        for df in [patient_df, distances_to_merge]:
-            df['us_county'] = df['us_county'].astype(str).str.strip().str.lower()
-            df['us_state'] = df['us_state'].astype(str).str.strip().str.lower()
-
-        # --- Merging ---
-        # Perform a left merge to keep all patient records and add the distance info
-        merged_df = pd.merge(
-            patient_df,
-            distances_to_merge,
-            on=['us_county', 'us_state'],
-            how='left'
-        )
+        merged_df = attach_pharmacy_distances(patient_df, distances_df)
         print("Successfully merged the distance data into the patient data.")
 
         # --- Verification ---
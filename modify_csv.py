@@ -1,5 +1,7 @@
 import csv
-import random
+import argparse
+from itertools import islice
+import numpy as np
 
 states_data = {
     'Alaska': {'FIPS': '02', 'counties': {'Aleutians East Borough': '013', 'Aleutians West Census Area': '016', 'Anchorage Municipality': '020', 'Bethel Census Area': '050', 'Bristol Bay Borough': '060', 'Chugach Census Area': '063', 'Copper River Census Area': '066', 'Denali Borough': '068', 'Dillingham Census Area': '070', 'Fairbanks North Star Borough': '090', 'Haines Borough': '100', 'Hoonah-Angoon Census Area': '105', 'Juneau City and Borough': '110', 'Kenai Peninsula Borough': '122', 'Ketchikan Gateway Borough': '130', 'Kodiak Island Borough': '150', 'Kusilvak Census Area': '158', 'Lake and Peninsula Borough': '164', 'Matanuska-Susitna Borough': '170', 'Nome Census Area': '180', 'North Slope Borough': '185', 'Northwest Arctic Borough': '188', 'Petersburg Borough': '195', 'Prince of Wales-Hyder Census Area': '198', 'Sitka City and Borough': '220', 'Skagway Municipality': '230', 'Southeast Fairbanks Census Area': '240', 'Valdez-Cordova Census Area': '261', 'Wrangell City and Borough': '275', 'Yakutat City and Borough': '282', 'Yukon-Koyukuk Census Area': '290'}},
@@ -15,25 +17,74 @@ states_data = {
     'Maine': {'FIPS': '23', 'counties': {'Androscoggin': '001', 'Aroostook': '003', 'Cumberland': '005', 'Franklin': '007', 'Hancock': '009', 'Kennebec': '011', 'Knox': '013', 'Lincoln': '015', 'Oxford': '017', 'Penobscot': '019', 'Piscataquis': '021', 'Sagadahoc': '023', 'Somerset': '025', 'Waldo': '027', 'Washington': '029', 'York': '031'}}
 }
 
-input_file = 'C:\\Users\\703401801\\Desktop\\Cigna\\synthetic_patient_data.csv'
-output_file = 'C:\\Users\\703401801\\Desktop\\Cigna\\synthetic_patient_data_modified.csv'
+# --- Configuration ---
+SEED = 42
+BLOCK_ROWS = 100_000
+WRITE_BUFFER_SIZE = 1 << 20
 
-with open(input_file, 'r') as infile, open(output_file, 'w', newline='') as outfile:
-    reader = csv.reader(infile)
-    writer = csv.writer(outfile)
+# Flattened choice tables: every county of every state in one array, with each
+# state's counties stored contiguously (state_offsets / state_county_counts)
+STATE_NAMES = np.array(list(states_data.keys()), dtype=object)
+STATE_FIPS = np.array([info['FIPS'] for info in states_data.values()], dtype=object)
+state_county_counts = np.array([len(info['counties']) for info in states_data.values()])
+state_offsets = np.concatenate([[0], np.cumsum(state_county_counts)[:-1]])
+COUNTY_NAMES = np.array([county for info in states_data.values() for county in info['counties']], dtype=object)
+COUNTY_FIPS = np.array([info['FIPS'] + fips for info in states_data.values() for fips in info['counties'].values()], dtype=object)
 
-    header = next(reader)
-    writer.writerow(header)
+def choose_counties(rng, n):
+    """
+    Pick a state uniformly, then a county uniformly within it, for n rows at
+    once. Returns (state_idx, county_idx) into the flattened tables.
+    """
+    state_idx = rng.integers(0, len(STATE_NAMES), size=n)
+    county_idx = state_offsets[state_idx] + (rng.random(n) * state_county_counts[state_idx]).astype(np.int64)
+    return state_idx, county_idx
 
-    for row in reader:
-        state_name = random.choice(list(states_data.keys()))
-        state_info = states_data[state_name]
-        county_name = random.choice(list(state_info['counties'].keys()))
-        county_fips = state_info['counties'][county_name]
+def modify_csv(input_file, output_file, seed=SEED, block_rows=BLOCK_ROWS):
+    """
+    Reassign every patient to a random county from states_data, streaming the
+    file in blocks of block_rows so memory stays constant for any input size.
+    """
+    rng = np.random.default_rng(seed)
+    rows_written = 0
+    with open(input_file, 'r', newline='') as infile, \
+            open(output_file, 'w', newline='', buffering=WRITE_BUFFER_SIZE) as outfile:
+        reader = csv.reader(infile)
+        writer = csv.writer(outfile)
 
-        row[7] = state_name
-        row[6] = county_name
-        row[10] = state_info['FIPS']
-        row[11] = state_info['FIPS'] + county_fips
+        header = next(reader)
+        writer.writerow(header)
+        county_col = header.index('us_county') if 'us_county' in header else 6
+        state_col = header.index('us_state') if 'us_state' in header else 7
+        state_fips_col = header.index('FIPS_STATE_CODE') if 'FIPS_STATE_CODE' in header else 10
+        county_fips_col = header.index('county_fips_code') if 'county_fips_code' in header else 11
 
-        writer.writerow(row)
\ No newline at end of file
+        while True:
+            block = list(islice(reader, block_rows))
+            if not block:
+                break
+            state_idx, county_idx = choose_counties(rng, len(block))
+            states = STATE_NAMES[state_idx]
+            state_fips = STATE_FIPS[state_idx]
+            counties = COUNTY_NAMES[county_idx]
+            county_fips = COUNTY_FIPS[county_idx]
+
+            for row, state, county, s_fips, c_fips in zip(block, states, counties, state_fips, county_fips):
+                row[state_col] = state
+                row[county_col] = county
+                row[state_fips_col] = s_fips
+                row[county_fips_col] = c_fips
+            writer.writerows(block)
+            rows_written += len(block)
+
+    print(f"Reassigned {rows_written} rows and saved to {output_file}")
+    return rows_written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reassign patients to random counties from states_data.")
+    parser.add_argument('--input', default='C:\\Users\\703401801\\Desktop\\Cigna\\synthetic_patient_data.csv')
+    parser.add_argument('--output', default='C:\\Users\\703401801\\Desktop\\Cigna\\synthetic_patient_data_modified.csv')
+    parser.add_argument('--seed', type=int, default=SEED, help="Random seed")
+    parser.add_argument('--block-rows', type=int, default=BLOCK_ROWS, help="Rows reassigned per block")
+    args = parser.parse_args()
+    modify_csv(args.input, args.output, args.seed, args.block_rows)
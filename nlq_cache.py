@@ -0,0 +1,176 @@
+
+import os
+import re
+import json
+import atexit
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+# --- Configuration ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_FILE = os.path.join(BASE_DIR, ".nlq_cache", "nlq_cache.json")
+MAX_ENTRIES = 500
+# Cosine similarity (word 1-2 gram TF-IDF) above which a reworded question
+# reuses a cached translation; None disables the similarity lookup
+SIMILARITY_THRESHOLD = 0.8
+
+_WORD_RE = re.compile(r"[a-z0-9_.]+")
+# Stop words that still change what a question asks for: negations,
+# comparisons, ordering, quantifiers and numbers. Two questions only share a
+# translation when they agree on these.
+MEANING_STOP_WORDS = frozenset("""
+    no not nor none never nothing nobody noone neither without cannot cant couldnt hasnt except otherwise
+    above below under over beyond less least more most much many few several top bottom
+    first last next third before after since until during between within against
+    only all any every each both either some same other others than alone together
+    up down out off full empty per
+    one two three four five six eight nine ten eleven twelve fifteen twenty forty fifty sixty hundred
+""".split())
+
+# "schema hash:normalized question" -> entry, least recently used first
+_entries = None
+# schema hash -> (vectorizer, TF-IDF matrix, entry keys), rebuilt after changes
+_similarity_index = {}
+# Hit counts and recency changed since the file was last written
+_dirty = False
+
+def normalize_question(question):
+    """Lowercase, drop punctuation and collapse whitespace: 'How many patients?' -> 'how many patients'."""
+    return " ".join(_WORD_RE.findall(question.lower()))
+
+def content_words(question):
+    """
+    Normalized words minus English stop words, keeping MEANING_STOP_WORDS. A
+    similar question only reuses a translation when these match exactly, so
+    'patients in Texas' never answers 'patients in Ohio', nor 'age below 40'
+    'age above 40', however close their TF-IDF vectors are.
+    """
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+    return frozenset(word for word in question.split()
+                     if word not in ENGLISH_STOP_WORDS or word in MEANING_STOP_WORDS)
+
+def schema_hash(db_schema):
+    return hashlib.sha256(db_schema.encode()).hexdigest()[:16]
+
+def _key(schema_digest, question):
+    return f"{schema_digest}:{question}"
+
+def _load_entries():
+    global _entries
+    if _entries is None:
+        _entries = OrderedDict()
+        try:
+            with open(CACHE_FILE, 'r') as f:
+                stored = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            stored = {}
+        for entry in stored.get('entries', []):
+            _entries[_key(entry['schema'], entry['question'])] = entry
+    return _entries
+
+def save_cache():
+    global _dirty
+    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+    tmp_path = CACHE_FILE + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'entries': list(_load_entries().values())}, f, indent=1)
+    os.replace(tmp_path, CACHE_FILE)
+    _dirty = False
+
+@atexit.register
+def _save_if_dirty():
+    # Hits only touch memory; they are written with the next change or at exit
+    if _dirty and _entries is not None:
+        save_cache()
+
+def _schema_index(schema_digest):
+    """TF-IDF matrix over the cached questions for one schema."""
+    if schema_digest not in _similarity_index:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        entries = _load_entries()
+        keys = [key for key, entry in entries.items() if entry['schema'] == schema_digest]
+        if not keys:
+            return None
+        vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, token_pattern=_WORD_RE.pattern)
+        matrix = vectorizer.fit_transform([entries[key]['question'] for key in keys])
+        _similarity_index[schema_digest] = (vectorizer, matrix, keys)
+    return _similarity_index[schema_digest]
+
+def _hit(key):
+    global _dirty
+    entries = _load_entries()
+    entries.move_to_end(key)
+    entries[key]['hits'] += 1
+    _dirty = True
+    return entries[key]['sql']
+
+def match_key(question, db_schema, similarity_threshold=SIMILARITY_THRESHOLD):
+    """
+    Key of the cached entry that answers `question` against `db_schema`, or
+    None. The exact normalized question is tried first, then the most similar
+    cached question for the same schema when its TF-IDF cosine similarity
+    reaches `similarity_threshold` and both share the same content words.
+    """
+    schema_digest = schema_hash(db_schema)
+    normalized = normalize_question(question)
+    key = _key(schema_digest, normalized)
+    if key in _load_entries():
+        return key
+    if not similarity_threshold:
+        return None
+
+    index = _schema_index(schema_digest)
+    if index is None:
+        return None
+    vectorizer, matrix, keys = index
+    scores = (matrix @ vectorizer.transform([normalized]).T).toarray().ravel()
+    words = content_words(normalized)
+    entries = _load_entries()
+    for best in scores.argsort()[::-1]:
+        if scores[best] < similarity_threshold:
+            break
+        if content_words(entries[keys[best]]['question']) == words:
+            return keys[best]
+    return None
+
+def lookup(question, db_schema, similarity_threshold=SIMILARITY_THRESHOLD):
+    """Cached SQL for `question` against `db_schema` (see match_key), or None on a miss."""
+    key = match_key(question, db_schema, similarity_threshold)
+    return _hit(key) if key is not None else None
+
+def store(question, db_schema, sql_query):
+    """Cache a translation, evicting the least recently used entries beyond MAX_ENTRIES."""
+    entries = _load_entries()
+    schema_digest = schema_hash(db_schema)
+    normalized = normalize_question(question)
+    key = _key(schema_digest, normalized)
+    entries[key] = {
+        'schema': schema_digest,
+        'question': normalized,
+        'sql': sql_query,
+        'hits': 0,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+    entries.move_to_end(key)
+    while len(entries) > MAX_ENTRIES:
+        entries.popitem(last=False)
+    _similarity_index.clear()
+    save_cache()
+
+def discard(question, db_schema, similarity_threshold=SIMILARITY_THRESHOLD):
+    """
+    Drop the cached translation that answers `question`, e.g. one whose SQL
+    failed to execute. This is the entry lookup would serve, which may be
+    stored under a similar question rather than this one.
+    """
+    key = match_key(question, db_schema, similarity_threshold)
+    if key is not None:
+        del _load_entries()[key]
+        _similarity_index.clear()
+        save_cache()
+
+def clear_cache():
+    _load_entries().clear()
+    _similarity_index.clear()
+    save_cache()
@@ -1,4 +1,4 @@
-from flask import Flask, render_template, jsonify, request, url_for
+from flask import Flask, Response, render_template, jsonify, request, url_for
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
@@ -7,10 +7,24 @@ from collections import defaultdict
 import os
 import joblib
 from io import StringIO
+from geo_clustering import load_region_model, assign_regions, REGION_MODEL_PATH
+from medical_history import parse_medical_history, multihot_frame, MULTIHOT_PREFIX
+from county_names import FIPS_COLUMN, fips_codes, fips_positions, fips_counts, county_geometry, legacy_name_aliases
+from sharded_dataset import is_sharded_dataset, manifest_path, load_patient_table
+from response_cache import dataset_version, cached_json_response
+from frame_json import FRAME_FORMATS, dumps_payload
+from county_search import build_county_search_index, search_counties, DEFAULT_LIMIT, MAX_LIMIT
+from app_metrics import init_metrics, span, count_rows
+from request_profiler import init_profiler
+from spatial_index import build_grid_index, query_bbox, cluster_cell_degrees, cluster_points
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 # Allow cross-origin requests in case the frontend is served from a different origin/port
 CORS(app)
+# Request latency/count histograms and handler phase spans, served on /metrics
+init_metrics(app)
+# Opt-in per-request cProfile for admin callers; a no-op unless PROFILE_TOKEN is set
+init_profiler(app)
 
 # --- Fictitious Pharmacy Data (for demonstration) ---
 PHARMACIES_DATA = [
@@ -85,19 +99,55 @@ def load_county_data(file_path):
     unique_counties_sorted = sorted(unique_counties, key=lambda x: x.lower())
     return avg_county_coords, unique_counties_sorted
 
-# Load county data at app startup (use paths relative to this file)
+def county_data_from_frame(df):
+    """
+    load_county_data for an already loaded patient frame (e.g. a sharded
+    dataset). Frames without correct_county_lat/lon, such as generator shards,
+    use each county's Gazetteer internal point, looked up by FIPS code.
+    """
+    if not {'us_county', 'us_state'}.issubset(df.columns):
+        raise ValueError("Patient data has no us_county/us_state columns to build the county list from")
+    if {'correct_county_lat', 'correct_county_lon'}.issubset(df.columns):
+        rows = df[['us_county', 'us_state', 'correct_county_lat', 'correct_county_lon']].dropna()
+    else:
+        geometry = county_geometry()
+        positions = fips_positions(fips_codes(df))
+        rows = pd.DataFrame({
+            'us_county': df['us_county'].to_numpy(),
+            'us_state': df['us_state'].to_numpy(),
+            'correct_county_lat': geometry['lat'][positions],
+            'correct_county_lon': geometry['lon'][positions],
+        }).dropna()
+        if rows.empty and len(df):
+            raise ValueError("No patient county matches a Gazetteer FIPS code; add correct_county_lat/correct_county_lon columns")
+    full_names = rows['us_county'].astype(str).str.strip() + ", " + rows['us_state'].astype(str).str.strip()
+    means = rows.groupby(full_names, sort=False)[['correct_county_lat', 'correct_county_lon']].mean()
+    avg_county_coords = {
+        county: {'latitude': lat, 'longitude': lon}
+        for county, lat, lon in means.itertuples()
+    }
+    unique_counties = list(pd.Series(means.index).groupby(means.index.str.lower(), sort=False).first())
+    return avg_county_coords, sorted(unique_counties, key=lambda x: x.lower())
+
+# Load county data at app startup (use paths relative to this file).
+# PATIENT_DATA_PATH may point at a CSV or at a sharded dataset directory/manifest.
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-county_data_file = os.path.join(BASE_DIR, 'patient_data_with_imputed_distances.csv')
-avg_county_coords, unique_county_names = load_county_data(county_data_file)
+county_data_file = os.environ.get('PATIENT_DATA_PATH') or os.path.join(BASE_DIR, 'patient_data_with_imputed_distances.csv')
+patient_data_sharded = is_sharded_dataset(county_data_file)
+if patient_data_sharded:
+    avg_county_coords, unique_county_names = {}, []
+else:
+    avg_county_coords, unique_county_names = load_county_data(county_data_file)
 
 # If the primary file isn't found or results are empty, try a secondary known filename
-if not unique_county_names:
+if not unique_county_names and not patient_data_sharded:
     alt_county_file = os.path.join(BASE_DIR, 'synthetic_patient_data_with_distances_New.csv')
     avg_county_coords, unique_county_names = load_county_data(alt_county_file)
 
 # Load the full patient data for analysis
 try:
-    patient_data_df = pd.read_csv(county_data_file)
+    # Sharded datasets are read part by part in parallel
+    patient_data_df = load_patient_table(county_data_file)
     print(f"✓ Loaded patient data: {len(patient_data_df)} rows")
     print(f"  Columns: {list(patient_data_df.columns)}")
 except FileNotFoundError:
@@ -107,6 +157,11 @@ except Exception as e:
     print(f"✗ Error loading patient data: {e}")
     patient_data_df = pd.DataFrame()
 
+# Sharded datasets carry no separate county file; a frame whose counties have
+# no coordinates stops startup here rather than serving a county list at (0, 0)
+if patient_data_sharded and not patient_data_df.empty:
+    avg_county_coords, unique_county_names = county_data_from_frame(patient_data_df)
+
 # Load the trained ML model
 try:
     model_path = os.path.join(BASE_DIR, 'pharmacy_found_model.joblib')
@@ -119,6 +174,17 @@ except Exception as e:
     print(f"✗ Error loading ML model: {e}")
     ml_model = None
 
+# Load the persisted region model used to label patients with a Group
+try:
+    region_model = load_region_model(REGION_MODEL_PATH)
+    print(f"✓ Loaded region model from {REGION_MODEL_PATH}")
+except FileNotFoundError:
+    print(f"✗ Region model not found: {REGION_MODEL_PATH}")
+    region_model = None
+except Exception as e:
+    print(f"✗ Error loading region model: {e}")
+    region_model = None
+
 # Load top counties data (relative path)
 top_counties_path = os.path.join(BASE_DIR, 'total_patients_by_county.csv')
 try:
@@ -159,10 +225,149 @@ except Exception as e:
     print(f"✗ Error loading county pharmacy distances: {e}")
     county_distances_df = pd.DataFrame()
 
+# Key both tables on the integer county FIPS code once at startup; per-county
+# patient counts live in an array indexed by FIPS
+patients_by_fips = fips_counts([])
+if not patient_data_df.empty:
+    patient_data_df[FIPS_COLUMN] = fips_codes(patient_data_df)
+    patients_by_fips = fips_counts(patient_data_df[FIPS_COLUMN])
+if not county_distances_df.empty:
+    county_distances_df[FIPS_COLUMN] = fips_codes(county_distances_df)
+
+# Prefix index for the county picker, ranked by patients per county; old
+# names of renamed or merged counties find their current entry
+county_patient_counts = pd.Series(0, index=unique_county_names, dtype=np.int64)
+if not patient_data_df.empty and unique_county_names:
+    full_names = patient_data_df['us_county'].astype(str).str.strip() + ", " + patient_data_df['us_state'].astype(str).str.strip()
+    name_counts = full_names.str.lower().value_counts()
+    county_patient_counts[:] = name_counts.reindex([name.lower() for name in unique_county_names]).fillna(0).to_numpy(dtype=np.int64)
+county_search_index = build_county_search_index(unique_county_names, county_patient_counts.to_numpy(),
+                                                aliases=legacy_name_aliases(unique_county_names))
+
+# Responses of the static-data endpoints are cached per dataset version
+DATASET_VERSION = dataset_version([
+    manifest_path(county_data_file) if patient_data_sharded else county_data_file,
+    county_distances_path,
+    pharmacy_suggestions_path,
+])
+
+# Map queries: at or below CLUSTER_MAX_ZOOM points are aggregated into clusters
+MAP_MAX_LIMIT = 1000
+MAP_MAX_ZOOM = 22
+CLUSTER_MAX_ZOOM = 7
+VIEWPORT_ARGS = ('bbox', 'limit', 'cursor', 'zoom')
+
+# (name, dataset version) -> payload dict and grid index over its map frame
+_payload_cache = {}
+_grid_cache = {}
+
+def dataset_payload(name, build_payload):
+    """Payload built once per dataset version and shared by full and viewport responses."""
+    key = (name, DATASET_VERSION)
+    if key not in _payload_cache:
+        _payload_cache[key] = build_payload()
+    return _payload_cache[key]
+
+def frame_format_arg():
+    frame_format = request.args.get('format', 'records')
+    if frame_format not in FRAME_FORMATS:
+        raise ValueError(f"Unknown format '{frame_format}'. Use one of: {', '.join(FRAME_FORMATS)}")
+    return frame_format
+
+def dataset_json(name, build_payload):
+    """
+    JSON response built once per dataset version, then served from
+    pre-serialized (and compressed) bytes. DataFrames in the payload are
+    encoded column-wise, as row objects or, with ?format=columns, as one
+    array per column.
+    """
+    try:
+        frame_format = frame_format_arg()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    def build_body():
+        payload = dataset_payload(name, build_payload)
+        with span('serialize'):
+            return dumps_payload(payload, frame_format)
+    return cached_json_response(f"{name}:{frame_format}", DATASET_VERSION, build_body)
+
+def parse_viewport_args(args):
+    """
+    bbox=minLon,minLat,maxLon,maxLat, limit, cursor and zoom from the query
+    string (ValueError if malformed). bbox values must be finite with
+    latitudes in [-90, 90]; limit is capped at MAP_MAX_LIMIT and zoom at
+    MAP_MAX_ZOOM.
+    """
+    viewport = {'bbox': None, 'limit': MAP_MAX_LIMIT, 'offset': 0, 'zoom': None}
+    if args.get('bbox'):
+        try:
+            bbox = [float(value) for value in args['bbox'].split(',')]
+        except ValueError:
+            bbox = []
+        if len(bbox) != 4 or not np.isfinite(bbox).all() or bbox[1] > bbox[3]:
+            raise ValueError("bbox must be minLon,minLat,maxLon,maxLat")
+        if not (-90 <= bbox[1] and bbox[3] <= 90):
+            raise ValueError("bbox latitudes must be between -90 and 90")
+        viewport['bbox'] = bbox
+    for arg, key in (('limit', 'limit'), ('cursor', 'offset'), ('zoom', 'zoom')):
+        if args.get(arg):
+            if not args[arg].isdecimal():
+                raise ValueError(f"{arg} must be a non-negative integer")
+            viewport[key] = int(args[arg])
+    viewport['limit'] = min(viewport['limit'], MAP_MAX_LIMIT)
+    if viewport['zoom'] is not None:
+        viewport['zoom'] = min(viewport['zoom'], MAP_MAX_ZOOM)
+    return viewport
+
+def viewport_json(name, build_payload, list_key, weight_column):
+    """
+    Map query over a cached payload: the rows of `list_key` inside the
+    bounding box (answered from a grid index), or at low zoom their clusters
+    with the summed `weight_column`. Rows and clusters alike are paged with
+    limit/cursor; `total` counts the rows in the box. Other payload fields
+    (overall totals) are kept.
+    """
+    try:
+        viewport = parse_viewport_args(request.args)
+        frame_format = frame_format_arg()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    payload = dataset_payload(name, build_payload)
+    frame = payload[list_key]
+    if not isinstance(frame, pd.DataFrame):
+        frame = pd.DataFrame(columns=['latitude', 'longitude', weight_column])
+    if viewport['bbox'] is None:
+        positions = np.arange(len(frame))
+    else:
+        key = (name, DATASET_VERSION)
+        if key not in _grid_cache:
+            _grid_cache[key] = build_grid_index(frame['latitude'], frame['longitude'])
+        with span('filter'):
+            positions = query_bbox(_grid_cache[key], *viewport['bbox'])
+
+    result = {field: value for field, value in payload.items() if field != list_key}
+    result['total'] = int(len(positions))
+    if viewport['zoom'] is not None and viewport['zoom'] <= CLUSTER_MAX_ZOOM:
+        visible = frame.iloc[positions]
+        clusters = cluster_points(visible['latitude'], visible['longitude'], visible[weight_column],
+                                  cluster_cell_degrees(viewport['zoom']))
+        clusters[weight_column] = clusters.pop('weight').astype(frame[weight_column].dtype)
+        items_key, items = 'clusters', clusters
+    else:
+        items_key, items = list_key, frame.iloc[positions]
+    start, stop = viewport['offset'], viewport['offset'] + viewport['limit']
+    result[items_key] = items.iloc[start:stop]
+    result['next_cursor'] = str(stop) if viewport['limit'] and stop < len(items) else None
+    with span('serialize'):
+        body = dumps_payload(result, frame_format)
+    return Response(body, mimetype='application/json')
+
 print(f"\n=== Data Loading Summary ===")
 print(f"Patient data rows: {len(patient_data_df)}")
 print(f"Unique counties: {len(unique_county_names)}")
 print(f"ML model loaded: {ml_model is not None}")
+print(f"Region model loaded: {region_model is not None}")
 print(f"Pharmacy suggestions: {len(pharmacy_suggestions_df)}")
 print(f"===========================\n")
 
@@ -186,7 +391,16 @@ def debug_info():
 
 @app.route('/api/counties')
 def get_counties():
-    return jsonify({'counties': unique_county_names})
+    return dataset_json('counties', lambda: {'counties': unique_county_names})
+
+@app.route('/api/counties/search')
+def search_county_names():
+    """Top counties (by patient count) whose names start with ?q=, for the county picker."""
+    limit = request.args.get('limit', str(DEFAULT_LIMIT))
+    if not limit.isdigit():
+        return jsonify({'error': 'limit must be a non-negative integer'}), 400
+    matches = search_counties(county_search_index, request.args.get('q', ''), min(int(limit), MAX_LIMIT))
+    return jsonify({'counties': [{'name': name, 'patients': patients} for name, patients in matches]})
 
 @app.route('/api/find_pharmacies', methods=['POST'])
 def find_pharmacies():
@@ -205,16 +419,17 @@ def find_pharmacies():
         lambda row: haversine_distance(user_lat, user_lon, row['latitude'], row['longitude']),
         axis=1
     )
-    pharmacies_df['distance_miles'] = distances
+    # Distances go on a per-request copy; the shared frame is read by concurrent requests
+    pharmacies = pharmacies_df.assign(distance_miles=distances)
     
     # Get nearest pharmacy
-    nearest_pharmacy = pharmacies_df.sort_values(by='distance_miles').iloc[0]
+    nearest_pharmacy = pharmacies.sort_values(by='distance_miles').iloc[0]
     
     # Get relevant pharmacies based on medical conditions
     relevant_pharmacies = []
     if medical_conditions:
-        relevant_df = pharmacies_df[
-            pharmacies_df['specialties'].apply(lambda x: any(cond in x for cond in medical_conditions))
+        relevant_df = pharmacies[
+            pharmacies['specialties'].apply(lambda x: any(cond in x for cond in medical_conditions))
         ].sort_values(by='distance_miles')
         
         for idx, pharmacy in relevant_df.head(3).iterrows():
@@ -228,7 +443,7 @@ def find_pharmacies():
     
     # Get all nearby pharmacies
     all_nearby = []
-    for idx, pharmacy in pharmacies_df.sort_values(by='distance_miles').head(5).iterrows():
+    for idx, pharmacy in pharmacies.sort_values(by='distance_miles').head(5).iterrows():
         all_nearby.append({
             'name': pharmacy['name'],
             'distance': round(pharmacy['distance_miles'], 2),
@@ -256,11 +471,14 @@ def find_pharmacies():
 @app.route('/api/clusters')
 def get_clusters():
     """Get unique cluster/group names from the data"""
+    return dataset_json('clusters', clusters_payload)
+
+def clusters_payload():
     if patient_data_df.empty or 'group' not in patient_data_df.columns:
-        return jsonify({'clusters': []})
+        return {'clusters': []}
     
     clusters = sorted(patient_data_df['group'].dropna().unique().tolist())
-    return jsonify({'clusters': clusters})
+    return {'clusters': clusters}
 
 @app.route('/api/cluster_analysis', methods=['POST'])
 def analyze_cluster():
@@ -271,7 +489,8 @@ def analyze_cluster():
     if patient_data_df.empty or not selected_cluster:
         return jsonify({'error': 'Invalid cluster or no data available'}), 400
     
-    cluster_data = patient_data_df[patient_data_df['group'] == selected_cluster].copy()
+    with span('filter'):
+        cluster_data = patient_data_df[patient_data_df['group'] == selected_cluster].copy()
     
     if cluster_data.empty:
         return jsonify({'error': 'No data for selected cluster'}), 404
@@ -286,86 +505,106 @@ def analyze_cluster():
         'subgroups': {}
     }
     
-    # Analyze by different subgroups
-    subgroup_columns = ['marital_status', 'is_senior_citizen', 'is_pregnant', 'has_chronic_illness']
+    with span('groupby'):
+        # Analyze by different subgroups
+        subgroup_columns = ['marital_status', 'is_senior_citizen', 'is_pregnant', 'has_chronic_illness']
     
-    for col in subgroup_columns:
-        if col in cluster_data.columns:
-            subgroup_list = []
-            subgroup_stats = cluster_data.groupby(col)['distance_to_nearest_pharmacy_miles'].agg([
-                ('count', 'count'),
-                ('avg_distance', 'mean'),
-                ('median_distance', 'median')
-            ]).reset_index()
-
-            for _, row in subgroup_stats.iterrows():
-                subgroup_value = row[col]
-                sub_cluster_data = cluster_data[cluster_data[col] == subgroup_value]
+        for col in subgroup_columns:
+            if col in cluster_data.columns:
+                subgroup_list = []
+                subgroup_stats = cluster_data.groupby(col)['distance_to_nearest_pharmacy_miles'].agg([
+                    ('count', 'count'),
+                    ('avg_distance', 'mean'),
+                    ('median_distance', 'median')
+                ]).reset_index()
+
+                for _, row in subgroup_stats.iterrows():
+                    subgroup_value = row[col]
+                    sub_cluster_data = cluster_data[cluster_data[col] == subgroup_value]
                 
-                age_illness_dist = sub_cluster_data.groupby(['age', 'has_chronic_illness']).size().unstack(fill_value=0)
-                if True not in age_illness_dist.columns:
-                    age_illness_dist[True] = 0
-                if False not in age_illness_dist.columns:
-                    age_illness_dist[False] = 0
-                age_illness_dist = age_illness_dist.reset_index().sort_values('age')
-
-                subgroup_list.append({
-                    'value': str(subgroup_value),
-                    'count': int(row['count']),
-                    'avg_distance': round(float(row['avg_distance']), 2),
-                    'median_distance': round(float(row['median_distance']), 2),
-                    'age_distribution': {
-                        'ages': age_illness_dist['age'].tolist(),
-                        'with_illness': age_illness_dist[True].tolist(),
-                        'without_illness': age_illness_dist[False].tolist(),
-                        'with_illness_count': int(age_illness_dist[True].sum()),
-                        'without_illness_count': int(age_illness_dist[False].sum())
-                    }
-                })
-            analysis['subgroups'][col] = subgroup_list
+                    age_illness_dist = sub_cluster_data.groupby(['age', 'has_chronic_illness']).size().unstack(fill_value=0)
+                    if True not in age_illness_dist.columns:
+                        age_illness_dist[True] = 0
+                    if False not in age_illness_dist.columns:
+                        age_illness_dist[False] = 0
+                    age_illness_dist = age_illness_dist.reset_index().sort_values('age')
+
+                    subgroup_list.append({
+                        'value': str(subgroup_value),
+                        'count': int(row['count']),
+                        'avg_distance': round(float(row['avg_distance']), 2),
+                        'median_distance': round(float(row['median_distance']), 2),
+                        'age_distribution': {
+                            'ages': age_illness_dist['age'].tolist(),
+                            'with_illness': age_illness_dist[True].tolist(),
+                            'without_illness': age_illness_dist[False].tolist(),
+                            'with_illness_count': int(age_illness_dist[True].sum()),
+                            'without_illness_count': int(age_illness_dist[False].sum())
+                        }
+                    })
+                analysis['subgroups'][col] = subgroup_list
     
-    return jsonify(analysis)
+    count_rows(len(cluster_data))
+    with span('serialize'):
+        response = jsonify(analysis)
+    return response
 
 # --- TAB 3: Pharmacy Desert & Suggestions API ---
 @app.route('/api/pharmacy_deserts')
 def get_pharmacy_deserts():
-    """Get counties with distance > 10 miles (pharmacy deserts)"""
+    """
+    Get counties with distance > 10 miles (pharmacy deserts). With bbox,
+    limit, cursor or zoom only the visible part is returned (see viewport_json).
+    """
+    if any(arg in request.args for arg in VIEWPORT_ARGS):
+        return viewport_json('pharmacy_deserts', pharmacy_deserts_payload, 'desert_counties', 'affected_patients')
+    return dataset_json('pharmacy_deserts', pharmacy_deserts_payload)
+
+def pharmacy_deserts_payload():
     if patient_data_df.empty:
-        return jsonify({'desert_counties': [], 'total_affected': 0, 'avg_distance': 0})
+        return {'desert_counties': [], 'total_affected': 0, 'avg_distance': 0}
     
-    desert_data = patient_data_df[patient_data_df['distance_to_nearest_pharmacy'] >= 20].copy()
+    count_rows(len(patient_data_df))
+    with span('filter'):
+        desert_data = patient_data_df[patient_data_df['distance_to_nearest_pharmacy'] >= 20].copy()
     
     if desert_data.empty:
-        return jsonify({'desert_counties': [], 'total_affected': 0, 'avg_distance': 0})
+        return {'desert_counties': [], 'total_affected': 0, 'avg_distance': 0}
     
-    county_stats = desert_data.groupby(['us_county', 'us_state']).agg({
-        'patient_id': 'count',
-        'distance_to_nearest_pharmacy_miles': 'mean',
-        'correct_county_lat': 'mean',
-        'correct_county_lon': 'mean'
-    }).reset_index()
+    with span('groupby'):
+        county_stats = desert_data.groupby(FIPS_COLUMN).agg(
+            county=('us_county', 'first'),
+            state=('us_state', 'first'),
+            affected_patients=('patient_id', 'count'),
+            avg_distance=('distance_to_nearest_pharmacy_miles', 'mean'),
+            latitude=('correct_county_lat', 'mean'),
+            longitude=('correct_county_lon', 'mean')
+        ).reset_index(drop=True)
+        county_stats = county_stats.sort_values('affected_patients', ascending=False)
     
-    county_stats.columns = ['county', 'state', 'affected_patients', 'avg_distance', 'latitude', 'longitude']
-    county_stats = county_stats.sort_values('affected_patients', ascending=False)
+    # groupby drops rows without a county code; they still count in total_affected
+    unmapped_patients = int(desert_data[FIPS_COLUMN].isna().sum())
+    if unmapped_patients:
+        print(f"⚠ {unmapped_patients} desert patients have no county FIPS code and are left off the county list")
     
-    desert_counties = []
-    for _, row in county_stats.iterrows():
-        desert_counties.append({
-            'county': f"{row['county']}, {row['state']}",
-            'affected_patients': int(row['affected_patients']),
-            'avg_distance': round(float(row['avg_distance']), 2),
-            'latitude': float(row['latitude']),
-            'longitude': float(row['longitude'])
-        })
+    # Built column-wise; frame_json serializes it without per-row dicts
+    desert_counties = pd.DataFrame({
+        'county': county_stats['county'].astype(str) + ", " + county_stats['state'].astype(str),
+        'affected_patients': county_stats['affected_patients'].astype(int),
+        'avg_distance': county_stats['avg_distance'].round(2),
+        'latitude': county_stats['latitude'].astype(float),
+        'longitude': county_stats['longitude'].astype(float),
+    })
     
     # Calculate overall average distance for desert areas
     overall_avg_distance = float(desert_data['distance_to_nearest_pharmacy_miles'].mean())
     
-    return jsonify({
+    return {
         'desert_counties': desert_counties,
         'total_affected': int(len(desert_data)),
+        'unmapped_patients': unmapped_patients,
         'avg_distance': round(overall_avg_distance, 2)
-    })
+    }
 
 @app.route('/api/pharmacy_suggestions')
 
@@ -373,95 +612,42 @@ def get_pharmacy_suggestions():
 
     """Generate pharmacy suggestions based on the new county-level desert data."""
 
-    if county_distances_df.empty or patient_data_df.empty:
+    if any(arg in request.args for arg in VIEWPORT_ARGS):
+        return viewport_json('pharmacy_suggestions', pharmacy_suggestions_payload, 'suggestions', 'potential_patients')
+    return dataset_json('pharmacy_suggestions', pharmacy_suggestions_payload)
 
-        return jsonify({'suggestions': []})
 
 
+def pharmacy_suggestions_payload():
+    if county_distances_df.empty or patient_data_df.empty:
+        return {'suggestions': []}
 
     # 1. Identify desert counties
-
-    desert_counties_df = county_distances_df[county_distances_df['distance_to_nearest_pharmacy'] >= 20].copy()
-
-
+    count_rows(len(county_distances_df))
+    with span('filter'):
+        desert_counties_df = county_distances_df[county_distances_df['distance_to_nearest_pharmacy'] >= 20]
 
     if desert_counties_df.empty:
-
-        return jsonify({'suggestions': []})
-
-
-
-    # 2. Calculate affected patient counts
-
-    patient_data_df['us_county_lower'] = patient_data_df['us_county'].str.lower().str.strip()
-
-    patient_data_df['us_state_lower'] = patient_data_df['us_state'].str.lower().str.strip()
-
-    desert_counties_df['us_county_lower'] = desert_counties_df['us_county'].str.lower().str.strip()
-
-    desert_counties_df['us_state_lower'] = desert_counties_df['us_state'].str.lower().str.strip()
-
-
-
-    patient_counts = patient_data_df.groupby(['us_county_lower', 'us_state_lower']).size().reset_index(name='potential_patients')
-
-
-
-    # 3. Merge desert counties with patient counts
-
-    merged_df = pd.merge(
-
-        desert_counties_df,
-
-        patient_counts,
-
-        on=['us_county_lower', 'us_state_lower'],
-
-        how='left'
-
-    )
-
-    merged_df['potential_patients'] = merged_df['potential_patients'].fillna(0).astype(int)
-
-
-
-    # 4. Format suggestions
-
-    suggestions = []
-
-    for _, row in merged_df.iterrows():
-
-        potential_patients = row['potential_patients']
-
-        # Simple cost estimation formula
-
-        estimated_cost = 500000 + (potential_patients * 1000)
-
-        
-
-        suggestions.append({
-
-            'county': f"{row['us_county'].title()}, {row['us_state'].title()}",
-
-            'latitude': row['correct_county_lat'],
-
-            'longitude': row['correct_county_lon'],
-
-            'potential_patients': potential_patients,
-
-            'estimated_cost': estimated_cost
-
-        })
-
-
+        return {'suggestions': []}
+
+    # 2. Look up affected patient counts by county FIPS (counted once at startup);
+    # timed as the groupby phase, which this lookup replaces
+    with span('groupby'):
+        potential_patients = patients_by_fips[fips_positions(desert_counties_df[FIPS_COLUMN])].astype(int)
+
+    # 3. Format suggestions column-wise (simple cost estimation formula)
+    suggestions = pd.DataFrame({
+        'county': desert_counties_df['us_county'].str.title() + ", " + desert_counties_df['us_state'].str.title(),
+        'latitude': desert_counties_df['correct_county_lat'].astype(float),
+        'longitude': desert_counties_df['correct_county_lon'].astype(float),
+        'potential_patients': potential_patients,
+        'estimated_cost': 500000 + potential_patients * 1000,
+    })
 
     # Sort by potential patients, descending
+    suggestions = suggestions.sort_values('potential_patients', ascending=False, kind='stable')
 
-    suggestions = sorted(suggestions, key=lambda x: x['potential_patients'], reverse=True)
-
-
-
-    return jsonify({'suggestions': suggestions})
+    return {'suggestions': suggestions}
 
 # --- TAB 4: File Upload & ML Prediction API ---
 @app.route('/api/predict_pharmacy', methods=['POST'])
@@ -500,8 +686,10 @@ def predict_pharmacy():
     
     try:
         # Read uploaded CSV
-        content = file.read().decode('utf-8')
-        uploaded_df = pd.read_csv(StringIO(content))
+        with span('parse'):
+            content = file.read().decode('utf-8')
+            uploaded_df = pd.read_csv(StringIO(content))
+        count_rows(len(uploaded_df))
         
         print(f"\n=== File Upload Processing ===")
         print(f"Uploaded file: {file.filename}")
@@ -591,6 +779,7 @@ def predict_pharmacy():
                 # Try to infer expected columns from the trained pipeline
                 expected_num = []
                 expected_cat = []
+                expected_multihot = []
                 try:
                     preprocessor = getattr(ml_model, 'named_steps', {}).get('preprocessor', None)
                     if preprocessor is not None:
@@ -600,6 +789,8 @@ def predict_pharmacy():
                                 expected_num = list(cols)
                             elif name == 'cat':
                                 expected_cat = list(cols)
+                            elif name == 'multihot':
+                                expected_multihot = list(cols)
                 except Exception as _:
                     pass
 
@@ -615,49 +806,65 @@ def predict_pharmacy():
                 # Handle naming mismatches (e.g., 'group' -> 'Group')
                 if 'Group' in expected_cat and 'Group' not in uploaded_df.columns and 'group' in uploaded_df.columns:
                     uploaded_df['Group'] = uploaded_df['group']
-                
-                # Build feature frame with all expected columns
-                feature_df = pd.DataFrame(index=uploaded_df.index)
-
-                # Numeric: ensure existence and fill NaNs with 0
-                for col in expected_num:
-                    if col in uploaded_df.columns:
-                        # Coerce to numeric when possible
-                        feature_df[col] = pd.to_numeric(uploaded_df[col], errors='coerce').fillna(0)
-                    else:
-                        feature_df[col] = 0
-                        print(f"⚠ Missing numeric column '{col}', defaulting to 0")
 
-                # Categorical: pass-through as string; default to 'Unknown'
-                for col in expected_cat:
-                    if col in uploaded_df.columns:
-                        feature_df[col] = uploaded_df[col].astype(str).fillna('Unknown')
-                    else:
-                        # Provide a reasonable default per column when helpful
-                        default_value = 'Unknown'
-                        if col in ['medical_history', 'drug_needs']:
-                            default_value = 'None'
-                        elif col in ['has_chronic_illness', 'is_senior_citizen']:
-                            default_value = False
-                        feature_df[col] = default_value
-                        print(f"⚠ Missing categorical column '{col}', defaulting to {default_value}")
-
-                # Keep only expected columns in the right order
-                feature_df = feature_df[expected_num + expected_cat]
+                # Label patients without a group from their coordinates using the persisted region model
+                if ('Group' in expected_cat and 'Group' not in uploaded_df.columns and region_model is not None
+                        and 'latitude' in uploaded_df.columns and 'longitude' in uploaded_df.columns):
+                    uploaded_df['Group'] = assign_regions(region_model, uploaded_df['latitude'], uploaded_df['longitude'])
+                    uploaded_df['Group'] = uploaded_df['Group'].fillna('Unknown')
+                    print(f"✓ Assigned Group from coordinates for {len(uploaded_df)} patients")
+                
+                with span('feature_build'):
+                    # Build feature frame with all expected columns
+                    feature_df = pd.DataFrame(index=uploaded_df.index)
+
+                    # Numeric: ensure existence and fill NaNs with 0
+                    for col in expected_num:
+                        if col in uploaded_df.columns:
+                            # Coerce to numeric when possible
+                            feature_df[col] = pd.to_numeric(uploaded_df[col], errors='coerce').fillna(0)
+                        else:
+                            feature_df[col] = 0
+                            print(f"⚠ Missing numeric column '{col}', defaulting to 0")
+
+                    # Categorical: pass-through as string; default to 'Unknown'
+                    for col in expected_cat:
+                        if col in uploaded_df.columns:
+                            feature_df[col] = uploaded_df[col].astype(str).fillna('Unknown')
+                        else:
+                            # Provide a reasonable default per column when helpful
+                            default_value = 'Unknown'
+                            if col in ['medical_history', 'drug_needs']:
+                                default_value = 'None'
+                            elif col in ['has_chronic_illness', 'is_senior_citizen']:
+                                default_value = False
+                            feature_df[col] = default_value
+                            print(f"⚠ Missing categorical column '{col}', defaulting to {default_value}")
+
+                    # Multi-hot medical history: parse each distinct history once into the model's vocabulary
+                    if expected_multihot:
+                        vocabulary = [col[len(MULTIHOT_PREFIX):] for col in expected_multihot]
+                        history = uploaded_df['medical_history'] if 'medical_history' in uploaded_df.columns else pd.Series([None] * len(uploaded_df), index=uploaded_df.index)
+                        history_matrix, _ = parse_medical_history(history, vocabulary=vocabulary)
+                        feature_df = pd.concat([feature_df, multihot_frame(history_matrix, vocabulary, index=uploaded_df.index)], axis=1)
+
+                    # Keep only expected columns in the right order
+                    feature_df = feature_df[expected_num + expected_cat + expected_multihot]
 
                 print(f"Feature matrix shape: {feature_df.shape}")
                 print(f"Numeric features: {expected_num}")
                 print(f"Categorical features: {expected_cat}")
                 
-                # Make predictions
-                if hasattr(ml_model, 'predict_proba'):
-                    # Get probability of finding pharmacy (positive class)
-                    probabilities = ml_model.predict_proba(feature_df)[:, 1]
-                    print(f"✓ Predicted probabilities for {len(probabilities)} patients")
-                else:
-                    # Fallback to binary predictions
-                    probabilities = ml_model.predict(feature_df).astype(float)
-                    print(f"✓ Model returned binary predictions, converting to probabilities")
+                with span('predict_proba'):
+                    # Make predictions
+                    if hasattr(ml_model, 'predict_proba'):
+                        # Get probability of finding pharmacy (positive class)
+                        probabilities = ml_model.predict_proba(feature_df)[:, 1]
+                        print(f"✓ Predicted probabilities for {len(probabilities)} patients")
+                    else:
+                        # Fallback to binary predictions
+                        probabilities = ml_model.predict(feature_df).astype(float)
+                        print(f"✓ Model returned binary predictions, converting to probabilities")
                 
                 # Add probabilities to dataframe
                 uploaded_df['pharmacy_find_probability'] = probabilities
@@ -730,21 +937,22 @@ def predict_pharmacy():
                     
                     predictions.append(pred_entry)
                 
-                # --- Build exportable CSV with only necessary fields ---
-                export_cols = []
-                for c in ['patient_id','age','gender','marital_status','is_senior_citizen','is_pregnant','has_chronic_illness','distance_to_nearest_pharmacy_miles','pharmacy_find_probability']:
-                    if c in uploaded_df.columns or c == 'pharmacy_find_probability':
-                        export_cols.append(c)
-
-                export_df = uploaded_df[export_cols].copy()
-                exports_dir = os.path.join(BASE_DIR, 'static', 'exports')
-                os.makedirs(exports_dir, exist_ok=True)
-                csv_name = f"predictions_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv"
-                export_path = os.path.join(exports_dir, csv_name)
-                # Round probability to 4 decimals for file
-                if 'pharmacy_find_probability' in export_df.columns:
-                    export_df['pharmacy_find_probability'] = export_df['pharmacy_find_probability'].round(4)
-                export_df.to_csv(export_path, index=False)
+                with span('export'):
+                    # --- Build exportable CSV with only necessary fields ---
+                    export_cols = []
+                    for c in ['patient_id','age','gender','marital_status','is_senior_citizen','is_pregnant','has_chronic_illness','distance_to_nearest_pharmacy_miles','pharmacy_find_probability']:
+                        if c in uploaded_df.columns or c == 'pharmacy_find_probability':
+                            export_cols.append(c)
+
+                    export_df = uploaded_df[export_cols].copy()
+                    exports_dir = os.path.join(BASE_DIR, 'static', 'exports')
+                    os.makedirs(exports_dir, exist_ok=True)
+                    csv_name = f"predictions_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv"
+                    export_path = os.path.join(exports_dir, csv_name)
+                    # Round probability to 4 decimals for file
+                    if 'pharmacy_find_probability' in export_df.columns:
+                        export_df['pharmacy_find_probability'] = export_df['pharmacy_find_probability'].round(4)
+                    export_df.to_csv(export_path, index=False)
                 stats['download_url'] = url_for('static', filename=f'exports/{csv_name}')
 
                 stats['model_status'] = 'Success - Predictions generated'
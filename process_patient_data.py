@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 from geopy.distance import geodesic
+from medical_history import get_drug_needs
+from dataset_cache import load_dataset
 
 # Load the patient data
 patient_data_path = "C:\\Users\\703401801\\Desktop\\Cigna\\synthetic_patient_data_processed.csv"
@@ -10,38 +12,19 @@ df = pd.read_csv(patient_data_path)
 df.drop(columns=['original_nearest_pharmacy', 'original_distance_to_pharmacy_km'], inplace=True)
 
 # Step 2: Align drug_needs with medical_history
-drug_mapping = {
-    'Hypertension': 'Blood Pressure Medication',
-    'Arthritis': 'Painkillers',
-    'Asthma': 'Asthma Inhaler',
-    'Diabetes': 'Insulin',
-    'High Cholesterol': 'Statins',
-    'Depression': 'Antidepressants'
-}
-
-def get_drug_need(medical_history):
-    try:
-        illnesses = eval(medical_history)
-        for illness in illnesses:
-            if illness in drug_mapping:
-                return drug_mapping[illness]
-    except:
-        pass
-    return "Unknown"
-
-df['drug_needs'] = df['medical_history'].apply(get_drug_need)
+# Each distinct history string is parsed once (no per-row eval)
+df['drug_needs'] = get_drug_needs(df['medical_history'])
 
 # For steps 3, 4, and 5, we need external data.
-# I will attempt to fetch a county dataset from a public source.
+# The city-level county dataset is served from the local dataset cache
+# (run `python dataset_cache.py prefetch` once; batch runs never touch the network).
 try:
-    county_data_url = "https://raw.githubusercontent.com/grammakov/USA-cities-and-states/master/us_cities_states_counties.csv"
-    # Try to read the CSV with error handling for bad lines
-    county_df = pd.read_csv(county_data_url, on_bad_lines='skip')
+    county_df = load_dataset('us_cities_states_counties')
     # This file is at the city level, so I'll aggregate to the county level
     county_geo = county_df.groupby(['county', 'state_id'])[[ 'latitude', 'longitude']].mean().reset_index()
 except Exception as e:
-    print(f"Error fetching county data: {e}")
-    print("Even with error handling, I could not read the county data. I cannot proceed without this data.")
+    print(f"Error loading county data: {e}")
+    print("I cannot proceed without this data.")
     exit()
 
 # Realistic simulation of pharmacy data
@@ -0,0 +1,107 @@
+
+import io
+import os
+import re
+import hmac
+import time
+import pstats
+import cProfile
+import threading
+from flask import Response, abort, g, jsonify, request, send_file
+
+# --- Configuration ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILE_DIR = os.path.join(BASE_DIR, ".profiles")
+PROFILE_HEADER = "X-Profile-Token"
+PROFILE_QUERY_ARG = "_profile"
+REPORT_LINES = 60
+REPORT_SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+MAX_SAVED_PROFILES = 200  # oldest .prof files are deleted beyond this
+
+_PROFILE_ID_PATTERN = re.compile(r"^[0-9]+-[A-Za-z0-9_.]+$")
+# cProfile can only run one profiler at a time; concurrent requests are not profiled
+_profiler_lock = threading.Lock()
+
+def _authorized(token):
+    supplied = request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_QUERY_ARG)
+    # compare_digest only accepts ASCII str, so compare the UTF-8 bytes
+    return bool(supplied) and hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8'))
+
+def prune_profiles(keep=MAX_SAVED_PROFILES):
+    """Delete all but the `keep` newest saved profiles."""
+    try:
+        names = [name for name in os.listdir(PROFILE_DIR) if name.endswith(".prof")]
+    except FileNotFoundError:
+        return
+    names.sort(key=lambda name: int(name.split("-", 1)[0]) if name.split("-", 1)[0].isdigit() else 0)
+    for name in names[:max(len(names) - keep, 0)]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except FileNotFoundError:
+            pass
+
+def profile_report(profile_path, sort_by='cumulative', lines=REPORT_LINES):
+    """Text report of a saved profile, top `lines` functions by `sort_by`."""
+    out = io.StringIO()
+    pstats.Stats(profile_path, stream=out).sort_stats(sort_by).print_stats(lines)
+    return out.getvalue()
+
+def init_profiler(app, token=None):
+    """
+    Let admin callers profile single requests. Only when a token is configured
+    (argument or PROFILE_TOKEN env var) are hooks registered; otherwise this
+    does nothing and requests run exactly as before.
+
+    A request carrying the token in the X-Profile-Token header (or the
+    _profile query argument) runs under cProfile. The stats are saved to
+    .profiles/<id>.prof (pstats format, readable by snakeviz, gprof2dot or
+    flameprof), and the id is returned in the X-Profile-Id header; only the
+    newest MAX_SAVED_PROFILES are kept. Reports
+    are served by GET /admin/profiles/<id>, which takes ?format=text
+    (default, &sort=) or ?format=pstats and needs the same token.
+    """
+    token = token or os.environ.get('PROFILE_TOKEN')
+    if not token:
+        return
+
+    @app.before_request
+    def _start_profile():
+        if request.endpoint != 'get_profile' and _authorized(token) and _profiler_lock.acquire(blocking=False):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def _save_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        _profiler_lock.release()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profile_id = f"{time.time_ns()}-{request.endpoint or 'unknown'}"
+        profiler.dump_stats(os.path.join(PROFILE_DIR, f"{profile_id}.prof"))
+        prune_profiles(MAX_SAVED_PROFILES)
+        response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def _discard_profile(exc):
+        # The handler raised before after_request could save the profile
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _profiler_lock.release()
+
+    @app.route('/admin/profiles/<profile_id>')
+    def get_profile(profile_id):
+        if not _authorized(token):
+            abort(403)
+        profile_path = os.path.join(PROFILE_DIR, f"{profile_id}.prof")
+        if not _PROFILE_ID_PATTERN.match(profile_id) or not os.path.exists(profile_path):
+            return jsonify({'error': f"Unknown profile '{profile_id}'"}), 404
+        if request.args.get('format', 'text') == 'pstats':
+            return send_file(profile_path, mimetype='application/octet-stream', as_attachment=True)
+        sort_by = request.args.get('sort', 'cumulative')
+        if sort_by not in REPORT_SORT_KEYS:
+            return jsonify({'error': f"sort must be one of: {', '.join(REPORT_SORT_KEYS)}"}), 400
+        return Response(profile_report(profile_path, sort_by), mimetype='text/plain')
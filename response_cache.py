@@ -0,0 +1,73 @@
+
+import os
+import gzip
+import hashlib
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# --- Configuration ---
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 1024
+CACHE_CONTROL = "no-cache"
+
+# (name, dataset version) -> pre-serialized body, compressed variants and ETag
+_response_cache = {}
+
+def dataset_version(paths):
+    """
+    Version string for the data behind the cached responses: a digest of the
+    size and mtime of each source file (missing files count as 'missing').
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+        except OSError:
+            digest.update(f"{path}:missing\n".encode())
+    return digest.hexdigest()[:16]
+
+def _encode(body):
+    """The identity body plus gzip (and brotli, when installed) variants, each with its strong ETag."""
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    variants = {'identity': (body, etag)}
+    if len(body) >= MIN_COMPRESS_SIZE:
+        variants['gzip'] = (gzip.compress(body, compresslevel=9, mtime=0), f"{etag}-gzip")
+        if brotli is not None:
+            variants['br'] = (brotli.compress(body), f"{etag}-br")
+    return variants
+
+def cached_json_response(name, version, build_body):
+    """
+    Serve a JSON payload that only changes with the dataset. `build_body`
+    returns the serialized bytes and runs once per (name, version); later
+    requests reuse the stored bytes and compressed variants, and a matching
+    If-None-Match is answered with 304 Not Modified.
+    """
+    key = (name, version)
+    if key not in _response_cache:
+        # Drop variants built for an older dataset version
+        for stale_key in [k for k in _response_cache if k[0] == name]:
+            del _response_cache[stale_key]
+        _response_cache[key] = _encode(build_body())
+    variants = _response_cache[key]
+
+    encoding = request.accept_encodings.best_match([e for e in ('br', 'gzip') if e in variants]) or 'identity'
+    body, etag = variants[encoding]
+    if any(request.if_none_match.contains(variant_etag) for _, variant_etag in variants.values()):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    return response
+
+def clear_response_cache():
+    _response_cache.clear()
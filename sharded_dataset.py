@@ -0,0 +1,72 @@
+
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from file_hashing import file_sha256
+
+# --- Configuration ---
+MANIFEST_FILE = "manifest.json"
+
+def manifest_path(path):
+    """Path of the manifest for a sharded dataset given its directory or manifest file."""
+    return path if os.path.basename(path) == MANIFEST_FILE else os.path.join(path, MANIFEST_FILE)
+
+def is_sharded_dataset(path):
+    return os.path.exists(manifest_path(path))
+
+def part_file_name(index, file_format):
+    return f"part-{index:05d}.{file_format}"
+
+def write_manifest(output_dir, manifest):
+    """
+    Write manifest.json for a directory of part files. The manifest lists each
+    part's file name, row count and sha256, so readers can load the parts in
+    parallel and pipelines can key caches on the manifest alone.
+    """
+    tmp_path = manifest_path(output_dir) + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path(output_dir))
+    return manifest_path(output_dir)
+
+def read_manifest(path):
+    with open(manifest_path(path), 'r') as f:
+        return json.load(f)
+
+def read_part(part_path, file_format, columns=None):
+    if file_format == 'parquet':
+        return pd.read_parquet(part_path, columns=columns)
+    return pd.read_csv(part_path, usecols=columns)
+
+def read_verified_part(base_dir, part, file_format, columns=None):
+    """Read one manifest part after checking the file against its recorded sha256."""
+    part_path = os.path.join(base_dir, part['file'])
+    if 'sha256' in part and file_sha256(part_path) != part['sha256']:
+        raise ValueError(f"Part {part['file']} in {base_dir} does not match the sha256 in its manifest")
+    return read_part(part_path, file_format, columns)
+
+def read_sharded_dataset(path, columns=None, max_workers=None):
+    """
+    Load every part listed in a dataset manifest into one DataFrame. Parts are
+    read concurrently on a thread pool (the CSV and Parquet readers release the
+    GIL while parsing) and concatenated in manifest order. Each part is hashed
+    before it is parsed; a part that differs from its manifest sha256 raises
+    ValueError.
+    """
+    manifest = read_manifest(path)
+    base_dir = os.path.dirname(manifest_path(path))
+    parts = manifest['parts']
+    if not parts:
+        return pd.DataFrame(columns=columns or manifest.get('columns', []))
+
+    max_workers = max_workers or min(len(parts), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        frames = list(executor.map(lambda part: read_verified_part(base_dir, part, manifest['format'], columns), parts))
+    return pd.concat(frames, ignore_index=True)
+
+def load_patient_table(path, columns=None):
+    """Read a patient table from a single CSV file or from a sharded dataset manifest."""
+    if is_sharded_dataset(path):
+        return read_sharded_dataset(path, columns)
+    return pd.read_csv(path, usecols=columns)
@@ -0,0 +1,88 @@
+
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+GRID_CELL_DEGREES = 1.0
+# Clusters per map tile width at a given zoom level
+CLUSTER_CELLS_PER_TILE = 4
+
+def _cell_ids(lat, lon, cell_degrees):
+    n_cols = int(np.ceil(360 / cell_degrees))
+    rows = np.floor((lat + 90) / cell_degrees).astype(np.int64)
+    cols = np.clip(np.floor((lon + 180) / cell_degrees).astype(np.int64), 0, n_cols - 1)
+    return rows * n_cols + cols, n_cols
+
+def build_grid_index(lat, lon, cell_degrees=GRID_CELL_DEGREES):
+    """
+    Bucket points into a regular lat/lon grid. Point positions are sorted by
+    cell id, so the points of any run of cells in one grid row form a single
+    contiguous slice found with searchsorted. Points without coordinates are
+    left out.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    valid = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+    cells, n_cols = _cell_ids(lat[valid], lon[valid], cell_degrees)
+    order = np.argsort(cells, kind='stable')
+    return {
+        'cell_degrees': cell_degrees,
+        'n_cols': n_cols,
+        'cells': cells[order],
+        'positions': valid[order],
+        'lat': lat,
+        'lon': lon,
+    }
+
+def _query_box(index, min_lon, min_lat, max_lon, max_lat):
+    cell_degrees, n_cols = index['cell_degrees'], index['n_cols']
+    row_lo = int(np.floor((max(min_lat, -90) + 90) / cell_degrees))
+    row_hi = int(np.floor((min(max_lat, 90) + 90) / cell_degrees))
+    col_lo = int(np.clip(np.floor((min_lon + 180) / cell_degrees), 0, n_cols - 1))
+    col_hi = int(np.clip(np.floor((max_lon + 180) / cell_degrees), 0, n_cols - 1))
+    row_starts = np.arange(row_lo, row_hi + 1) * n_cols
+    lo = np.searchsorted(index['cells'], row_starts + col_lo, side='left')
+    hi = np.searchsorted(index['cells'], row_starts + col_hi, side='right')
+    if not len(lo):
+        return np.array([], dtype=np.int64)
+    candidates = np.concatenate([index['positions'][start:stop] for start, stop in zip(lo, hi)])
+    lat, lon = index['lat'][candidates], index['lon'][candidates]
+    inside = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+    return candidates[inside]
+
+def query_bbox(index, min_lon, min_lat, max_lon, max_lat):
+    """
+    Positions of the points inside a bounding box, in ascending order. Only
+    the grid cells overlapping the box are scanned; a box crossing the
+    antimeridian (min_lon > max_lon) is split in two.
+    """
+    if min_lon > max_lon:
+        found = np.concatenate([_query_box(index, min_lon, min_lat, 180, max_lat),
+                                _query_box(index, -180, min_lat, max_lon, max_lat)])
+    else:
+        found = _query_box(index, min_lon, min_lat, max_lon, max_lat)
+    return np.sort(found)
+
+def cluster_cell_degrees(zoom):
+    """Grid cell size used to aggregate points at a web-map zoom level."""
+    return 360 / (2 ** zoom) / CLUSTER_CELLS_PER_TILE
+
+def cluster_points(lat, lon, weights, cell_degrees):
+    """
+    Aggregate points per grid cell: the mean position of the points in each
+    cell, how many there are and the sum of their weights.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    lat, lon, weights = lat[valid], lon[valid], weights[valid]
+    cells, _ = _cell_ids(lat, lon, cell_degrees)
+    _, inverse = np.unique(cells, return_inverse=True)
+    counts = np.bincount(inverse)
+    return pd.DataFrame({
+        'latitude': np.bincount(inverse, weights=lat) / counts,
+        'longitude': np.bincount(inverse, weights=lon) / counts,
+        'count': counts,
+        'weight': np.bincount(inverse, weights=weights),
+    })
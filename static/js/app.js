@@ -1,6 +1,12 @@
 // Global variables
 let map;
 let markers = [];
+let desertLayer = null;
+let desertRequest = null;
+let desertMoreControl = null;
+let countySearchTimer = null;
+let countySearchRequest = null;
+let countyNames = [];
 let selectedSuggestions = [];
 let selectedIndices = new Set();
 let clusterChart = null;
@@ -55,29 +61,62 @@ function initializeTabs() {
 // ==================== TAB 1: Patient Distance Finder ====================
 
 function loadCounties() {
-    fetch('/api/counties')
-        .then(response => response.json())
-        .then(data => {
-            const select = document.getElementById('county-select');
-            data.counties.forEach(county => {
-                const option = document.createElement('option');
-                option.value = county;
-                option.textContent = county;
-                select.appendChild(option);
+    // Suggestions come from the server-side prefix index as the user types
+    const input = document.getElementById('county-select');
+    const search = () => {
+        if (countySearchRequest) countySearchRequest.abort();
+        countySearchRequest = new AbortController();
+        fetch(`/api/counties/search?q=${encodeURIComponent(input.value)}&limit=20`, { signal: countySearchRequest.signal })
+            .then(response => response.json())
+            .then(data => {
+                countySearchRequest = null;
+                countyNames = data.counties.map(county => county.name);
+                const options = document.getElementById('county-options');
+                options.innerHTML = '';
+                countyNames.forEach(name => {
+                    const option = document.createElement('option');
+                    option.value = name;
+                    options.appendChild(option);
+                });
+                updateFindButton();
+            })
+            .catch(error => {
+                if (error.name !== 'AbortError') console.error('Error loading counties:', error);
             });
-        })
-        .catch(error => console.error('Error loading counties:', error));
+    };
+    input.addEventListener('input', () => {
+        updateFindButton();
+        clearTimeout(countySearchTimer);
+        countySearchTimer = setTimeout(search, 150);
+    });
+    updateFindButton();
+    search();
+}
+
+function matchedCounty() {
+    // The typed name in its listed spelling, or '' if the latest search response does not list it
+    const typed = document.getElementById('county-select').value.trim().toLowerCase();
+    return countyNames.find(name => name.toLowerCase() === typed) || '';
+}
+
+function updateFindButton() {
+    document.getElementById('find-pharmacy-btn').disabled = !matchedCounty();
 }
 
 document.getElementById('find-pharmacy-btn').addEventListener('click', function() {
-    const county = document.getElementById('county-select').value;
+    // A lookup still pending would replace the list the name was checked against
+    clearTimeout(countySearchTimer);
+    if (countySearchRequest) countySearchRequest.abort();
+    countySearchRequest = null;
+
+    const county = matchedCounty();
     const pregnancyStatus = document.getElementById('pregnancy-status').value === 'true';
     
     const medicalConditions = Array.from(document.querySelectorAll('input[name="medical"]:checked'))
         .map(checkbox => checkbox.value);
 
     if (!county) {
-        alert('Please select a county');
+        alert('Please pick a county from the suggestions');
         return;
     }
 
@@ -354,22 +393,109 @@ function initializeMap() {
         L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
             attribution: '© OpenStreetMap contributors'
         }).addTo(map);
+
+        // Desert counties are fetched per viewport (clustered server-side when zoomed out)
+        desertLayer = L.layerGroup().addTo(map);
+        map.on('moveend', loadVisibleDeserts);
+        loadVisibleDeserts();
     } else {
         map.invalidateSize();
     }
 }
 
 function loadPharmacyDeserts() {
-    fetch('/api/pharmacy_deserts')
+    // limit=0: only the totals, the map fetches the counties it shows
+    fetch('/api/pharmacy_deserts?limit=0')
         .then(response => response.json())
         .then(data => {
-            document.getElementById('desert-counties-count').textContent = data.desert_counties.length;
+            document.getElementById('desert-counties-count').textContent = data.total;
             document.getElementById('desert-patients-count').textContent = data.total_affected.toLocaleString();
             document.getElementById('desert-avg-distance').textContent = (data.avg_distance || 0).toFixed(2);
         })
         .catch(error => console.error('Error loading pharmacy deserts:', error));
 }
 
+function loadVisibleDeserts() {
+    if (!map || !desertLayer) return;
+
+    // Drop the request for the previous viewport
+    if (desertRequest) desertRequest.abort();
+    desertRequest = new AbortController();
+    showDesertMoreControl(null);
+    const signal = desertRequest.signal;
+
+    const bounds = map.getBounds();
+    const bbox = [
+        Math.max(-180, bounds.getWest()), Math.max(-90, bounds.getSouth()),
+        Math.min(180, bounds.getEast()), Math.min(90, bounds.getNorth())
+    ].map(v => v.toFixed(4)).join(',');
+    const query = `/api/pharmacy_deserts?bbox=${bbox}&zoom=${map.getZoom()}`;
+
+    // Pages are drawn as they arrive; further pages are only fetched when
+    // the user asks for them with the "Load more" control
+    let shown = 0;
+    const loadPage = cursor => fetch(cursor ? `${query}&cursor=${cursor}` : query, { signal })
+        .then(response => response.json())
+        .then(data => {
+            if (!cursor) desertLayer.clearLayers();
+            const items = data.clusters || data.desert_counties || [];
+            if (data.clusters) {
+                items.forEach(addDesertCluster);
+            } else {
+                items.forEach(addDesertCounty);
+            }
+            shown += items.length;
+            showDesertMoreControl(data.next_cursor ? () => loadPage(data.next_cursor) : null,
+                                  data.clusters ? 'clusters' : 'counties', shown, data.total);
+        })
+        .catch(error => {
+            if (error.name !== 'AbortError') console.error('Error loading visible deserts:', error);
+        });
+
+    loadPage(null);
+}
+
+function addDesertCluster(cluster) {
+    L.circleMarker([cluster.latitude, cluster.longitude], {
+        radius: 6 + 3 * Math.sqrt(cluster.count),
+        color: '#c0392b',
+        fillOpacity: 0.4
+    }).bindTooltip(`${cluster.count} desert ${cluster.count === 1 ? 'county' : 'counties'} • ${Number(cluster.affected_patients || 0).toLocaleString()} patients`)
+      .addTo(desertLayer);
+}
+
+function addDesertCounty(county) {
+    L.circleMarker([county.latitude, county.longitude], {
+        radius: 6,
+        color: '#c0392b',
+        fillOpacity: 0.6
+    }).bindPopup(`
+        <strong>${county.county}</strong><br>
+        Affected patients: ${Number(county.affected_patients || 0).toLocaleString()}<br>
+        Avg distance: ${county.avg_distance != null ? county.avg_distance.toFixed(2) + ' mi' : 'N/A'}
+    `).addTo(desertLayer);
+}
+
+function showDesertMoreControl(loadMore, kind, shown, total) {
+    if (desertMoreControl) {
+        map.removeControl(desertMoreControl);
+        desertMoreControl = null;
+    }
+    if (!loadMore) return;
+    desertMoreControl = L.control({ position: 'bottomleft' });
+    desertMoreControl.onAdd = () => {
+        const button = L.DomUtil.create('button', 'btn-primary btn-small');
+        button.textContent = kind === 'clusters' ? `Load more clusters (${shown} shown)` : `Load more counties (${shown} of ${total})`;
+        L.DomEvent.disableClickPropagation(button);
+        L.DomEvent.on(button, 'click', () => {
+            button.disabled = true;
+            loadMore();
+        });
+        return button;
+    };
+    desertMoreControl.addTo(map);
+}
+
 function loadPharmacySuggestions() {
     fetch('/api/pharmacy_suggestions')
         .then(response => response.json())
@@ -0,0 +1,41 @@
+from flask import Flask
+import app_metrics
+from app_metrics import init_metrics, render_metrics, span, count_rows
+
+def make_app():
+    app = Flask(__name__)
+    init_metrics(app)
+
+    @app.route('/work')
+    def work():
+        with span('filter'):
+            count_rows(7)
+        return "ok"
+
+    @app.route('/boom')
+    def boom():
+        return "fail", 503
+
+    return app
+
+def test_requests_phases_and_rows_are_exported():
+    client = make_app().test_client()
+    client.get('/work')
+    client.get('/boom')
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'app_requests_total{endpoint="work",method="GET",status="200"} 1' in text
+    assert 'app_request_errors_total{endpoint="boom"} 1' in text
+    assert 'app_rows_processed_total{endpoint="work"} 7' in text
+    assert 'app_phase_duration_seconds_count{endpoint="work",phase="filter"} 1' in text
+
+def test_histogram_buckets_are_cumulative():
+    app_metrics.observe('app_request_duration_seconds', 0.03, endpoint='histogram_test')
+    app_metrics.observe('app_request_duration_seconds', 20.0, endpoint='histogram_test')
+    text = render_metrics()
+    assert 'app_request_duration_seconds_bucket{endpoint="histogram_test",le="0.025"} 0' in text
+    assert 'app_request_duration_seconds_bucket{endpoint="histogram_test",le="0.05"} 1' in text
+    assert 'app_request_duration_seconds_bucket{endpoint="histogram_test",le="+Inf"} 2' in text
+
+def test_label_values_are_escaped():
+    app_metrics.inc('app_rows_processed_total', endpoint='a"b\\c')
+    assert 'endpoint="a\\"b\\\\c"' in render_metrics()
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+from columnar_snapshot import write_snapshot, load_snapshot, load_multihot, row_positions
+
+def make_snapshot(tmp_path):
+    df = pd.DataFrame({
+        'region': ["North", "South", "North", "East", "North"],
+        'age': [30, 40, 50, 60, 70],
+        'county': ["A", "B", "C", "A", "B"],
+        'medical_history': ["['Asthma']", "['Diabetes']", "['Asthma', 'Diabetes']", "[]", "['Asthma']"],
+    })
+    return df, write_snapshot(df, str(tmp_path / "snapshot"))
+
+def test_row_positions_scan_one_column(tmp_path):
+    _, snapshot_dir = make_snapshot(tmp_path)
+    assert row_positions(snapshot_dir, 'region', "North").tolist() == [0, 2, 4]
+    assert row_positions(snapshot_dir, 'age', 40).tolist() == [1]
+    assert row_positions(snapshot_dir, 'region', "Central").tolist() == []
+
+def test_load_snapshot_gathers_only_the_requested_rows(tmp_path):
+    df, snapshot_dir = make_snapshot(tmp_path)
+    rows = row_positions(snapshot_dir, 'region', "North")
+    gathered = load_snapshot(snapshot_dir, ['age', 'county'], rows=rows)
+    assert gathered['age'].tolist() == [30, 50, 70]
+    assert gathered['county'].astype(str).tolist() == ["A", "C", "B"]
+    assert not isinstance(gathered['age'].to_numpy(), np.memmap)
+
+def test_multihot_round_trip(tmp_path):
+    _, snapshot_dir = make_snapshot(tmp_path)
+    matrix, vocabulary = load_multihot(snapshot_dir)
+    counts = dict(zip(vocabulary, matrix.sum(axis=0).tolist()))
+    assert counts == {'Asthma': 3, 'Diabetes': 2}
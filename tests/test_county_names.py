@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+from county_names import (FIPS_ARRAY_SIZE, LEGACY_ALIASES, clean_county_name, county_geoids, county_geometry,
+                          county_key, fips_array, fips_codes, fips_counts, fips_positions, state_usps)
+
+def test_names_normalize_to_one_key():
+    assert clean_county_name("Kodiak  Island Borough") == "kodiak island"
+    assert county_key("St. Louis County") == county_key("Saint Louis") == "stlouis"
+    assert county_key("De Kalb County") == county_key("DeKalb")
+    assert state_usps("new  york") == "NY" and state_usps("tx") == "TX" and state_usps("Atlantis") is None
+
+def test_county_geoids_resolve_names_and_legacy_aliases():
+    geoids = county_geoids(pd.Series(["Autauga County", "Shannon County", "Nowhere", None]),
+                           ["Alabama", "South Dakota", "Alabama", "Alabama"])
+    assert geoids.tolist()[:2] == [1001, LEGACY_ALIASES[('SD', 'shannon')]]
+    assert geoids[2:].isna().all()
+
+def test_fips_codes_prefer_the_fips_column():
+    df = pd.DataFrame({'us_county': ["Autauga County", "Baldwin County"], 'us_state': ["Alabama", "Alabama"],
+                       'county_fips_code': ["06037", None]})
+    assert fips_codes(df).tolist() == [6037, 1003]
+
+def test_fips_arrays_broadcast_county_values():
+    fips = pd.Series([1001, 1003, None], dtype='Int64')
+    positions = fips_positions(fips)
+    values = fips_array([1001, 1003], [10.0, 20.0])
+    assert values[positions][:2].tolist() == [10.0, 20.0] and np.isnan(values[positions][2])
+    assert fips_counts(fips)[[0, 1001, 1003]].tolist() == [0, 1, 1]
+    lat = county_geometry()['lat'][fips_positions([1001])][0]
+    assert 32 < lat < 33
+
+def test_missing_and_out_of_range_fips_read_fill_value():
+    fips = pd.Series([None, -1, 0, FIPS_ARRAY_SIZE, 10 * FIPS_ARRAY_SIZE, 1001], dtype='Int64')
+    assert fips_positions(fips).tolist() == [0, 0, 0, 0, 0, 1001]
+    assert fips_positions([np.nan, "abc", "06037"]).tolist() == [0, 0, 6037]
+    values = fips_array([1001, FIPS_ARRAY_SIZE, None], [1.0, 2.0, 3.0], fill_value=-1.0)
+    assert values[fips_positions(fips)].tolist() == [-1.0] * 5 + [1.0]
+    assert fips_counts(fips).sum() == 1
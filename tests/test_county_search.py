@@ -0,0 +1,29 @@
+from county_names import legacy_name_aliases
+from county_search import build_county_search_index, search_counties
+
+NAMES = ["Autauga County, Alabama", "Bedford County, Virginia", "Oglala Lakota County, South Dakota",
+         "St. Louis County, Missouri"]
+
+def names(index, query, limit=10):
+    return [name for name, _ in search_counties(index, query, limit)]
+
+def test_legacy_names_find_the_current_county():
+    aliases = legacy_name_aliases(NAMES)
+    assert aliases["Shannon County, South Dakota"] == "Oglala Lakota County, South Dakota"
+    index = build_county_search_index(NAMES, [1, 1, 1, 1], aliases=aliases)
+    assert names(index, "shannon") == ["Oglala Lakota County, South Dakota"]
+    assert names(index, "Shannon, SD") == ["Oglala Lakota County, South Dakota"]
+    assert names(index, "bedford city") == ["Bedford County, Virginia"]
+
+def test_aliases_for_missing_counties_are_ignored():
+    index = build_county_search_index(NAMES, [1, 1, 1, 1], aliases={"Old Name, Nowhere": "Gone County, Nowhere"})
+    assert names(index, "old name") == []
+
+def test_prefixes_match_every_spelling_ranked_by_weight():
+    index = build_county_search_index(NAMES, [5, 1, 1, 9])
+    assert names(index, "saint louis") == names(index, "St. Louis, MO") == ["St. Louis County, Missouri"]
+    assert names(index, "autauga al") == ["Autauga County, Alabama"]
+    assert names(index, "") == ["St. Louis County, Missouri", "Autauga County, Alabama",
+                                "Bedford County, Virginia", "Oglala Lakota County, South Dakota"]
+    assert names(index, "", limit=1) == ["St. Louis County, Missouri"]
+    assert names(index, "zzz") == []
@@ -0,0 +1,33 @@
+import sqlite3
+import pandas as pd
+from data_analysis_pipeline import csv_to_sqlite
+
+def load(tmp_path, df, capsys):
+    csv_path = tmp_path / "patients.csv"
+    df.to_csv(csv_path, index=False)
+    csv_to_sqlite(str(csv_path), str(tmp_path / "patients.db"), "patients")
+    with sqlite3.connect(tmp_path / "patients.db") as conn:
+        table = pd.read_sql('SELECT * FROM patients ORDER BY patient_id', conn)
+    return table, capsys.readouterr().out
+
+def test_text_ids_are_upserted(tmp_path, capsys):
+    df = pd.DataFrame({'patient_id': ["P001", "P002", "P003"], 'age': [30, 40, 50]})
+    load(tmp_path, df, capsys)
+    changed = pd.DataFrame({'patient_id': ["P001", "P003", "P004"], 'age': [30, 55, 60]})
+    table, out = load(tmp_path, changed, capsys)
+    assert "upserted by patient_id (3 rows changed)" in out
+    assert table.to_dict('list') == {'patient_id': ["P001", "P003", "P004"], 'age': [30, 55, 60]}
+
+def test_integer_ids_are_upserted(tmp_path, capsys):
+    load(tmp_path, pd.DataFrame({'patient_id': [1, 2], 'age': [30, 40]}), capsys)
+    table, out = load(tmp_path, pd.DataFrame({'patient_id': [1, 3], 'age': [31, 50]}), capsys)
+    assert "upserted by patient_id (3 rows changed)" in out
+    assert table.to_dict('list') == {'patient_id': [1, 3], 'age': [31, 50]}
+
+def test_reordered_columns_keep_their_values(tmp_path, capsys):
+    df = pd.DataFrame({'patient_id': [1, 2], 'age': [30, 40], 'height': [170, 180]})
+    load(tmp_path, df, capsys)
+    reordered = df.assign(age=[31, 41])[['patient_id', 'height', 'age']]
+    table, out = load(tmp_path, reordered, capsys)
+    assert "upserted" not in out
+    assert table.set_index('patient_id').loc[[1, 2], ['age', 'height']].to_dict('list') == {'age': [31, 41], 'height': [170, 180]}
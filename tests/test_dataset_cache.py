@@ -0,0 +1,53 @@
+import json
+import pytest
+import dataset_cache
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_cache, 'CACHE_DIR', str(tmp_path / "cache"))
+    monkeypatch.setattr(dataset_cache, 'LOCK_FILE', str(tmp_path / "datasets.lock.json"))
+    monkeypatch.setattr(dataset_cache, 'DATASETS', {'counties': {'url': "https://example.invalid/c.csv", 'read_csv': {}}})
+    monkeypatch.setattr(dataset_cache, '_frame_cache', {})
+    path = tmp_path / "counties.csv"
+    path.write_text("name,lat,lng\nA,1.0,2.0\nB,3.0,4.0\n")
+    return str(path)
+
+def test_unpinned_dataset_is_rejected(source):
+    with pytest.raises(ValueError, match="no pinned checksum"):
+        dataset_cache.import_file('counties', source)
+    assert dataset_cache.load_lock() == {}
+    with pytest.raises(ValueError, match="--pin"):
+        dataset_cache.load_dataset('counties')
+
+def test_pinned_dataset_round_trips(source):
+    dataset_cache.import_file('counties', source, pin=True)
+    dataset_cache._frame_cache.clear()
+    assert list(dataset_cache.load_dataset('counties')['name']) == ['A', 'B']
+
+def test_tampered_raw_file_fails_against_the_pin(source):
+    dataset_cache.import_file('counties', source, pin=True)
+    dataset_cache._frame_cache.clear()
+    with open(dataset_cache._raw_path('counties'), 'a') as f:
+        f.write("C,5.0,6.0\n")
+    with open(dataset_cache._meta_path('counties')) as f:
+        meta = json.load(f)
+    assert meta['sha256'] == dataset_cache.load_lock()['counties']  # self-reported digest still matches
+    with pytest.raises(FileNotFoundError, match="pinned checksum"):
+        dataset_cache.load_dataset('counties')
+
+def test_tampered_pickle_is_rebuilt_from_the_raw_file(source):
+    dataset_cache.import_file('counties', source, pin=True)
+    dataset_cache._frame_cache.clear()
+    dataset_cache.pd.DataFrame({'name': ['X']}).to_pickle(dataset_cache._frame_path('counties'))
+    assert list(dataset_cache.load_dataset('counties')['name']) == ['A', 'B']
+
+def test_pin_records_a_verified_checksum(source):
+    import hashlib
+    with open(source, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    with pytest.raises(ValueError, match="sha256"):
+        dataset_cache.pin_checksum('counties', "not-a-digest")
+    dataset_cache.pin_checksum('counties', digest.upper())
+    assert dataset_cache.load_lock() == {'counties': digest}
+    dataset_cache.import_file('counties', source)
+    assert len(dataset_cache.load_dataset('counties')) == 2
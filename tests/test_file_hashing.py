@@ -0,0 +1,8 @@
+import hashlib
+from file_hashing import HASH_BLOCK_SIZE, file_sha256
+
+def test_file_sha256_matches_hashlib_across_blocks(tmp_path):
+    data = bytes(range(256)) * (HASH_BLOCK_SIZE // 256 + 3)
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    assert file_sha256(str(path)) == hashlib.sha256(data).hexdigest()
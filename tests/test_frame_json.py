@@ -0,0 +1,41 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+import frame_json
+from frame_json import dumps_payload, frame_to_records_json, frame_to_columns_json
+
+FRAME = pd.DataFrame({
+    'county': ["Autauga", None, 'Say "hi"'],
+    'patients': np.array([3, 0, 7], dtype=np.int64),
+    'distance': [1.5, np.nan, np.inf],
+    'desert': [True, False, True],
+})
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    if request.param == 'json':
+        monkeypatch.setattr(frame_json, 'orjson', None)
+    elif frame_json.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+def test_records_match_row_objects(encoder):
+    assert json.loads(frame_to_records_json(FRAME)) == [
+        {'county': "Autauga", 'patients': 3, 'distance': 1.5, 'desert': True},
+        {'county': None, 'patients': 0, 'distance': None, 'desert': False},
+        {'county': 'Say "hi"', 'patients': 7, 'distance': None, 'desert': True},
+    ]
+
+def test_columns_hold_one_array_per_column(encoder):
+    assert json.loads(frame_to_columns_json(FRAME)) == {
+        'county': ["Autauga", None, 'Say "hi"'],
+        'patients': [3, 0, 7],
+        'distance': [1.5, None, None],
+        'desert': [True, False, True],
+    }
+
+def test_payload_mixes_frames_and_plain_values(encoder):
+    payload = {'total': 3, 'rows': FRAME[['patients']], 'empty': FRAME.iloc[:0]}
+    assert json.loads(dumps_payload(payload)) == {'total': 3, 'rows': [{'patients': 3}, {'patients': 0}, {'patients': 7}], 'empty': []}
+    assert json.loads(dumps_payload(payload, 'columns'))['rows'] == {'patients': [3, 0, 7]}
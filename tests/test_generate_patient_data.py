@@ -0,0 +1,65 @@
+import json
+from datetime import date
+import pandas as pd
+import pytest
+import generate_patient_data as generator
+from generate_patient_data import generate_patient_data, generate_sharded_patient_data, write_patient_blocks
+from sharded_dataset import load_patient_table
+
+def test_zero_patients_writes_a_header_only_csv(tmp_path):
+    output_path = str(tmp_path / "patients.csv")
+    generate_patient_data(0, output_path)
+    df = pd.read_csv(output_path)
+    assert len(df) == 0
+    assert {'patient_id', 'us_county', 'us_state', 'patients_in_county'}.issubset(df.columns)
+    assert not (tmp_path / "patients.csv.tmp").exists()
+
+def test_zero_patients_writes_an_empty_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    output_path = str(tmp_path / "patients.parquet")
+    generate_patient_data(0, output_path)
+    df = pd.read_parquet(output_path)
+    assert len(df) == 0 and 'patient_id' in df.columns
+
+def test_zero_patients_sharded_has_an_empty_manifest(tmp_path):
+    manifest = generate_sharded_patient_data(0, str(tmp_path), workers=1)
+    assert len(load_patient_table(manifest)) == 0
+
+def test_negative_patients_and_no_blocks_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="num_patients"):
+        generate_patient_data(-1, str(tmp_path / "patients.csv"))
+    with pytest.raises(ValueError, match="No patient blocks"):
+        write_patient_blocks([], str(tmp_path / "patients.csv"))
+
+def test_chunked_output_matches_row_count(tmp_path):
+    output_path = str(tmp_path / "patients.csv")
+    generate_patient_data(25, output_path, chunk_size=10)
+    df = pd.read_csv(output_path)
+    assert df['patient_id'].tolist() == list(range(1, 26))
+
+class _LaterDate(date):
+    @classmethod
+    def today(cls):
+        return date(2031, 3, 15)
+
+def test_same_seed_gives_the_same_file_on_any_day(tmp_path, monkeypatch):
+    first = tmp_path / "first.csv"
+    generate_patient_data(50, str(first), seed=7)
+    monkeypatch.setattr(generator, 'date', _LaterDate)
+    second = tmp_path / "second.csv"
+    generate_patient_data(50, str(second), seed=7)
+    assert first.read_bytes() == second.read_bytes()
+
+def test_checkup_dates_count_back_from_the_reference_date(tmp_path):
+    output_path = str(tmp_path / "patients.csv")
+    generate_patient_data(200, output_path, reference_date=date(2020, 6, 30))
+    checkups = pd.to_datetime(pd.read_csv(output_path)['last_checkup_date'])
+    assert checkups.max() <= pd.Timestamp("2020-05-31") and checkups.min() >= pd.Timestamp("2017-06-30")
+
+def test_sharded_output_ignores_the_day_it_runs(tmp_path, monkeypatch):
+    first = generate_sharded_patient_data(30, str(tmp_path / "first"), shard_size=10, workers=1)
+    monkeypatch.setattr(generator, 'date', _LaterDate)
+    second = generate_sharded_patient_data(30, str(tmp_path / "second"), shard_size=10, workers=1)
+    assert load_patient_table(first).equals(load_patient_table(second))
+    with open(second) as f:
+        assert json.load(f)['reference_date'] == generator.DEFAULT_REFERENCE_DATE.isoformat()
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+from geo_clustering import fit_region_model, iter_coordinate_chunks, map_clusters_to_regions
+
+# (latitude, longitude) of five well separated blobs and the region each should get
+BLOBS = {
+    'North': (48.0, -100.0),
+    'South': (28.0, -98.0),
+    'East': (40.0, -75.0),
+    'West': (40.0, -120.0),
+    'Central': (39.0, -97.0),
+}
+
+def write_blobs(path, points_per_blob=400, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = [pd.DataFrame({'latitude': rng.normal(lat, 0.5, points_per_blob),
+                            'longitude': rng.normal(lon, 0.5, points_per_blob),
+                            'blob': region})
+              for region, (lat, lon) in BLOBS.items()]
+    df = pd.concat(frames, ignore_index=True).sample(frac=1, random_state=seed)
+    df.to_csv(path, index=False)
+    return df
+
+def test_map_clusters_to_regions_by_compass_position():
+    centroids = list(BLOBS.values())
+    assert map_clusters_to_regions(centroids) == dict(enumerate(BLOBS))
+
+def test_leftover_regions_are_assigned_west_to_east_in_any_order():
+    # The northernmost cluster is also the easternmost, so East is left over
+    named = {'north_east': (48.0, -70.0), 'south': (28.0, -98.0), 'west': (40.0, -120.0),
+             'middle': (39.0, -95.0), 'inner_east': (38.0, -85.0)}
+    expected = {'north_east': "North", 'south': "South", 'west': "West", 'middle': "Central", 'inner_east': "East"}
+    rng = np.random.default_rng(1)
+    for _ in range(5):
+        order = list(rng.permutation(list(named)))
+        mapping = map_clusters_to_regions([named[name] for name in order])
+        assert {name: mapping[i] for i, name in enumerate(order)} == expected
+
+def test_coordinate_chunks_skip_missing_and_non_numeric_rows(tmp_path):
+    path = tmp_path / "coords.csv"
+    path.write_text("latitude,longitude,other\n1,2,a\n,3,b\nx,4,c\n5,6,d\n7,8,e\n")
+    chunks = list(iter_coordinate_chunks(str(path), chunksize=2))
+    assert np.vstack(chunks).tolist() == [[1, 2], [5, 6], [7, 8]]
+
+def test_fit_region_model_streams_a_bounded_sample(tmp_path):
+    path = tmp_path / "patients.csv"
+    df = write_blobs(path)
+    model = fit_region_model(str(path), chunksize=150, sample_size=600)
+    assert model['rows_seen'] == len(df)
+    assert model['sample_size'] == 600
+    for region, (lat, lon) in BLOBS.items():
+        nearest = int(np.argmin(((model['centroids'] - [lat, lon]) ** 2).sum(axis=1)))
+        assert np.allclose(model['centroids'][nearest], [lat, lon], atol=0.5)
+        assert model['region_map'][nearest] == region
+
+def test_fit_region_model_is_reproducible(tmp_path):
+    path = tmp_path / "patients.csv"
+    write_blobs(path)
+    first = fit_region_model(str(path), chunksize=300, sample_size=500)
+    second = fit_region_model(str(path), chunksize=300, sample_size=500)
+    assert np.array_equal(first['centroids'], second['centroids'])
+
+def test_fit_region_model_needs_one_row_per_cluster(tmp_path):
+    path = tmp_path / "tiny.csv"
+    path.write_text("latitude,longitude\n1,2\n3,4\n")
+    with pytest.raises(ValueError, match="at least 5 rows"):
+        fit_region_model(str(path))
+
+def test_assign_group_and_assign_regions_agree(tmp_path):
+    from geo_clustering import assign_group, assign_regions
+    path = tmp_path / "patients.csv"
+    df = write_blobs(path, points_per_blob=100)
+    model = fit_region_model(str(path), chunksize=200)
+    regions = assign_regions(model, df['latitude'], df['longitude'])
+    assert (regions == df['blob'].to_numpy()).all()
+    sample = df.head(20)
+    assert [assign_group(lat, lon, model) for lat, lon in zip(sample['latitude'], sample['longitude'])] == list(regions[:20])
+
+def test_missing_coordinates_get_no_region(tmp_path):
+    from geo_clustering import assign_group, assign_regions
+    path = tmp_path / "patients.csv"
+    write_blobs(path, points_per_blob=50)
+    model = fit_region_model(str(path))
+    assert assign_regions(model, [np.nan, "x", 48.0], [-100.0, -100.0, -100.0]).tolist() == [None, None, "North"]
+    assert assign_group(None, -100.0, model) is None
+    assert assign_group("nan", -100.0, model) is None
+
+def test_batch_scripts_leave_the_app_model_alone(tmp_path, monkeypatch):
+    import geo_clustering
+    import add_groups_to_data
+    app_model = tmp_path / "region_cluster_model.joblib"
+    monkeypatch.setattr(add_groups_to_data, 'REGION_MODEL_PATH', str(app_model))
+    monkeypatch.chdir(tmp_path)
+    write_blobs(tmp_path / "synthetic_patient_data_with_distances.csv", points_per_blob=50)
+
+    add_groups_to_data.add_cluster_column()
+    assert not app_model.exists()
+    batch_model = geo_clustering.load_region_model(geo_clustering.batch_model_path("synthetic_patient_data_with_distances.csv"))
+    assert sorted(batch_model['region_map'].values()) == sorted(BLOBS)
+    assert 'group' in pd.read_csv("synthetic_patient_data_with_distances.csv").columns
+
+    add_groups_to_data.add_cluster_column(replace_app_model=True)
+    assert app_model.exists()
@@ -0,0 +1,63 @@
+import os
+import sys
+import shutil
+import linecache
+import importlib
+import pandas as pd
+import pytest
+import ingest_pipeline
+from county_names import GAZETTEER_PATH
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_pipeline, 'CACHE_DIR', str(tmp_path / "cache"))
+    monkeypatch.setattr(ingest_pipeline, 'STATE_FILE', str(tmp_path / "cache" / "state.json"))
+    data = tmp_path / "data"
+    data.mkdir()
+    pd.read_csv(os.path.join(REPO_DIR, "synthetic_patient_data_with_distances.csv"), nrows=300).to_csv(
+        data / "synthetic_patient_data_with_distances.csv", index=False)
+    shutil.copyfile(os.path.join(REPO_DIR, "county_pharmacy_distances.csv"), data / "county_pharmacy_distances.csv")
+    return str(data)
+
+def run(data_dir, **kwargs):
+    return ingest_pipeline.run_pipeline(data_dir, input_overrides={'gazetteer': GAZETTEER_PATH}, **kwargs)
+
+def test_second_run_with_checkpoints_is_fully_cached(data_dir):
+    assert run(data_dir, write_checkpoints=True)
+    # Checkpoints never overwrite a stage input, so nothing is invalidated
+    assert run(data_dir, write_checkpoints=True) == []
+    assert os.path.exists(os.path.join(data_dir, "county_pharmacy_distances_computed.csv"))
+
+def test_input_change_reruns_dependent_stages(data_dir):
+    run(data_dir)
+    patients_path = os.path.join(data_dir, "synthetic_patient_data_with_distances.csv")
+    pd.read_csv(patients_path).head(100).to_csv(patients_path, index=False)
+    assert run(data_dir)[0] == 'patients'
+    assert len(pd.read_csv(os.path.join(data_dir, "patient_data_with_imputed_distances.csv"))) == 100
+
+def test_modified_output_is_rewritten(data_dir):
+    run(data_dir)
+    output_path = os.path.join(data_dir, "patient_data_with_imputed_distances.csv")
+    with open(output_path) as f:
+        expected = f.read()
+    with open(output_path, 'a') as f:
+        f.write("tampered\n")
+    assert run(data_dir) == []
+    with open(output_path) as f:
+        assert f.read() == expected
+
+def test_code_digest_follows_helper_modules(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_pipeline, 'BASE_DIR', str(tmp_path))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    (tmp_path / "digest_helper.py").write_text("def helper():\n    return 1\n")
+    (tmp_path / "digest_stage.py").write_text(
+        "from digest_helper import helper\n\ndef run(inputs, deps):\n    return helper()\n")
+    import digest_stage
+    before = ingest_pipeline.code_digest(digest_stage.run)
+
+    (tmp_path / "digest_helper.py").write_text("def helper():\n    return 2\n")
+    linecache.clearcache()
+    importlib.reload(sys.modules['digest_helper'])
+    assert ingest_pipeline.code_digest(digest_stage.run) != before
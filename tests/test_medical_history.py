@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+from medical_history import condition_counts, get_drug_needs, parse_conditions, parse_medical_history
+
+def test_parse_conditions_handles_strings_lists_and_missing():
+    assert parse_conditions("['Hypertension', \"Arthritis\"]") == ['Hypertension', 'Arthritis']
+    assert parse_conditions(['Asthma']) == ['Asthma']
+    assert parse_conditions(np.nan) == []
+    assert parse_conditions("__import__('os')") == ['os']  # parsed as text, never evaluated
+
+def test_multihot_matrix_and_fixed_vocabulary():
+    series = pd.Series(["['Asthma', 'Diabetes']", None, "['Asthma']", "['Gout']"])
+    matrix, vocabulary = parse_medical_history(series)
+    assert vocabulary == ['Asthma', 'Diabetes', 'Gout']
+    assert matrix.tolist() == [[1, 1, 0], [0, 0, 0], [1, 0, 0], [0, 0, 1]]
+    matrix, vocabulary = parse_medical_history(series, vocabulary=['Diabetes', 'Asthma'])
+    assert matrix.tolist() == [[1, 1], [0, 0], [0, 1], [0, 0]]
+
+def test_condition_counts_accepts_masks_and_positions():
+    matrix, vocabulary = parse_medical_history(["['Asthma', 'Diabetes']", "['Asthma']", "['Diabetes']"])
+    assert condition_counts(matrix, vocabulary).to_dict() == {'Asthma': 2, 'Diabetes': 2}
+    assert condition_counts(matrix, vocabulary, [True, True, False]).to_dict() == {'Asthma': 2, 'Diabetes': 1}
+    assert condition_counts(matrix, vocabulary, np.array([2])).to_dict() == {'Diabetes': 1, 'Asthma': 0}
+
+def test_drug_needs_use_the_first_mapped_condition():
+    needs = get_drug_needs(pd.Series(["['Gout', 'Asthma']", "['Diabetes']", None, "[]"]))
+    assert needs.tolist() == ['Asthma Inhaler', 'Insulin', 'Unknown', 'Unknown']
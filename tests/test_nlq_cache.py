@@ -0,0 +1,70 @@
+import json
+import pytest
+import nlq_cache
+
+SCHEMA = "Table: patient_data\nColumns:\n- us_state (TEXT)\n- age (INTEGER)\n"
+
+@pytest.fixture(autouse=True)
+def empty_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(nlq_cache, 'CACHE_FILE', str(tmp_path / "nlq_cache.json"))
+    monkeypatch.setattr(nlq_cache, '_entries', None)
+    monkeypatch.setattr(nlq_cache, '_similarity_index', {})
+    monkeypatch.setattr(nlq_cache, '_dirty', False)
+
+def stored_entries():
+    with open(nlq_cache.CACHE_FILE) as f:
+        return json.load(f)['entries']
+
+def test_exact_and_reworded_questions_hit():
+    nlq_cache.store("How many patients are in Texas?", SCHEMA, "SELECT 1")
+    assert nlq_cache.lookup("how many patients are in texas", SCHEMA) == "SELECT 1"
+    assert nlq_cache.lookup("How many of the patients are in Texas", SCHEMA) == "SELECT 1"
+
+def test_different_content_words_miss():
+    nlq_cache.store("How many patients are in Texas?", SCHEMA, "SELECT 1")
+    assert nlq_cache.lookup("How many patients are in Ohio?", SCHEMA) is None
+
+def test_schema_change_misses():
+    nlq_cache.store("How many patients are in Texas?", SCHEMA, "SELECT 1")
+    assert nlq_cache.lookup("How many patients are in Texas?", SCHEMA + "- gender (TEXT)\n") is None
+
+def test_discard_removes_the_entry_served_by_similarity():
+    nlq_cache.store("How many patients are in Texas?", SCHEMA, "SELECT broken")
+    reworded = "How many of the patients are in Texas"
+    assert nlq_cache.match_key(reworded, SCHEMA) != nlq_cache._key(nlq_cache.schema_hash(SCHEMA), nlq_cache.normalize_question(reworded))
+    assert nlq_cache.lookup(reworded, SCHEMA) == "SELECT broken"
+    nlq_cache.discard(reworded, SCHEMA)
+    assert nlq_cache.lookup(reworded, SCHEMA) is None
+    assert nlq_cache.lookup("How many patients are in Texas?", SCHEMA) is None
+    assert stored_entries() == []
+
+def test_hits_are_persisted_lazily():
+    nlq_cache.store("How many patients are in Texas?", SCHEMA, "SELECT 1")
+    nlq_cache.lookup("How many patients are in Texas?", SCHEMA)
+    assert stored_entries()[0]['hits'] == 0
+    assert nlq_cache._dirty
+    nlq_cache._save_if_dirty()
+    assert stored_entries()[0]['hits'] == 1
+    assert not nlq_cache._dirty
+
+def test_least_recently_used_entries_are_evicted(monkeypatch):
+    monkeypatch.setattr(nlq_cache, 'MAX_ENTRIES', 2)
+    nlq_cache.store("patients in Texas", SCHEMA, "SELECT 1")
+    nlq_cache.store("patients in Ohio", SCHEMA, "SELECT 2")
+    nlq_cache.lookup("patients in Texas", SCHEMA)
+    nlq_cache.store("patients in Utah", SCHEMA, "SELECT 3")
+    assert [entry['question'] for entry in stored_entries()] == ["patients in texas", "patients in utah"]
+
+@pytest.mark.parametrize('cached, opposite', [
+    ("How many patients have a salary above 50000?", "How many patients have a salary below 50000?"),
+    ("List the patients who are pregnant", "List the patients who are not pregnant"),
+    ("Count patients under 30 years old", "Count patients over 30 years old"),
+    ("Which county has the least pharmacies?", "Which county has the most pharmacies?"),
+    ("Show the top 10 counties by distance", "Show the bottom 10 counties by distance"),
+    ("Patients with diabetes in Texas", "Patients without diabetes in Texas"),
+    ("Show the top five counties by patients", "Show the top ten counties by patients"),
+])
+def test_negation_and_comparison_words_never_share_an_entry(cached, opposite):
+    nlq_cache.store(cached, SCHEMA, "SELECT cached")
+    assert nlq_cache.lookup(opposite, SCHEMA, similarity_threshold=0.1) is None
+    assert nlq_cache.lookup(cached.upper(), SCHEMA) == "SELECT cached"
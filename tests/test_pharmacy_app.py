@@ -0,0 +1,71 @@
+import pytest
+
+pharmacy_app = pytest.importorskip("pharmacy_app")
+
+@pytest.fixture
+def client():
+    return pharmacy_app.app.test_client()
+
+def test_suggestions_payload_times_its_groupby_phase(client):
+    from response_cache import clear_response_cache
+    clear_response_cache()
+    pharmacy_app._payload_cache.clear()
+    assert client.get('/api/pharmacy_suggestions').status_code == 200
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'endpoint="get_pharmacy_suggestions",phase="groupby"' in text
+
+def test_county_data_from_generator_shards_uses_gazetteer_points(tmp_path):
+    from generate_patient_data import generate_sharded_patient_data
+    from sharded_dataset import load_patient_table
+    manifest = generate_sharded_patient_data(200, str(tmp_path), shard_size=100, workers=1)
+    df = load_patient_table(manifest)
+    assert 'correct_county_lat' not in df.columns
+    coords, names = pharmacy_app.county_data_from_frame(df)
+    assert names and set(names) == set(coords)
+    assert all(c['latitude'] != 0 and c['longitude'] != 0 for c in coords.values())
+    for county, point in coords.items():
+        generated = df.loc[(df['us_county'].astype(str) + ", " + df['us_state']) == county].iloc[0]
+        assert abs(point['latitude'] - generated['latitude']) < 1
+        assert abs(point['longitude'] - generated['longitude']) < 1
+
+def test_county_data_from_frame_without_county_columns_fails():
+    with pytest.raises(ValueError, match="us_county"):
+        pharmacy_app.county_data_from_frame(pharmacy_app.pd.DataFrame({'age': [1]}))
+
+@pytest.mark.parametrize('bbox', ["nan,0,10,10", "0,0,inf,10", "-10,-95,10,10", "-10,0,10,91", "1,2,3"])
+def test_invalid_bbox_is_rejected(client, bbox):
+    response = client.get('/api/pharmacy_deserts', query_string={'bbox': bbox})
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+def test_zoom_is_clamped():
+    viewport = pharmacy_app.parse_viewport_args({'zoom': "9" * 400})
+    assert viewport['zoom'] == pharmacy_app.MAP_MAX_ZOOM
+
+def test_clusters_are_paged_by_limit(client):
+    query = {'bbox': "-180,-90,180,90", 'zoom': "7"}
+    everything = client.get('/api/pharmacy_deserts', query_string=query).get_json()
+    if len(everything['clusters']) < 2:
+        pytest.skip("needs at least two desert clusters in the dataset")
+    first = client.get('/api/pharmacy_deserts', query_string={**query, 'limit': "1"}).get_json()
+    assert len(first['clusters']) == 1
+    assert first['next_cursor'] == "1"
+    second = client.get('/api/pharmacy_deserts', query_string={**query, 'limit': "1", 'cursor': "1"}).get_json()
+    assert [first['clusters'][0], second['clusters'][0]] == everything['clusters'][:2]
+
+def test_desert_patients_without_fips_are_counted(monkeypatch, capsys):
+    df = pharmacy_app.pd.DataFrame({
+        'patient_id': [1, 2, 3],
+        'us_county': ["Autauga County", "Autauga County", "Nowhere"],
+        'us_state': ["Alabama", "Alabama", "Alabama"],
+        pharmacy_app.FIPS_COLUMN: pharmacy_app.pd.array([1001, 1001, None], dtype='Int64'),
+        'distance_to_nearest_pharmacy': [25, 30, 40],
+        'distance_to_nearest_pharmacy_miles': [25.0, 30.0, 40.0],
+        'correct_county_lat': [32.5, 32.5, 0.0],
+        'correct_county_lon': [-86.6, -86.6, 0.0],
+    })
+    monkeypatch.setattr(pharmacy_app, 'patient_data_df', df)
+    payload = pharmacy_app.pharmacy_deserts_payload()
+    assert payload['desert_counties']['affected_patients'].tolist() == [2]
+    assert payload['total_affected'] == 3 and payload['unmapped_patients'] == 1
+    assert "1 desert patients have no county FIPS code" in capsys.readouterr().out
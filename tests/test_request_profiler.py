@@ -0,0 +1,25 @@
+import pytest
+flask = pytest.importorskip("flask")
+import request_profiler
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(request_profiler, 'PROFILE_DIR', str(tmp_path))
+    app = flask.Flask(__name__)
+
+    @app.route('/ping')
+    def ping():
+        return "pong"
+
+    request_profiler.init_profiler(app, token="sécret")
+    return app.test_client()
+
+def test_non_ascii_token_is_compared_as_bytes(client):
+    assert 'X-Profile-Id' in client.get('/ping', query_string={'_profile': "sécret"}).headers
+    assert 'X-Profile-Id' not in client.get('/ping', query_string={'_profile': "sécrèt"}).headers
+    assert 'X-Profile-Id' not in client.get('/ping', headers={'X-Profile-Token': "wrong"}).headers
+
+def test_saved_profiles_are_bounded(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(request_profiler, 'MAX_SAVED_PROFILES', 3)
+    ids = [client.get('/ping', query_string={'_profile': "sécret"}).headers['X-Profile-Id'] for _ in range(5)]
+    assert sorted(path.stem for path in tmp_path.glob("*.prof")) == sorted(ids[-3:])
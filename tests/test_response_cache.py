@@ -0,0 +1,47 @@
+import gzip
+import pytest
+flask = pytest.importorskip("flask")
+import response_cache
+from response_cache import cached_json_response, clear_response_cache, dataset_version
+
+@pytest.fixture
+def client():
+    clear_response_cache()
+    app = flask.Flask(__name__)
+    builds = []
+    state = {'version': "v1"}
+
+    @app.route('/data')
+    def data():
+        def build_body():
+            builds.append(state['version'])
+            return b'{"rows":[' + b','.join([b'1'] * 1000) + b']}'
+        return cached_json_response('data', state['version'], build_body)
+
+    client = app.test_client()
+    client.builds, client.state = builds, state
+    return client
+
+def test_body_is_built_once_per_version(client):
+    client.get('/data')
+    client.get('/data')
+    assert client.builds == ["v1"]
+    client.state['version'] = "v2"
+    client.get('/data')
+    assert client.builds == ["v1", "v2"]
+    assert [key for key in response_cache._response_cache] == [('data', "v2")]
+
+def test_gzip_variant_and_conditional_requests(client):
+    response = client.get('/data', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data).startswith(b'{"rows":[1,')
+    etag = response.headers['ETag']
+    assert client.get('/data', headers={'If-None-Match': etag}).status_code == 304
+
+def test_dataset_version_tracks_file_changes(tmp_path):
+    path = tmp_path / "data.csv"
+    missing = dataset_version([str(path)])
+    path.write_text("a\n1\n")
+    first = dataset_version([str(path)])
+    path.write_text("a\n1\n2\n")
+    assert len({missing, first, dataset_version([str(path)])}) == 3
@@ -0,0 +1,71 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+import data_analysis_pipeline as pipeline
+
+@pytest.fixture
+def patient_db(tmp_path):
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({
+        'state': rng.choice(['Texas', 'Ohio', 'Utah'], size=5000),
+        'patient_code': [f"P{i}" for i in range(5000)],
+        'age': rng.integers(18, 90, size=5000),
+        'distance': rng.uniform(0, 50, size=5000),
+    })
+    df.loc[::7, 'distance'] = np.nan
+    db_path = str(tmp_path / "patients.db")
+    with sqlite3.connect(db_path) as conn:
+        df.to_sql('patients', conn, index=False)
+    return db_path, df
+
+def run_profile(db_path, sql):
+    profile = pipeline.new_result_profile()
+    columns, rows, total = pipeline.execute_sql_query(
+        db_path, sql, on_batch=lambda cols, batch: pipeline.update_result_profile(profile, cols, batch))
+    return columns, rows, total, pipeline.finish_result_profile(profile)
+
+def test_execute_keeps_capped_rows_but_streams_every_batch(patient_db):
+    db_path, df = patient_db
+    seen = []
+    columns, rows, total = pipeline.execute_sql_query(db_path, "SELECT * FROM patients", max_rows=10,
+                                                      on_batch=lambda cols, batch: seen.append(len(batch)))
+    assert columns == list(df.columns)
+    assert len(rows) == 10 and total == len(df) and sum(seen) == len(df)
+
+def test_streamed_statistics_match_the_full_frame(patient_db):
+    db_path, df = patient_db
+    _, _, total, profile = run_profile(db_path, "SELECT * FROM patients")
+    assert profile['rows'] == total == len(df)
+    distance = profile['columns']['distance']
+    assert distance['non_null'] == df['distance'].notna().sum()
+    assert distance['mean'] == pytest.approx(df['distance'].mean(), abs=1e-4)
+    assert distance['std'] == pytest.approx(df['distance'].std(), abs=1e-4)
+    assert distance['max'] == pytest.approx(df['distance'].max(), abs=1e-4)
+    assert profile['columns']['state']['top'] == df['state'].value_counts().to_dict()
+    expected = df.groupby('state')['age'].mean() - df['age'].mean()
+    for state, delta in profile['group_deltas']['state']['age'].items():
+        assert delta == pytest.approx(expected[state], abs=1e-4)
+
+def test_profile_state_stays_bounded(patient_db, monkeypatch):
+    monkeypatch.setattr(pipeline, 'PROFILE_TRACKED_VALUES', 100)
+    monkeypatch.setattr(pipeline, 'QUANTILE_SAMPLE_ROWS', 200)
+    db_path, df = patient_db
+    profile = pipeline.new_result_profile()
+    pipeline.execute_sql_query(db_path, "SELECT * FROM patients", on_batch=lambda cols, batch: pipeline.update_result_profile(profile, cols, batch))
+    assert len(profile['sample']) == 200
+    assert len(profile['columns']['patient_code']['counts']) <= 100
+    result = pipeline.finish_result_profile(profile)
+    assert result['quantile_sample_rows'] == 200
+    assert result['columns']['patient_code']['distinct_is_lower_bound']
+    # Too many values to group by
+    assert 'patient_code' not in result['group_deltas']
+
+def test_insights_keep_the_row_based_signature():
+    prompts = []
+    backend = lambda prompt: prompts.append(prompt) or "insight"
+    assert pipeline.get_insights_from_data(['a'], [(1,), (2,)], "question", "key", 2, backend=backend) == "insight"
+    assert "Row 2: (2,)" in prompts[0]
+    assert pipeline.get_insights_from_data(['a'], [], "question", "key").startswith("No data")
+    pipeline.get_insights_from_data(['a'], [(1,)], "question", "key", 1, backend=backend, result_profile={'rows': 1})
+    assert '"rows": 1' in prompts[1]
@@ -0,0 +1,19 @@
+import pytest
+from generate_patient_data import generate_sharded_patient_data
+from sharded_dataset import load_patient_table, read_manifest
+
+@pytest.fixture
+def manifest(tmp_path):
+    return generate_sharded_patient_data(250, str(tmp_path), shard_size=100, workers=1)
+
+def test_parts_load_in_manifest_order(manifest):
+    df = load_patient_table(manifest)
+    assert len(df) == 250
+    assert df['patient_id'].tolist() == list(range(1, 251))
+    assert list(df.columns) == read_manifest(manifest)['columns']
+
+def test_modified_part_fails_its_manifest_sha256(manifest, tmp_path):
+    part = tmp_path / read_manifest(manifest)['parts'][1]['file']
+    part.write_text(part.read_text().replace("California", "Californja", 1))
+    with pytest.raises(ValueError, match="part-00001"):
+        load_patient_table(manifest)
@@ -0,0 +1,33 @@
+import numpy as np
+from spatial_index import build_grid_index, query_bbox, cluster_points, cluster_cell_degrees
+
+def brute_force(lat, lon, min_lon, min_lat, max_lon, max_lat):
+    inside_lon = (lon >= min_lon) & (lon <= max_lon) if min_lon <= max_lon else (lon >= min_lon) | (lon <= max_lon)
+    return np.flatnonzero((lat >= min_lat) & (lat <= max_lat) & inside_lon)
+
+def test_query_bbox_matches_a_full_scan():
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(-90, 90, 5000)
+    lon = rng.uniform(-180, 180, 5000)
+    index = build_grid_index(lat, lon)
+    for box in [(-100, 20, -60, 50), (0.5, -0.5, 0.7, 0.2), (-180, -90, 180, 90), (170, -10, -170, 10)]:
+        assert query_bbox(index, *box).tolist() == brute_force(lat, lon, *box).tolist()
+
+def test_points_without_coordinates_are_skipped():
+    lat = np.array([10.0, np.nan, 10.5])
+    lon = np.array([20.0, 20.0, np.nan])
+    index = build_grid_index(lat, lon)
+    assert query_bbox(index, -180, -90, 180, 90).tolist() == [0]
+
+def test_cluster_points_sums_counts_and_weights():
+    lat = np.array([10.0, 10.1, 50.0, np.nan])
+    lon = np.array([20.0, 20.1, -100.0, 0.0])
+    clusters = cluster_points(lat, lon, [1, 2, 5, 100], cluster_cell_degrees(3))
+    assert sorted(clusters['count'].tolist()) == [1, 2]
+    assert clusters['weight'].sum() == 8
+    pair = clusters[clusters['count'] == 2].iloc[0]
+    assert np.isclose(pair['latitude'], 10.05) and np.isclose(pair['longitude'], 20.05)
+
+def test_cluster_cells_shrink_with_zoom():
+    assert cluster_cell_degrees(0) == 90
+    assert cluster_cell_degrees(4) == cluster_cell_degrees(3) / 2
@@ -6,24 +6,32 @@ from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import accuracy_score
 import joblib
+from medical_history import parse_medical_history, multihot_frame
 
 # Load the dataset
 file_path = 'C:\\Users\\703401801\\Desktop\\Cigna\\synthetic_patient_data_with_clusters.csv'
 df = pd.read_csv(file_path)
 
+# Parse medical_history once into multi-hot condition columns (mh_<condition>)
+history_matrix, history_vocabulary = parse_medical_history(df['medical_history'])
+history_features = multihot_frame(history_matrix, history_vocabulary, index=df.index)
+df = pd.concat([df.drop(columns=['medical_history']), history_features], axis=1)
+
 # Define features (X) and target (y)
 X = df.drop('Pharmacy_Found_Class', axis=1)
 y = df['Pharmacy_Found_Class']
 
 # Define categorical and numerical features
-categorical_features = ['medical_history', 'drug_needs', 'has_chronic_illness', 'is_senior_citizen', 'Group', 'us_county', 'us_state', 'gender', 'marital_status', 'ethnicity', 'last_checkup_date', 'blood_pressure']
+categorical_features = ['drug_needs', 'has_chronic_illness', 'is_senior_citizen', 'Group', 'us_county', 'us_state', 'gender', 'marital_status', 'ethnicity', 'last_checkup_date', 'blood_pressure']
 numerical_features = ['age', 'annual_salary', 'number_of_children', 'latitude', 'longitude', 'FIPS_STATE_CODE', 'county_fips_code', 'heart_rate', 'patients_in_county', 'distance_to_nearest_pharmacy_miles']
+multihot_features = list(history_features.columns)
 
 # Create a preprocessing pipeline
 preprocessor = ColumnTransformer(
     transformers=[
         ('num', StandardScaler(), numerical_features),
-        ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features)
+        ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features),
+        ('multihot', 'passthrough', multihot_features)
     ])
 
 # Create the model pipeline
@@ -1,27 +1,24 @@
 
 import pandas as pd
+from county_names import fips_codes, fips_positions, county_geometry
 
 # Load the patient data
 patient_data_path = "C:\\Users\\703401801\\Desktop\\Cigna\\synthetic_patient_data_processed.csv"
 df = pd.read_csv(patient_data_path)
 
-# Load the county data from the URL
-county_data_url = "https://gist.githubusercontent.com/russellsamora/12be4f9f574e92413ea3f92ce1bc58e6/raw/us_county_latlng.csv"
-county_df = pd.read_csv(county_data_url)
+# Load the county coordinates from the Census Gazetteer shipped with the repo
+# (parsed once and cached as a binary table, so no network fetch is needed)
+geometry = county_geometry()
 
-# Prepare for the merge
-county_df.rename(columns={'name': 'us_county', 'lat': 'new_latitude', 'lng': 'new_longitude'}, inplace=True)
-
-# Merge the dataframes
-df = pd.merge(df, county_df, on='us_county', how='left')
+# Look up each patient's county by FIPS code
+positions = fips_positions(fips_codes(df))
+new_latitude = pd.Series(geometry['lat'][positions], index=df.index)
+new_longitude = pd.Series(geometry['lon'][positions], index=df.index)
 
 # Update the latitude and longitude columns
 # Only update where a match was found
-df['latitude'] = df['new_latitude'].fillna(df['latitude'])
-df['longitude'] = df['new_longitude'].fillna(df['longitude'])
-
-# Drop the temporary columns
-df.drop(columns=['fips_code', 'new_latitude', 'new_longitude'], inplace=True)
+df['latitude'] = new_latitude.fillna(df['latitude'])
+df['longitude'] = new_longitude.fillna(df['longitude'])
 
 # Save the updated dataframe
 df.to_csv(patient_data_path, index=False)
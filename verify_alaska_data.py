@@ -18,7 +18,7 @@ def verify_alaska_data():
             
             if lat_lon_missing == 0:
                 print("\n[SUCCESS] The 'correct_county_lat' and 'correct_county_lon' fields ARE present for all Alaska records.")
-                print("This means the merge with uscounties.xlsx worked correctly.")
+                print("This means the Gazetteer county coordinate lookup worked correctly.")
             else:
                 print(f"\n[WARNING] Found {lat_lon_missing} Alaska records with missing county coordinates.")
 